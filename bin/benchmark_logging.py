@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measure the cost of logging a record with the handlers set up by fiaas-deploy-daemon
+
+Logs to /dev/null through the same handlers as fiaas-deploy-daemon, and prints the average time per record for
+records logged with and without a deployment context, and for errors with a traceback.
+
+    python bin/benchmark_logging.py --log-format json
+"""
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.log_extras import get_final_error_logs, get_final_logs, set_extras
+from fiaas_deploy_daemon.logsetup import init_logging
+
+LOG = logging.getLogger("benchmark")
+
+
+def _without_context():
+    LOG.info("Watching for changes on %s", "Applications")
+
+
+def _with_context():
+    LOG.info("Creating/updating %s for %s", "deployment", "testapp")
+
+
+def _error_with_traceback():
+    try:
+        raise ValueError("Something went wrong")
+    except ValueError:
+        LOG.exception("Error while deploying %s", "testapp")
+
+
+def _measure(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log-format", choices=("plain", "json"), default="json")
+    parser.add_argument("--number", type=int, default=50000, help="Number of records logged in each run")
+    args = parser.parse_args()
+
+    config = Configuration(["--log-format", args.log_format])
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            init_logging(config)
+            without_context = _measure(_without_context, args.number)
+            set_extras(app_name="testapp", namespace="default", deployment_id="benchmark")
+            with_context = _measure(_with_context, args.number)
+            error = _measure(_error_with_traceback, args.number)
+            get_final_logs("testapp", "default", "benchmark")
+            get_final_error_logs("testapp", "default", "benchmark")
+        finally:
+            sys.stdout = stdout
+    print("Log format: {}".format(args.log_format))
+    print("Without deployment context: {:7.2f} µs per record".format(without_context))
+    print("With deployment context:    {:7.2f} µs per record".format(with_context))
+    print("Error with traceback:       {:7.2f} µs per record".format(error))
+
+
+if __name__ == "__main__":
+    main()
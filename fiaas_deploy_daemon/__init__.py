@@ -22,7 +22,6 @@ import signal
 import sys
 import threading
 import traceback
-from queue import Queue
 
 import pinject
 import requests
@@ -31,8 +30,11 @@ from prometheus_client import Info
 from requests.adapters import HTTPAdapter, Retry
 
 from .config import Configuration
+from .coordination import CoordinationBindings
 from .crd import CustomResourceDefinitionBindings, DisabledCustomResourceDefinitionBindings
+from .crd.status import connect_signals
 from .deployer import DeployerBindings
+from .deployer.deploy_queue import DeployQueue
 from .deployer.kubernetes import K8sAdapterBindings
 from .extension_hook_caller import ExtensionHookCaller
 from .lifecycle import Lifecycle
@@ -47,11 +49,10 @@ from .web import WebBindings
 class MainBindings(pinject.BindingSpec):
     def __init__(self, config: Configuration):
         self._config = config
-        self._deploy_queue = Queue()
 
     def configure(self, bind):
         bind("config", to_instance=self._config)
-        bind("deploy_queue", to_instance=self._deploy_queue)
+        bind("deploy_queue", to_class=DeployQueue)
         bind("health_check", to_class=HealthCheck)
         bind("lifecycle", to_class=Lifecycle)
         bind("extension_hook", to_class=ExtensionHookCaller)
@@ -73,7 +74,19 @@ class MainBindings(pinject.BindingSpec):
 
 class HealthCheck(object):
     @pinject.copy_args_to_internal_fields
-    def __init__(self, deployer, scheduler, crd_watcher, usage_reporter):
+    def __init__(
+        self,
+        deployer,
+        scheduler,
+        crd_watcher,
+        usage_reporter,
+        deployment_watcher,
+        resource_cache,
+        status_index,
+        status_writer,
+        status_sweeper,
+        sharding,
+    ):
         pass
 
     def is_healthy(self):
@@ -81,20 +94,53 @@ class HealthCheck(object):
             (
                 self._deployer.is_alive(),
                 self._scheduler.is_alive(),
+                self._deployment_watcher.is_alive(),
+                self._resource_cache.is_alive(),
+                self._status_index.is_alive(),
+                self._status_writer.is_alive(),
+                self._status_sweeper.is_alive(),
+                self._sharding.is_alive(),
                 self._crd_watcher.is_alive(),
                 self._usage_reporter.is_alive(),
             )
         )
 
+    def shard_ownership(self):
+        """Return the replicas Applications are sharded across and the share owned by this one, or None"""
+        return self._sharding.ownership()
+
 
 class Main(object):
     @pinject.copy_args_to_internal_fields
-    def __init__(self, deployer, scheduler, webapp, config, crd_watcher, usage_reporter):
+    def __init__(
+        self,
+        deployer,
+        scheduler,
+        webapp,
+        config,
+        crd_watcher,
+        usage_reporter,
+        deployment_watcher,
+        resource_cache,
+        status_index,
+        status_writer,
+        status_sweeper,
+        sharding,
+    ):
         pass
 
     def run(self):
+        if self._config.enable_crd_support:
+            # Connected here rather than when the objects are created, so building the objects has no side effects
+            connect_signals(self._config.include_status_in_app, self._status_index, self._status_writer)
         self._deployer.start()
         self._scheduler.start()
+        self._deployment_watcher.start()
+        self._resource_cache.start()
+        self._status_index.start()
+        self._status_writer.start()
+        self._status_sweeper.start()
+        self._sharding.start()
         self._crd_watcher.start()
         self._usage_reporter.start()
         # Run web-app in main thread
@@ -205,24 +251,31 @@ def main():
     warn_if_env_variable_config(cfg, log)
     expose_fdd_version(cfg)
     signal.signal(signal.SIGUSR2, thread_dump_logger(log))
+    # exit normally on SIGTERM, so that cleanup registered with atexit is done when the pod is stopped
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
     try:
         log.info("fiaas-deploy-daemon starting with configuration {!r}".format(cfg))
         if cfg.enable_crd_support:
-            crd_binding = CustomResourceDefinitionBindings(cfg.use_apiextensionsv1_crd, cfg.include_status_in_app)
+            crd_binding = CustomResourceDefinitionBindings(
+                cfg.use_apiextensionsv1_crd, cfg.include_status_in_app, cfg.status_write_queue_size > 0
+            )
         else:
             crd_binding = DisabledCustomResourceDefinitionBindings()
         binding_specs = [
             MainBindings(cfg),
-            DeployerBindings(),
-            K8sAdapterBindings(cfg.use_networkingv1_ingress),
+            DeployerBindings(cfg.enable_deployment_watch, cfg.enable_resource_cache),
+            K8sAdapterBindings(cfg.use_networkingv1_ingress, cfg.enable_resource_cache),
             WebBindings(),
             SpecBindings(),
             crd_binding,
+            CoordinationBindings(cfg.enable_sharding, cfg.enable_leader_election),
             UsageReportingBindings(),
         ]
         obj_graph = pinject.new_object_graph(modules=None, binding_specs=binding_specs)
         obj_graph.provide(Main).run()
+    except SystemExit:
+        log.info("fiaas-deploy-daemon stopping")
     except BaseException:
         log.exception("General failure! Inspect traceback and make the code better!")
 
@@ -18,7 +18,6 @@
 
 import logging
 import sys
-from queue import Queue
 
 import pinject
 import requests
@@ -27,6 +26,7 @@ from .bootstrapper import Bootstrapper
 from .. import init_k8s_client
 from ..config import Configuration
 from ..deployer import DeployerBindings
+from ..deployer.deploy_queue import DeployQueue
 from ..deployer.kubernetes import K8sAdapterBindings
 from ..lifecycle import Lifecycle
 from ..logsetup import init_logging
@@ -37,11 +37,10 @@ from ..extension_hook_caller import ExtensionHookCaller
 class MainBindings(pinject.BindingSpec):
     def __init__(self, config):
         self._config = config
-        self._deploy_queue = Queue()
 
     def configure(self, bind):
         bind("config", to_instance=self._config)
-        bind("deploy_queue", to_instance=self._deploy_queue)
+        bind("deploy_queue", to_class=DeployQueue)
         bind("bootstrapper", to_class=Bootstrapper)
         bind("lifecycle", to_class=Lifecycle)
         bind("extension_hook", to_class=ExtensionHookCaller)
@@ -177,6 +177,44 @@ class Configuration(Namespace):
         parser.add_argument(
             "--log-format", help="Set logformat (default: %(default)s)", choices=self.VALID_LOG_FORMAT, default="plain"
         )
+        parser.add_argument(
+            "--log-capture-max-lines",
+            type=int,
+            help="Maximum number of log lines kept for the status of each deployment (default: %(default)s)",
+            default=1000,
+        )
+        parser.add_argument(
+            "--log-capture-max-megabytes",
+            type=int,
+            help="Maximum size of the log lines kept for the status of all deployments (default: %(default)s)",
+            default=64,
+        )
+        parser.add_argument(
+            "--log-capture-ttl",
+            type=int,
+            help="Seconds before the log lines kept for an unfinished deployment are discarded, "
+            + "if nothing was logged for it (default: %(default)s)",
+            default=3600,
+        )
+        parser.add_argument(
+            "--enable-async-logging",
+            help="Write logs to stdout from a background thread, instead of from the thread logging",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--async-logging-queue-size",
+            type=int,
+            help="Number of log records waiting to be written when async logging is enabled (default: %(default)s)",
+            default=10000,
+        )
+        parser.add_argument(
+            "--async-logging-overflow",
+            help="What to do with new log records when the queue of async logging is full: drop them, or block the "
+            + "thread logging until there is room (default: %(default)s)",
+            choices=("drop", "block"),
+            default="drop",
+        )
         parser.add_argument("--proxy", help="Use http proxy (currently only used for for usage reporting)")
         parser.add_argument(
             "--debug",
@@ -275,6 +313,131 @@ class Configuration(Namespace):
             + "number of seconds  (default: %(default)s)",
             default=10,
         )
+        parser.add_argument(
+            "--scheduler-workers",
+            type=int,
+            help="Number of worker threads executing ready checks. With 0, ready checks are executed in the scheduler "
+            + "thread (default: %(default)s)",
+            default=0,
+        )
+        parser.add_argument(
+            "--scheduler-task-timeout",
+            type=int,
+            help="Seconds a ready check may run on a worker before the worker is considered hung and replaced "
+            + "(default: %(default)s)",
+            default=60,
+        )
+        parser.add_argument(
+            "--resourcequota-cache-ttl",
+            type=int,
+            help="Seconds to keep the ResourceQuotas of a namespace before listing them again. Set to 0 to list them "
+            + "on every deploy (default: %(default)s)",
+            default=60,
+        )
+        parser.add_argument(
+            "--deploy-workers",
+            type=int,
+            help="Number of applications to deploy in parallel. Deploys of the same application are always executed "
+            + "in the order they were received (default: %(default)s)",
+            default=1,
+        )
+        parser.add_argument(
+            "--resource-deploy-workers",
+            type=int,
+            help="Number of threads used to deploy the resources of applications concurrently. With 1, the resources "
+            + "of an application are deployed one at a time (default: %(default)s)",
+            default=1,
+        )
+        parser.add_argument(
+            "--parse-workers",
+            type=int,
+            help="Number of threads building application specs from Applications. With 0, specs are built in the "
+            + "thread watching Applications (default: %(default)s)",
+            default=0,
+        )
+        parser.add_argument(
+            "--status-write-queue-size",
+            type=int,
+            help="Number of deployments with ApplicationStatus changes waiting to be written by a background thread. "
+            + "With 0, statuses are written by the thread changing them (default: %(default)s)",
+            default=0,
+        )
+        parser.add_argument(
+            "--status-sweep-interval",
+            type=int,
+            help="Seconds between each time old ApplicationStatuses of all applications are deleted "
+            + "(default: %(default)s)",
+            default=600,
+        )
+        parser.add_argument(
+            "--status-index-sync-timeout",
+            type=int,
+            help="Seconds to wait for all ApplicationStatuses to be indexed before watching Applications. "
+            + "Until they are, ApplicationStatuses are read from the API (default: %(default)s)",
+            default=10,
+        )
+        parser.add_argument(
+            "--list-page-size",
+            type=int,
+            help="Number of Applications and ApplicationStatuses to get in each request when listing all of them "
+            + "(default: %(default)s)",
+            default=500,
+        )
+        parser.add_argument(
+            "--enable-deployment-watch",
+            help="Watch Deployments to detect when rollouts complete, instead of polling each Deployment while waiting",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--skip-unchanged-writes",
+            help="Store a hash of the desired state on each resource, and skip writing resources that have not changed",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--enable-server-side-apply",
+            help="Write resources using server-side apply, with a single PATCH per resource",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--enable-resource-cache",
+            help="Keep a watched copy of the resources deployed for applications, instead of reading them before every write",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--enable-sharding",
+            help="Share the Applications between all replicas of fiaas-deploy-daemon, coordinated through Leases",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--sharding-key",
+            help="Assign Applications to replicas by their namespace, or by namespace and name (default: %(default)s)",
+            choices=("namespace", "application"),
+            default="application",
+        )
+        parser.add_argument(
+            "--shard-lease-duration",
+            type=int,
+            help="Seconds without renewing its Lease before a replica is no longer given Applications "
+            + "(default: %(default)s)",
+            default=15,
+        )
+        parser.add_argument(
+            "--enable-leader-election",
+            help="Elect one replica of fiaas-deploy-daemon to deploy Applications, keeping the others as warm standbys",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--leader-lease-duration",
+            type=int,
+            help="Seconds without renewing the leader Lease before a standby replica takes over (default: %(default)s)",
+            default=15,
+        )
         parser.add_argument(
             "--disable-deprecated-managed-env-vars",
             help=DISABLE_DEPRECATED_MANAGED_ENV_VARS,
@@ -282,6 +445,25 @@ class Configuration(Namespace):
             default=False,
         )
         parser.add_argument("--extension-hook-url", help=EXTENSION_HOOK_URL_HELP, default=None)
+        parser.add_argument(
+            "--disable-extension-hook-cache",
+            help="Call the extension hook on every deploy, even for objects and application configs it has already "
+            + "been called with",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--extension-hook-cache-size",
+            type=int,
+            help="Number of extension hook results to keep (default: %(default)s)",
+            default=1000,
+        )
+        parser.add_argument(
+            "--extension-hook-cache-ttl",
+            type=int,
+            help="Seconds to keep an extension hook result before calling the hook again (default: %(default)s)",
+            default=600,
+        )
         parser.add_argument(
             "--enable-service-account-per-app", help=ENABLE_SERVICE_ACCOUNT_PER_APP, action="store_true", default=False
         )
@@ -461,6 +643,9 @@ class Configuration(Namespace):
         )
 
         parser.parse_args(args, namespace=self)
+        if self.enable_sharding and self.enable_leader_election:
+            # a sharded replica owns its share of the Applications, so there is nothing for a leader to own
+            parser.error("--enable-sharding and --enable-leader-election can not be used together")
         self.global_env = {env_var.key: env_var.value for env_var in self.global_env}
         self.datadog_global_tags = {tag.key: tag.value for tag in self.datadog_global_tags}
         self.secret_init_containers = {provider.key: provider.value for provider in self.secret_init_containers}
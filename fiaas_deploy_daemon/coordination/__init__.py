@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pinject
+
+from .leader_election import LeaderElection
+from .lease import LeaseStore
+from .sharding import DisabledSharding, Sharding
+
+
+class CoordinationBindings(pinject.BindingSpec):
+    def __init__(self, enable_sharding=False, enable_leader_election=False):
+        self.enable_sharding = enable_sharding
+        self.enable_leader_election = enable_leader_election
+
+    def configure(self, bind, require):
+        require("config")
+
+        bind("lease_store", to_class=LeaseStore)
+        if self.enable_sharding:
+            bind("sharding", to_class=Sharding)
+        elif self.enable_leader_election:
+            # the leader owns all Applications, and is used by the same code that handles shards
+            bind("sharding", to_class=LeaderElection)
+        else:
+            bind("sharding", to_class=DisabledSharding)
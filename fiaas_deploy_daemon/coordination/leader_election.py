@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import socket
+import threading
+import time
+
+from k8s.client import ClientError, NotFound
+from k8s.models.common import ObjectMeta
+from prometheus_client import Counter, Gauge
+
+from ..base_thread import DaemonThread
+from .lease import Lease, LeaseSpec, micro_time
+from .sharding import ShardRing
+
+LOG = logging.getLogger(__name__)
+
+LEADER_LEASE_NAME = "fiaas-deploy-daemon-leader"
+RETRY_PERIOD = 2
+
+leader_gauge = Gauge("fiaas_leader", "1 if this replica is the leader deploying Applications, otherwise 0")
+leader_transitions = Counter("fiaas_leader_transitions", "Number of times this replica became or stopped being leader")
+
+
+class LeaderElection(DaemonThread):
+    """Elect one replica of fiaas-deploy-daemon to deploy all Applications
+
+    The leader holds a Lease, renewing it every few seconds. The other replicas are warm standbys: they watch
+    Applications, ApplicationStatuses and other resources like the leader does, but do not deploy. A standby takes the
+    Lease when it has not been renewed for the lease duration, as observed by the local clock of the standby. A leader
+    that fails to renew the Lease for two thirds of the lease duration stops deploying, before a standby can take over.
+
+    This is bound in place of Sharding, with the leader owning all Applications, so CrdWatcher deploys the Applications
+    that are not already deployed when this replica becomes leader.
+    """
+
+    enabled = True
+
+    def __init__(self, config, lease_store, identity=None, time_func=time.monotonic):
+        super(LeaderElection, self).__init__()
+        self._lease_store = lease_store
+        self._identity = identity or socket.gethostname()
+        self._lease_duration = config.leader_lease_duration
+        self._time_func = time_func
+        self._observed_record = None
+        self._observed_at = None
+        self._renewed_at = None
+        self._leader = None
+        self._ring = ShardRing([])
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        while True:
+            self._tick()
+            time.sleep(RETRY_PERIOD)
+
+    def _tick(self):
+        try:
+            leader = self._try_acquire_or_renew()
+        except Exception:
+            LOG.exception("Error while acquiring or renewing the leader Lease")
+            leader = self._leader
+        if leader == self._identity and self._time_func() - self._renewed_at > self._lease_duration * 2 / 3:
+            LOG.warning("Could not renew the leader Lease in time, stepping down")
+            leader = None
+        self._set_leader(leader)
+
+    def _try_acquire_or_renew(self):
+        now = self._time_func()
+        try:
+            lease = self._lease_store.get(LEADER_LEASE_NAME)
+        except NotFound:
+            metadata = ObjectMeta(name=LEADER_LEASE_NAME, namespace=self._lease_store.namespace)
+            lease = Lease(new=True, metadata=metadata, spec=LeaseSpec(leaseTransitions=0))
+        else:
+            record = (lease.spec.holderIdentity, lease.spec.renewTime)
+            if record != self._observed_record:
+                self._observed_record, self._observed_at = record, now
+            holder = lease.spec.holderIdentity
+            duration = lease.spec.leaseDurationSeconds or self._lease_duration
+            if holder and holder != self._identity and now - self._observed_at <= duration:
+                return holder
+        if lease.spec.holderIdentity != self._identity:
+            lease.spec.holderIdentity = self._identity
+            lease.spec.acquireTime = micro_time()
+            lease.spec.leaseTransitions = (lease.spec.leaseTransitions or 0) + (0 if lease._new else 1)
+        lease.spec.leaseDurationSeconds = self._lease_duration
+        lease.spec.renewTime = micro_time()
+        try:
+            self._lease_store.save(lease)
+        except ClientError as e:
+            if e.response.status_code != 409:
+                raise
+            LOG.debug("Another replica updated the leader Lease first")
+            return self._leader if self._leader != self._identity else None
+        self._renewed_at = now
+        return self._identity
+
+    def _set_leader(self, leader):
+        with self._lock:
+            if leader == self._leader:
+                return
+            was_leader = self._leader == self._identity
+            self._leader = leader
+            previous, self._ring = self._ring, ShardRing([leader] if leader else [])
+        is_leader = leader == self._identity
+        LOG.info("%s is now the leader", leader or "No replica")
+        leader_gauge.set(1 if is_leader else 0)
+        if is_leader != was_leader:
+            leader_transitions.inc()
+        for listener in list(self._listeners):
+            try:
+                listener(previous)
+            except Exception:
+                LOG.exception("Error while handling change of leader")
+
+    def add_listener(self, listener):
+        """Call listener with the previous ring whenever the leader changes"""
+        self._listeners.append(listener)
+
+    def owns(self, namespace, app_name, ring=None):
+        """Return True if this replica is the leader, or was the leader according to the given ring"""
+        return self._identity in (ring or self._ring).members
+
+    def is_leader(self):
+        return self._leader == self._identity
+
+    def ownership(self):
+        ring = self._ring
+        return {
+            "identity": self._identity,
+            "leader": self._leader,
+            "members": sorted(ring.members),
+            "owned_share": ring.share(self._identity),
+        }
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime, timezone
+
+import six
+from k8s.base import Model
+from k8s.fields import Field
+from k8s.models.common import ObjectMeta
+
+
+class LeaseSpec(Model):
+    holderIdentity = Field(six.text_type)  # NOQA
+    leaseDurationSeconds = Field(int)  # NOQA
+    acquireTime = Field(six.text_type)  # NOQA
+    renewTime = Field(six.text_type)  # NOQA
+    leaseTransitions = Field(int)  # NOQA
+
+
+class Lease(Model):
+    class Meta:
+        list_url = "/apis/coordination.k8s.io/v1/leases"
+        url_template = "/apis/coordination.k8s.io/v1/namespaces/{namespace}/leases/{name}"
+        watch_list_url = "/apis/coordination.k8s.io/v1/watch/leases"
+        watch_list_url_template = "/apis/coordination.k8s.io/v1/watch/namespaces/{namespace}/leases"
+
+    apiVersion = Field(six.text_type, "coordination.k8s.io/v1")  # NOQA
+    kind = Field(six.text_type, "Lease")
+
+    metadata = Field(ObjectMeta)
+    spec = Field(LeaseSpec)
+
+
+def micro_time(dt=None):
+    """Format a time like the API server expects the timestamps in a Lease, with microseconds"""
+    return (dt or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class LeaseStore(object):
+    """Get and save Leases in the namespace fiaas-deploy-daemon runs in
+
+    Everything that coordinates replicas through Leases goes through this class, so the API server can be replaced by
+    an in-memory fake in tests. Saving a Lease which was changed by someone else since it was read raises a ClientError
+    with status 409 Conflict.
+    """
+
+    def __init__(self, config):
+        self.namespace = config.namespace
+
+    def get(self, name):
+        return Lease.get(name, self.namespace)
+
+    def find(self, labels):
+        return Lease.find(namespace=self.namespace, labels=labels)
+
+    def save(self, lease):
+        lease.save()
+        return lease
+
+    def delete(self, name):
+        Lease.delete(name, self.namespace)
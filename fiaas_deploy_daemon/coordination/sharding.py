@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import atexit
+import bisect
+import hashlib
+import logging
+import socket
+import threading
+import time
+
+from k8s.client import NotFound
+from k8s.models.common import ObjectMeta
+from prometheus_client import Counter, Gauge
+
+from ..base_thread import DaemonThread
+from .lease import Lease, LeaseSpec, micro_time
+
+LOG = logging.getLogger(__name__)
+
+SHARD_GROUP_LABEL = "fiaas/shard-group"
+SHARD_GROUP = "fiaas-deploy-daemon"
+VIRTUAL_NODES = 64
+# Leases not renewed for this many lease durations belong to replicas that are gone for good, and are deleted
+EXPIRED_LEASE_GC_FACTOR = 10
+
+shard_members = Gauge("fiaas_shard_members", "Number of replicas Applications are sharded across")
+shard_owned_share = Gauge("fiaas_shard_owned_share", "Share of Applications owned by this replica")
+shard_rebalances = Counter("fiaas_shard_rebalances", "Number of times the shards were moved between replicas")
+
+
+def _hash(value):
+    return int(hashlib.sha256(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class ShardRing(object):
+    """Consistent hash ring assigning keys to members
+
+    Each member is placed on the ring at a number of points, and a key is owned by the member at the first point
+    following the hash of the key. When a member joins or leaves, only the keys of the points next to its own move.
+    """
+
+    def __init__(self, members, virtual_nodes=VIRTUAL_NODES):
+        self.members = frozenset(members)
+        points = sorted(
+            (_hash("{}#{}".format(member, i)), member) for member in self.members for i in range(virtual_nodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key):
+        if not self._owners:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+    def share(self, member):
+        """Return the share of the hash space owned by member"""
+        if member not in self.members:
+            return 0.0
+        space = 2**64
+        owned = 0
+        for i, owner in enumerate(self._owners):
+            if owner == member:
+                previous = self._hashes[i - 1] if i > 0 else self._hashes[-1] - space
+                owned += self._hashes[i] - previous
+        return owned / space
+
+
+class Sharding(DaemonThread):
+    """Share the Applications between the replicas of fiaas-deploy-daemon
+
+    Each replica keeps a Lease labeled with the shard group, renewing it at a third of the lease duration. Replicas
+    whose Lease has not been renewed within the lease duration, as observed by this replica, are not members. Each
+    Application is owned by one member, chosen by consistent hashing of its namespace, or its namespace and name.
+    Listeners are called with the previous ring whenever the members change, so they can pick up Applications that
+    moved to this replica. The Lease of this replica is deleted when it stops, and Leases that have not been renewed
+    for a long time are deleted by the remaining members.
+    """
+
+    def __init__(self, config, lease_store, identity=None, time_func=time.monotonic):
+        super(Sharding, self).__init__()
+        self._lease_store = lease_store
+        self._identity = identity or socket.gethostname()
+        self._lease_name = "{}-shard-{}".format(SHARD_GROUP, self._identity)
+        self._lease_duration = config.shard_lease_duration
+        self._by_namespace = config.sharding_key == "namespace"
+        self._time_func = time_func
+        self._observed = {}
+        self._renewed_at = None
+        self._ring = ShardRing([])
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return True
+
+    def __call__(self):
+        atexit.register(self.release)
+        while True:
+            self._tick()
+            time.sleep(self._lease_duration / 3.0)
+
+    def release(self):
+        """Delete the Lease of this replica, so the other replicas take over its Applications right away"""
+        try:
+            self._lease_store.delete(self._lease_name)
+            LOG.info("Deleted the shard Lease %s", self._lease_name)
+        except NotFound:
+            pass
+        except Exception:
+            LOG.exception("Error while deleting the shard Lease %s", self._lease_name)
+
+    def _tick(self):
+        try:
+            self._renew()
+        except Exception:
+            LOG.exception("Error while renewing the shard Lease %s", self._lease_name)
+        try:
+            self._update_members()
+        except Exception:
+            LOG.exception("Error while getting the shard Leases")
+
+    def _renew(self):
+        now = micro_time()
+        try:
+            lease = self._lease_store.get(self._lease_name)
+        except NotFound:
+            metadata = ObjectMeta(
+                name=self._lease_name, namespace=self._lease_store.namespace, labels={SHARD_GROUP_LABEL: SHARD_GROUP}
+            )
+            spec = LeaseSpec(holderIdentity=self._identity, acquireTime=now)
+            lease = Lease(new=True, metadata=metadata, spec=spec)
+        lease.spec.leaseDurationSeconds = self._lease_duration
+        lease.spec.renewTime = now
+        self._lease_store.save(lease)
+        self._renewed_at = self._time_func()
+
+    def _update_members(self):
+        now = self._time_func()
+        observed = {}
+        for lease in self._lease_store.find({SHARD_GROUP_LABEL: SHARD_GROUP}):
+            identity = lease.spec.holderIdentity
+            if not identity:
+                continue
+            record = (lease.spec.renewTime, lease.spec.leaseDurationSeconds)
+            previous_record, observed_at = self._observed.get(identity, (None, now))
+            observed_at = observed_at if record == previous_record else now
+            expired_after = EXPIRED_LEASE_GC_FACTOR * (lease.spec.leaseDurationSeconds or self._lease_duration)
+            if identity != self._identity and now - observed_at > expired_after:
+                self._delete_expired(lease)
+                continue
+            observed[identity] = (record, observed_at)
+        self._observed = observed
+        members = {
+            identity
+            for identity, ((_, duration), observed_at) in observed.items()
+            if now - observed_at <= (duration or self._lease_duration)
+        }
+        # without a recent renewal of our own Lease, the other replicas have taken over our Applications
+        if self._renewed_at is None or now - self._renewed_at > self._lease_duration:
+            members.discard(self._identity)
+        else:
+            members.add(self._identity)
+        self._set_members(members)
+
+    def _delete_expired(self, lease):
+        LOG.info("Deleting the shard Lease %s, which has not been renewed for a long time", lease.metadata.name)
+        try:
+            self._lease_store.delete(lease.metadata.name)
+        except NotFound:
+            pass
+        except Exception:
+            LOG.exception("Error while deleting the expired shard Lease %s", lease.metadata.name)
+
+    def _set_members(self, members):
+        with self._lock:
+            if members == self._ring.members:
+                return
+            previous, self._ring = self._ring, ShardRing(members)
+        LOG.info("Sharding Applications across %s", ", ".join(sorted(members)) or "no replicas")
+        shard_members.set(len(members))
+        shard_owned_share.set(self._ring.share(self._identity))
+        shard_rebalances.inc()
+        for listener in list(self._listeners):
+            try:
+                listener(previous)
+            except Exception:
+                LOG.exception("Error while moving Applications to or from this replica")
+
+    def add_listener(self, listener):
+        """Call listener with the previous ring whenever the members change"""
+        self._listeners.append(listener)
+
+    def owns(self, namespace, app_name, ring=None):
+        """Return True if this replica owns the Application, according to the current or given ring"""
+        key = namespace if self._by_namespace else "{}/{}".format(namespace, app_name)
+        return (ring or self._ring).owner(key) == self._identity
+
+    def ownership(self):
+        ring = self._ring
+        return {
+            "identity": self._identity,
+            "members": sorted(ring.members),
+            "owned_share": ring.share(self._identity),
+        }
+
+
+class DisabledSharding(object):
+    """Used when sharding is disabled, making this replica own all Applications"""
+
+    enabled = False
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def add_listener(self, listener):
+        pass
+
+    def owns(self, namespace, app_name, ring=None):
+        return True
+
+    def ownership(self):
+        return None
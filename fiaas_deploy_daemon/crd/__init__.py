@@ -21,30 +21,42 @@ import pinject
 from .crd_resources_syncer_apiextensionsv1 import CrdResourcesSyncerApiextensionsV1
 from .crd_resources_syncer_apiextensionsv1beta1 import CrdResourcesSyncerApiextensionsV1Beta1
 
-from .status import connect_signals
+from .status_index import DisabledStatusIndex, StatusIndex
+from .status_sweeper import DisabledStatusSweeper, StatusSweeper
+from .status_writer import DisabledStatusWriter, StatusWriter
 from .watcher import CrdWatcher
 
 
 class CustomResourceDefinitionBindings(pinject.BindingSpec):
-    def __init__(self, use_apiextensionsv1_crd, include_status_in_app):
+    def __init__(self, use_apiextensionsv1_crd, include_status_in_app, write_status_in_background=False):
         self.use_apiextensionsv1_crd = use_apiextensionsv1_crd
         self.include_status_in_app = include_status_in_app
+        self.write_status_in_background = write_status_in_background
 
     def configure(self, bind, require):
         require("config")
         require("deploy_queue")
 
         bind("crd_watcher", to_class=CrdWatcher)
+        bind("status_sweeper", to_class=StatusSweeper)
         if self.use_apiextensionsv1_crd:
             bind("crd_resources_syncer", to_class=CrdResourcesSyncerApiextensionsV1)
         else:
             bind("crd_resources_syncer", to_class=CrdResourcesSyncerApiextensionsV1Beta1)
-        connect_signals(self.include_status_in_app)
+        if self.write_status_in_background:
+            bind("status_writer", to_class=StatusWriter)
+        else:
+            bind("status_writer", to_class=DisabledStatusWriter)
+
+        bind("status_index", to_class=StatusIndex)
 
 
 class DisabledCustomResourceDefinitionBindings(pinject.BindingSpec):
     def configure(self, bind):
         bind("crd_watcher", to_class=FakeWatcher)
+        bind("status_index", to_class=DisabledStatusIndex)
+        bind("status_writer", to_class=DisabledStatusWriter)
+        bind("status_sweeper", to_class=DisabledStatusSweeper)
 
 
 class FakeWatcher(object):
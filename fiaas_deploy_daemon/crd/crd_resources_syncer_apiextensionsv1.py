@@ -17,7 +17,6 @@
 
 import logging
 
-from k8s.models.common import ObjectMeta
 from k8s.models.apiextensions_v1_custom_resource_definition import (
     CustomResourceConversion,
     CustomResourceDefinitionNames,
@@ -32,6 +31,7 @@ from k8s.models.apiextensions_v1_custom_resource_definition import (
 )
 
 from ..retry import retry_on_upsert_conflict
+from .definition import create_or_update_definition
 
 LOG = logging.getLogger(__name__)
 
@@ -41,7 +41,6 @@ class CrdResourcesSyncerApiextensionsV1(object):
     @retry_on_upsert_conflict
     def _create_or_update(kind, plural, short_names, group, open_apiv3_schema, subresources=None):
         name = "%s.%s" % (plural, group)
-        metadata = ObjectMeta(name=name)
         names = CustomResourceDefinitionNames(kind=kind, plural=plural, shortNames=short_names)
         schema = CustomResourceValidation(openAPIV3Schema=open_apiv3_schema)
         version_v1 = CustomResourceDefinitionVersion(name="v1", served=True, storage=True, schema=schema,
@@ -54,9 +53,7 @@ class CrdResourcesSyncerApiextensionsV1(object):
             scope="Namespaced",
             conversion=CustomResourceConversion(strategy="None"),
         )
-        definition = CustomResourceDefinition.get_or_create(metadata=metadata, spec=spec)
-        definition.save()
-        LOG.info("Created or updated CustomResourceDefinition with name %s", name)
+        create_or_update_definition(CustomResourceDefinition, name, spec)
 
     @classmethod
     def update_crd_resources(cls):
@@ -17,7 +17,6 @@
 
 import logging
 
-from k8s.models.common import ObjectMeta
 from k8s.models.custom_resource_definition import (
     CustomResourceDefinitionNames,
     CustomResourceDefinitionSpec,
@@ -25,6 +24,7 @@ from k8s.models.custom_resource_definition import (
 )
 
 from ..retry import retry_on_upsert_conflict
+from .definition import create_or_update_definition
 
 LOG = logging.getLogger(__name__)
 
@@ -34,12 +34,9 @@ class CrdResourcesSyncerApiextensionsV1Beta1(object):
     @retry_on_upsert_conflict
     def _create_or_update(kind, plural, short_names, group):
         name = "%s.%s" % (plural, group)
-        metadata = ObjectMeta(name=name)
         names = CustomResourceDefinitionNames(kind=kind, plural=plural, shortNames=short_names)
         spec = CustomResourceDefinitionSpec(group=group, names=names, version="v1")
-        definition = CustomResourceDefinition.get_or_create(metadata=metadata, spec=spec)
-        definition.save()
-        LOG.info("Created or updated CustomResourceDefinition with name %s", name)
+        create_or_update_definition(CustomResourceDefinition, name, spec)
 
     @classmethod
     def update_crd_resources(cls):
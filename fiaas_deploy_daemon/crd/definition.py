@@ -0,0 +1,48 @@
+# coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from k8s.client import NotFound
+from k8s.models.common import ObjectMeta
+
+from ..tools import digest
+
+LOG = logging.getLogger(__name__)
+
+SPEC_HASH_ANNOTATION = "fiaas/spec-hash"
+
+
+def create_or_update_definition(definition_cls, name, spec):
+    """Create or update a CustomResourceDefinition, unless it was last written with the same spec
+
+    A hash of the spec is kept in an annotation on the definition, so an unchanged definition is not written again.
+    Every write makes the API server rebuild the handlers for the custom resource.
+    """
+    spec_hash = digest(spec.as_dict())
+    metadata = ObjectMeta(name=name, annotations={SPEC_HASH_ANNOTATION: spec_hash})
+    try:
+        definition = definition_cls.get(name)
+    except NotFound:
+        definition = definition_cls(new=True, metadata=metadata, spec=spec)
+    else:
+        if (definition.metadata.annotations or {}).get(SPEC_HASH_ANNOTATION) == spec_hash:
+            LOG.info("CustomResourceDefinition with name %s is up to date", name)
+            return
+        for field in definition_cls._meta.fields:
+            field.set(definition, {"metadata": metadata, "spec": spec})
+    definition.save()
+    LOG.info("Created or updated CustomResourceDefinition with name %s", name)
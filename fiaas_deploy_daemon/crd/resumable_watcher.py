@@ -0,0 +1,145 @@
+# coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from k8s.base import APIServerError, ModelList, SyntheticAddedWatchEvent, WatchEvent
+from k8s.client import ClientError
+from prometheus_client import Counter, Gauge
+
+LOG = logging.getLogger(__name__)
+
+LIST_PAGE_SIZE = 500
+# Number of seen resources to remember. Beyond this, the least recently changed are forgotten, and may be yielded
+# again the next time all resources are listed.
+SEEN_CAPACITY = 10000
+
+watch_relists = Counter("fiaas_crd_watch_relists", "Number of times all resources were listed", ["kind", "reason"])
+watch_replayed_events = Counter(
+    "fiaas_crd_watch_replayed_events", "Number of resources seen again when listing, which were skipped", ["kind"]
+)
+watch_initial_sync_duration = Gauge(
+    "fiaas_crd_watch_initial_sync_seconds", "Time taken to list and handle all resources at startup", ["kind"]
+)
+
+
+class ResumableWatcher(object):
+    """Watch for changes on a model, resuming from the last seen resource version on each call to watch
+
+    The Watcher from the k8s library resumes within a call to watch, but its resource version is lost when an error
+    other than 410 Gone ends the call, so the next call lists all resources again. Here the resource version is kept
+    between calls.
+    All resources are listed only the first time, and when the API server no longer has the resource version to resume
+    from (410 Gone). The list is paged, and each page is yielded before the next is requested, so handling the first
+    resources can start right away. Resources in the list that were already seen with the same resource version
+    are not yielded again. Watch bookmarks are requested, so the resource version to resume from stays recent when no
+    resources change. The `synced` event is set once all resources have been listed and yielded the first time.
+    """
+
+    def __init__(self, model, page_size=LIST_PAGE_SIZE, capacity=SEEN_CAPACITY):
+        self._model = model
+        self._page_size = page_size
+        self._capacity = capacity
+        self._resource_version = None
+        self._seen = OrderedDict()
+        self.synced = threading.Event()
+
+    def watch(self, namespace=None):
+        """Yield :py:class:`~k8s.base.WatchEvent` objects not seen before, until the watch connection is closed"""
+        if self._resource_version is None:
+            yield from self._list(namespace)
+        try:
+            for event in self._model.watch_list(
+                namespace=namespace, resource_version=self._resource_version, allow_bookmarks=True
+            ):
+                self._resource_version = event.resource_version
+                if event.has_object() and self._should_yield(event):
+                    yield event
+        except APIServerError as e:
+            if e.api_error["code"] != 410:
+                raise
+            LOG.info(
+                "Resource version %s of %s is too old to resume from", self._resource_version, self._model.__name__
+            )
+            self._resource_version = None
+
+    def _list(self, namespace):
+        kind = self._model.__name__
+        initial = not self.synced.is_set()
+        watch_relists.labels(kind, "initial" if initial else "expired").inc()
+        start = time.monotonic()
+        url = self._model._meta.list_url if namespace is None else self._model._build_url(name="", namespace=namespace)
+        params = {"limit": self._page_size}
+        known = dict(self._seen)
+        seen = OrderedDict()
+        listed = 0
+        resource_version = None
+        while True:
+            try:
+                response = self._model._client.get(url, params=params)
+            except ClientError as e:
+                if "continue" not in params or e.response.status_code != 410:
+                    raise
+                # The snapshot the pages were taken from is gone, so start over with a new one
+                LOG.info("Listing %s took too long to continue, listing them again", kind)
+                watch_relists.labels(kind, "continue_expired").inc()
+                params = {"limit": self._page_size}
+                seen = OrderedDict()
+                listed = 0
+                resource_version = None
+                continue
+            model_list = ModelList.from_dict(self._model, response.json())
+            # All pages are from the same snapshot, so the resource version of the first page is the one to watch from
+            if resource_version is None:
+                resource_version = model_list.metadata.resourceVersion
+            for obj in model_list.items:
+                key = (obj.metadata.name, obj.metadata.namespace)
+                listed += 1
+                self._remember(seen, key, obj.metadata.resourceVersion)
+                if known.get(key) == obj.metadata.resourceVersion:
+                    watch_replayed_events.labels(kind).inc()
+                    continue
+                known[key] = obj.metadata.resourceVersion
+                yield SyntheticAddedWatchEvent(obj)
+            if not model_list.metadata._continue:
+                break
+            params = {"limit": self._page_size, "continue": model_list.metadata._continue}
+        LOG.info("Listed %d %s resources", listed, kind)
+        self._seen = seen
+        self._resource_version = resource_version
+        if initial:
+            watch_initial_sync_duration.labels(kind).set(time.monotonic() - start)
+        self.synced.set()
+
+    def _should_yield(self, event):
+        obj = event.object
+        key = (obj.metadata.name, obj.metadata.namespace)
+        if event.type == WatchEvent.DELETED:
+            self._seen.pop(key, None)
+            return True
+        if self._seen.get(key) == obj.metadata.resourceVersion:
+            return False
+        self._remember(self._seen, key, obj.metadata.resourceVersion)
+        return True
+
+    def _remember(self, seen, key, resource_version):
+        seen[key] = resource_version
+        seen.move_to_end(key)
+        while len(seen) > self._capacity:
+            seen.popitem(last=False)
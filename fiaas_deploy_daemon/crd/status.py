@@ -15,13 +15,15 @@
 
 import logging
 import struct
+from operator import itemgetter
 from base64 import b32encode
 from datetime import datetime, timezone
 
 from blinker import signal
 from py27hash.hash import hash27
-from k8s.client import NotFound
+from k8s.client import Client, ClientError, NotFound
 from k8s.models.common import ObjectMeta, OwnerReference
+from prometheus_client import Counter
 
 from .types import FiaasApplication, FiaasApplicationStatus, FiaasApplicationStatusResult
 from ..lifecycle import DEPLOY_STATUS_CHANGED, STATUS_STARTED
@@ -31,10 +33,22 @@ from ..tools import merge_dicts
 
 LAST_UPDATED_KEY = "fiaas/last_updated"
 OLD_STATUSES_TO_KEEP = 10
+JSON_PATCH_CONTENT_TYPE = "application/json-patch+json"
 LOG = logging.getLogger(__name__)
 
+status_deletions = Counter(
+    "fiaas_application_statuses_deleted", "Old ApplicationStatuses deleted, by what triggered the deletion", ["trigger"]
+)
 
-def connect_signals(include_status_in_app):
+_status_index = None
+_status_writer = None
+_client = Client()
+
+
+def connect_signals(include_status_in_app, status_index=None, status_writer=None):
+    global _status_index, _status_writer
+    _status_index = status_index
+    _status_writer = status_writer
     if include_status_in_app:
         signal(DEPLOY_STATUS_CHANGED).connect(_handle_signal_with_status)
     else:
@@ -46,29 +60,76 @@ def now():
 
 
 def _handle_signal_without_status(sender, status, subject):
+    _write(_save_status_and_cleanup, _result(status), subject)
+
+
+def _handle_signal_with_status(sender, status, subject):
+    _write(_save_status_inline_and_cleanup, _result(status), subject)
+
+
+def _result(status):
     if status == STATUS_STARTED:
-        status = "RUNNING"
+        return "RUNNING"
+    return status.upper()
+
+
+def _write(write, result, subject):
+    if _status_writer:
+        _status_writer.put(write, result, subject)
     else:
-        status = status.upper()
+        write(result, subject)
 
-    _save_status(status, subject)
-    _cleanup(subject.app_name, subject.namespace)
 
+def _save_status_and_cleanup(result, subject):
+    created = _save_status(result, subject)
+    _cleanup(subject.app_name, subject.namespace, created)
 
-def _handle_signal_with_status(sender, status, subject):
-    if status == STATUS_STARTED:
-        status = "RUNNING"
+
+def _save_status_inline_and_cleanup(result, subject):
+    if subject.generation is None:
+        _save_status_inline(result, subject)
     else:
-        status = status.upper()
+        _patch_status_inline(result, subject)
+    created = _save_status(result, subject)
+    _cleanup(subject.app_name, subject.namespace, created)
+
+
+def _patch_status_inline(result, subject):
+    """Set the status of the Application in a single PATCH, without reading the Application first
 
-    _save_status_inline(status, subject)
-    _save_status(status, subject)
-    _cleanup(subject.app_name, subject.namespace)
+    The patch only applies while the Application is still labeled with the deployment_id of the subject, so results
+    of older deployments don't overwrite the status of the current one. When fiaas-deploy-daemon is not allowed to
+    patch the status, it is read and updated instead, as before patching was used.
+    """
+    app_name, namespace, deployment_id = subject.app_name, subject.namespace, subject.deployment_id
+    logs = _get_error_logs(app_name, namespace, deployment_id, result)
+    status = FiaasApplicationStatusResult(
+        observedGeneration=int(subject.generation), result=result, logs=logs, deployment_id=deployment_id
+    )
+    body = [
+        {"op": "test", "path": "/metadata/labels/fiaas~1deployment_id", "value": deployment_id},
+        {"op": "add", "path": "/status", "value": status.as_dict()},
+    ]
+    url = FiaasApplication._build_url(name=app_name, namespace=namespace) + "/status"
+    LOG.info("Patching inline result %s for %s/%s deployment_id=%s generation %s", result, namespace, app_name,
+             deployment_id, subject.generation)
+    try:
+        _client._call("PATCH", url, body, headers={"Content-Type": JSON_PATCH_CONTENT_TYPE})
+    except ClientError as e:
+        if e.response.status_code == 403:
+            LOG.warning("Not allowed to patch the status of application %s, updating it instead. "
+                        "Allow patch of applications/status to avoid reading the Application first", app_name)
+            _save_status_inline(result, subject)
+            return
+        # The test operation fails when the Application has been labeled with another deployment_id
+        if e.response.status_code != 422:
+            raise
+        LOG.debug("Skipping saving status for application %s with different deployment_id", app_name)
 
 
 @retry_on_upsert_conflict
 def _save_status_inline(result, subject):
-    (uid, app_name, namespace, deployment_id, repository, labels, annotations) = subject
+    (uid, app_name, namespace, deployment_id, repository, labels, annotations, generation) = subject
 
     app = FiaasApplication.get(app_name, namespace)
     generation = int(app.metadata.generation)
@@ -90,7 +151,7 @@ def _save_status_inline(result, subject):
 
 @retry_on_upsert_conflict
 def _save_status(result, subject):
-    (uid, app_name, namespace, deployment_id, repository, labels, annotations) = subject
+    (uid, app_name, namespace, deployment_id, repository, labels, annotations, generation) = subject
     LOG.info("Saving result %s for %s/%s deployment_id=%s", result, namespace, app_name, deployment_id)
     name = create_name(app_name, deployment_id)
     labels = labels or {}
@@ -105,9 +166,11 @@ def _save_status(result, subject):
         status.metadata.annotations = merge_dicts(status.metadata.annotations, annotations)
         status.logs = logs
         status.result = result
+        created = False
     except NotFound:
         metadata = ObjectMeta(name=name, namespace=namespace, labels=labels, annotations=annotations)
         status = FiaasApplicationStatus.get_or_create(metadata=metadata, result=result, logs=logs)
+        created = True
     resource_version = status.metadata.resourceVersion
 
     LOG.debug(
@@ -120,6 +183,7 @@ def _save_status(result, subject):
     )
     _apply_owner_reference(status, subject)
     status.save()
+    return created
 
 
 def _get_logs(app_name, namespace, deployment_id, result):
@@ -135,21 +199,39 @@ def _get_error_logs(app_name, namespace, deployment_id, result):
        get_final_error_logs(app_name, namespace, deployment_id)
 
 
-def _cleanup(app_name=None, namespace=None):
-    statuses = FiaasApplicationStatus.find(app_name, namespace)
+def _cleanup(app_name=None, namespace=None, created=True):
+    indexed = _status_index.find(app_name, namespace) if _status_index else None
+    if indexed is None:
+        # Only a new status can push an old one out, anything missed is deleted by the StatusSweeper
+        if not created:
+            return
+        statuses = [
+            (_last_updated(s), s.metadata.name, s.metadata.namespace)
+            for s in FiaasApplicationStatus.find(app_name, namespace)
+        ]
+    else:
+        statuses = [(s.last_updated, s.name, s.namespace) for s in indexed]
+    delete_old_statuses(statuses, "deploy")
 
-    def _last_updated(s):
-        annotations = s.metadata.annotations
-        return annotations.get(LAST_UPDATED_KEY, "") if annotations else ""
 
-    statuses.sort(key=_last_updated)
-    for old_status in statuses[:-OLD_STATUSES_TO_KEEP]:
+def delete_old_statuses(statuses, trigger):
+    """Delete all but the OLD_STATUSES_TO_KEEP latest of a list of (last_updated, name, namespace) of an application"""
+    if len(statuses) <= OLD_STATUSES_TO_KEEP:
+        return
+    statuses = sorted(statuses, key=itemgetter(0))
+    for _, name, status_namespace in statuses[:-OLD_STATUSES_TO_KEEP]:
         try:
-            FiaasApplicationStatus.delete(old_status.metadata.name, old_status.metadata.namespace)
+            FiaasApplicationStatus.delete(name, status_namespace)
+            status_deletions.labels(trigger).inc()
         except NotFound:
             pass  # already deleted
 
 
+def _last_updated(status):
+    annotations = status.metadata.annotations
+    return annotations.get(LAST_UPDATED_KEY, "") if annotations else ""
+
+
 def create_name(name, deployment_id):
     """Create a name for the status object
 
@@ -0,0 +1,129 @@
+# coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+from collections import namedtuple
+
+from k8s.base import WatchEvent
+from prometheus_client import Counter, Gauge
+
+from .resumable_watcher import ResumableWatcher
+from .status import LAST_UPDATED_KEY
+from .types import FiaasApplicationStatus
+from ..base_thread import DaemonThread
+from ..retry import watch_forever
+
+LOG = logging.getLogger(__name__)
+
+status_index_statuses = Gauge("fiaas_status_index_statuses", "Number of ApplicationStatuses in the status index")
+status_index_lookups = Counter("fiaas_status_index_lookups", "Lookups in the status index", ["result"])
+
+IndexedStatus = namedtuple("IndexedStatus", ["name", "namespace", "result", "last_updated"])
+
+
+class StatusIndex(DaemonThread):
+    """Keep the result of every ApplicationStatus, indexed by namespace, application name and deployment_id
+
+    The index is fed by a watch on ApplicationStatuses, so deciding whether an Application has already been deployed,
+    and finding the old statuses to clean up, does not need an API call for each Application. Lookups return None until
+    the index has been synced, and when the status is not in the index, so callers can fall back to the API.
+    """
+
+    def __init__(self, config):
+        super(StatusIndex, self).__init__()
+        self._watcher = ResumableWatcher(FiaasApplicationStatus, config.list_page_size)
+        self._namespace = None if config.enable_deprecated_multi_namespace_support else config.namespace
+        self._lock = threading.Lock()
+        self._statuses = {}
+
+    def __call__(self):
+        watch_forever(self._watch, "FiaasApplicationStatuses")
+
+    def _watch(self):
+        for event in self._watcher.watch(namespace=self._namespace):
+            self._handle_watch_event(event)
+
+    def _handle_watch_event(self, event: WatchEvent):
+        metadata = event.object.metadata
+        labels = metadata.labels or {}
+        try:
+            key = (metadata.namespace, labels["app"])
+            deployment_id = labels["fiaas/deployment_id"]
+        except KeyError:
+            return
+        with self._lock:
+            statuses = self._statuses.setdefault(key, {})
+            if event.type == WatchEvent.DELETED:
+                statuses.pop(deployment_id, None)
+                if not statuses:
+                    del self._statuses[key]
+            else:
+                last_updated = (metadata.annotations or {}).get(LAST_UPDATED_KEY, "")
+                statuses[deployment_id] = IndexedStatus(
+                    metadata.name, metadata.namespace, event.object.result, last_updated
+                )
+            status_index_statuses.set(sum(len(s) for s in self._statuses.values()))
+
+    def wait_until_synced(self, timeout):
+        """Wait until all ApplicationStatuses have been indexed, returning False if the timeout expired first"""
+        return self._watcher.synced.wait(timeout)
+
+    def result(self, app_name, namespace, deployment_id):
+        """Return the result of a deployment, or None if it is not known"""
+        if not self._watcher.synced.is_set():
+            status_index_lookups.labels("not_synced").inc()
+            return None
+        with self._lock:
+            status = self._statuses.get((namespace, app_name), {}).get(deployment_id)
+        status_index_lookups.labels("miss" if status is None else "hit").inc()
+        return status.result if status else None
+
+    def find(self, app_name, namespace):
+        """Return the statuses of all deployments of an application, or None if the index has not been synced"""
+        if not self._watcher.synced.is_set():
+            return None
+        with self._lock:
+            return list(self._statuses.get((namespace, app_name), {}).values())
+
+    def all(self):
+        """Return the statuses of every application by (namespace, app_name), or None if the index has not been synced"""
+        if not self._watcher.synced.is_set():
+            return None
+        with self._lock:
+            return {key: list(statuses.values()) for key, statuses in self._statuses.items()}
+
+
+class DisabledStatusIndex(object):
+    """Used when Applications are not watched, making every lookup go to the API"""
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def wait_until_synced(self, timeout):
+        return True
+
+    def result(self, app_name, namespace, deployment_id):
+        return None
+
+    def find(self, app_name, namespace):
+        return None
+
+    def all(self):
+        return None
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import time
+
+from ..base_thread import DaemonThread
+from .status import delete_old_statuses
+
+LOG = logging.getLogger(__name__)
+
+
+class StatusSweeper(DaemonThread):
+    """Periodically delete old ApplicationStatuses of every application
+
+    Old statuses are normally deleted when a new status is created for an application. Statuses which were missed, for
+    instance because the deletion failed or the status index had not seen the latest status yet, are deleted here.
+    Only the statuses of applications owned by this replica are swept, so a standby or another shard does not delete
+    statuses which the owner of the application is writing.
+    """
+
+    def __init__(self, config, status_index, sharding):
+        super(StatusSweeper, self).__init__()
+        self._interval = config.status_sweep_interval
+        self._status_index = status_index
+        self._sharding = sharding
+
+    def __call__(self):
+        while True:
+            time.sleep(self._interval)
+            try:
+                self._sweep()
+            except Exception:
+                LOG.exception("Error while deleting old ApplicationStatuses")
+
+    def _sweep(self):
+        statuses = self._status_index.all()
+        if statuses is None:
+            LOG.info("ApplicationStatuses have not been indexed yet, not deleting old statuses")
+            return
+        for (namespace, app_name), app_statuses in statuses.items():
+            if not self._sharding.owns(namespace, app_name):
+                continue
+            delete_old_statuses([(s.last_updated, s.name, s.namespace) for s in app_statuses], "sweep")
+
+
+class DisabledStatusSweeper(object):
+    """Used when Applications are not watched"""
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return True
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import threading
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge
+
+from ..base_thread import DaemonThread
+from ..log_extras import set_extras
+
+LOG = logging.getLogger(__name__)
+
+status_write_queue_depth = Gauge(
+    "fiaas_status_write_queue_depth", "Number of deployments with ApplicationStatus changes waiting to be written"
+)
+status_writes_coalesced = Counter(
+    "fiaas_status_writes_coalesced", "ApplicationStatus changes replaced by a newer change before being written"
+)
+
+
+class StatusWriter(DaemonThread):
+    """Write ApplicationStatuses in the background, so deploys don't wait for the API
+
+    Only the latest change for each deployment is kept. When a deployment changes again before its previous change has
+    been written, the previous change is replaced and only the latest result is written. Adding a change for a new
+    deployment blocks while the queue is full.
+    """
+
+    def __init__(self, config):
+        super(StatusWriter, self).__init__()
+        self._queue_size = config.status_write_queue_size
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+
+    def put(self, write, result, subject):
+        """Call write(result, subject) in the background, unless a newer result for the same deployment comes first"""
+        key = (subject.namespace, subject.app_name, subject.deployment_id)
+        with self._condition:
+            if key in self._pending:
+                status_writes_coalesced.inc()
+            else:
+                while len(self._pending) >= self._queue_size:
+                    self._condition.wait()
+            self._pending[key] = (write, result, subject)
+            status_write_queue_depth.set(len(self._pending))
+            self._condition.notify_all()
+
+    def __call__(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                _, (write, result, subject) = self._pending.popitem(last=False)
+                status_write_queue_depth.set(len(self._pending))
+                self._condition.notify_all()
+            self._write(write, result, subject)
+
+    @staticmethod
+    def _write(write, result, subject):
+        set_extras(app_name=subject.app_name, namespace=subject.namespace, deployment_id=subject.deployment_id)
+        try:
+            write(result, subject)
+        except Exception:
+            LOG.exception("Error while saving result %s for %s", result, subject.app_name)
+
+
+class DisabledStatusWriter(object):
+    """Used when ApplicationStatuses are written by the thread changing them"""
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def put(self, write, result, subject):
+        write(result, subject)
@@ -16,12 +16,14 @@
 
 import datetime
 import logging
+import threading
+import zlib
 from queue import Queue
 from typing import Union
 
 from k8s.base import WatchEvent
 from k8s.client import NotFound
-from k8s.watcher import Watcher
+from prometheus_client import Gauge
 from yaml import YAMLError
 
 from fiaas_deploy_daemon.config import Configuration
@@ -33,36 +35,63 @@ from ..base_thread import DaemonThread
 from ..deployer import DeployerEvent
 from ..log_extras import set_extras
 from ..specs.factory import InvalidConfiguration, SpecFactory
+from .resumable_watcher import ResumableWatcher
 from .status import create_name
 from .types import FiaasApplication, FiaasApplicationStatus
 
 LOG = logging.getLogger(__name__)
 
 
+parse_queue_depth = Gauge("fiaas_parse_queue_depth", "Number of Applications waiting to have their spec built")
+
+
 class CrdWatcher(DaemonThread):
-    def __init__(self, spec_factory, deploy_queue, config: Configuration, lifecycle, crd_resources_syncer):
+    def __init__(
+        self, spec_factory, deploy_queue, config: Configuration, lifecycle, crd_resources_syncer, status_index, sharding
+    ):
         super(CrdWatcher, self).__init__()
         self._spec_factory: SpecFactory = spec_factory
         self._deploy_queue: Queue = deploy_queue
-        self._watcher = Watcher(FiaasApplication)
+        self._watcher = ResumableWatcher(FiaasApplication, config.list_page_size)
         self._lifecycle: Lifecycle = lifecycle
         self.namespace = config.namespace
         self.enable_deprecated_multi_namespace_support = config.enable_deprecated_multi_namespace_support
-        self.crd_resources_syncer: Union[
-            CrdResourcesSyncerApiextensionsV1, CrdResourcesSyncerApiextensionsV1Beta1
-        ] = crd_resources_syncer
+        self.crd_resources_syncer: Union[CrdResourcesSyncerApiextensionsV1, CrdResourcesSyncerApiextensionsV1Beta1] = (
+            crd_resources_syncer
+        )
         self.disable_crd_creation = config.disable_crd_creation
+        self._status_index = status_index
+        self._status_index_sync_timeout = config.status_index_sync_timeout
+        self._parse_worker_count = config.parse_workers
+        self._parse_workers = []
+        self._sharding = sharding
+        self._applications_lock = threading.Lock()
+        self._applications = {}
+        sharding.add_listener(self._shards_changed)
 
     def __call__(self):
+        if not self.disable_crd_creation:
+            self.crd_resources_syncer.update_crd_resources()
+        self._start_parse_workers()
+        if not self._status_index.wait_until_synced(self._status_index_sync_timeout):
+            LOG.warning("ApplicationStatuses were not indexed in time, getting them from the API until they are")
         while True:
             if self.enable_deprecated_multi_namespace_support:
                 self._watch(namespace=None)
             else:
                 self._watch(namespace=self.namespace)
 
+    def _start_parse_workers(self):
+        count = self._parse_worker_count
+        if self._sharding.enabled:
+            # Applications moved to this replica are handed to the workers, which keep the Applications in order
+            count = max(count, 1)
+        if count > 0 and not self._parse_workers:
+            self._parse_workers = [ParseWorker(self, i) for i in range(count)]
+            for worker in self._parse_workers:
+                worker.start()
+
     def _watch(self, namespace):
-        if not self.disable_crd_creation:
-            self.crd_resources_syncer.update_crd_resources()
         try:
             for event in self._watcher.watch(namespace=namespace):
                 self._handle_watch_event(event)
@@ -70,6 +99,21 @@ class CrdWatcher(DaemonThread):
             LOG.exception("Error while watching for changes on FiaasApplications")
 
     def _handle_watch_event(self, event: WatchEvent):
+        if self._sharding.enabled:
+            # Only ownership is decided while holding the lock, the checks which may call the API are left to the parse
+            # workers. Applications moved to this replica are queued while holding the same lock, so all Applications
+            # are queued to the parse workers in the order they changed
+            with self._applications_lock:
+                owned = self._owned(event)
+                queued = owned and event.type in (WatchEvent.ADDED, WatchEvent.MODIFIED)
+                if queued:
+                    self._parse_worker(event.object).put(OwnedApplication(event.object))
+            if owned and not queued:
+                self._dispatch(event)
+        else:
+            self._dispatch(event)
+
+    def _dispatch(self, event: WatchEvent):
         if event.type in (WatchEvent.ADDED, WatchEvent.MODIFIED):
             self._deploy(event.object)
         elif event.type == WatchEvent.DELETED:
@@ -77,6 +121,39 @@ class CrdWatcher(DaemonThread):
         else:
             raise ValueError("Unknown WatchEvent type {}".format(event.type))
 
+    def _owned(self, event: WatchEvent):
+        # All Applications are kept, so the ones moved to this replica can be deployed when the shards change
+        application = event.object
+        key = (application.metadata.namespace, application.metadata.name)
+        if event.type == WatchEvent.DELETED:
+            self._applications.pop(key, None)
+        else:
+            self._applications[key] = application
+        if self._sharding.owns(application.metadata.namespace, application.spec.application):
+            return True
+        LOG.debug("Skipping %s, which is owned by another replica", application.spec.application)
+        return False
+
+    def _shards_changed(self, previous_ring):
+        # Called by the sharding thread, which only queues the moved Applications, leaving the deploys to the workers
+        if not self._parse_workers:
+            # Not watching yet, so all owned Applications will be deployed when they are listed
+            return
+        with self._applications_lock:
+            for application in self._applications.values():
+                namespace, app_name = application.metadata.namespace, application.spec.application
+                if self._sharding.owns(namespace, app_name) and not self._sharding.owns(
+                    namespace, app_name, previous_ring
+                ):
+                    LOG.info("Application %s in %s was moved to this replica", app_name, namespace)
+                    self._parse_worker(application).put(OwnedApplication(application))
+
+    def _deploy_owned(self, application: FiaasApplication):
+        # The shards may have changed again since the Application was queued
+        if self._sharding.owns(application.metadata.namespace, application.spec.application):
+            if self._should_deploy(application):
+                self._parse(application)
+
     # When we receive update event on FiaasApplication
     # don't deploy if it's a status update
     def _skip_status_event(self, application: FiaasApplication):
@@ -105,6 +182,19 @@ class CrdWatcher(DaemonThread):
             return True
 
     def _deploy(self, application: FiaasApplication):
+        if not self._should_deploy(application):
+            return
+        if self._parse_workers:
+            self._parse_worker(application).put(application)
+        else:
+            self._parse(application)
+
+    def _parse_worker(self, application: FiaasApplication):
+        # applications with the same name always go to the same worker, which handles them in order
+        key = "{}/{}".format(application.metadata.namespace, application.spec.application)
+        return self._parse_workers[zlib.crc32(key.encode("utf-8")) % len(self._parse_workers)]
+
+    def _should_deploy(self, application: FiaasApplication):
         app_name = application.spec.application
         LOG.debug("Deploying %s", app_name)
         try:
@@ -113,12 +203,18 @@ class CrdWatcher(DaemonThread):
         except (AttributeError, KeyError, TypeError):
             raise ValueError("The Application {} is missing the 'fiaas/deployment_id' label".format(app_name))
         if self._skip_status_event(application):
-            return
+            return False
         if self._skip_update_of_deleted_application(application):
-            return
+            return False
         if self._already_deployed(app_name, application.metadata.namespace, deployment_id):
             LOG.debug("Have already deployed %s for app %s", deployment_id, app_name)
-            return
+            return False
+        return True
+
+    def _parse(self, application: FiaasApplication):
+        app_name = application.spec.application
+        deployment_id = application.metadata.labels["fiaas/deployment_id"]
+        set_extras(app_name=app_name, namespace=application.metadata.namespace, deployment_id=deployment_id)
         repository = _repository(application)
         lifecycle_subject = self._lifecycle.initiate(
             uid=application.metadata.uid,
@@ -128,6 +224,7 @@ class CrdWatcher(DaemonThread):
             repository=repository,
             labels=application.spec.additional_labels.status,
             annotations=application.spec.additional_annotations.status,
+            generation=application.metadata.generation,
         )
         try:
             app_spec = self._spec_factory(
@@ -154,12 +251,52 @@ class CrdWatcher(DaemonThread):
         LOG.info("Deleting %s. No specific action, we leave automatic garbage collection to Kubernetes", app_name)
 
     def _already_deployed(self, app_name, namespace, deployment_id):
-        try:
-            name = create_name(app_name, deployment_id)
-            status = FiaasApplicationStatus.get(name, namespace)
-            return status.result == "SUCCESS"
-        except NotFound:
-            return False
+        result = self._status_index.result(app_name, namespace, deployment_id)
+        if result is None:
+            try:
+                name = create_name(app_name, deployment_id)
+                result = FiaasApplicationStatus.get(name, namespace).result
+            except NotFound:
+                return False
+        return result == "SUCCESS"
+
+
+class OwnedApplication(object):
+    """An Application owned by this replica when it was queued to a ParseWorker, to be deployed if needed"""
+
+    def __init__(self, application):
+        self.application = application
+
+
+class ParseWorker(DaemonThread):
+    """Build the AppSpecs of the Applications the CrdWatcher assigns to this worker, one at a time"""
+
+    def __init__(self, crd_watcher, index):
+        self._index = index
+        super(ParseWorker, self).__init__()
+        self._crd_watcher = crd_watcher
+        self._queue = Queue()
+
+    def _make_name(self):
+        return "{}-{}".format(self.__class__.__name__, self._index)
+
+    def put(self, application):
+        parse_queue_depth.inc()
+        self._queue.put(application)
+
+    def __call__(self):
+        while True:
+            item = self._queue.get()
+            parse_queue_depth.dec()
+            try:
+                if isinstance(item, OwnedApplication):
+                    self._crd_watcher._deploy_owned(item.application)
+                else:
+                    self._crd_watcher._parse(item)
+            except Exception:
+                LOG.exception("Error while deploying %s", getattr(item, "application", item).spec.application)
+            finally:
+                self._queue.task_done()
 
 
 def _repository(application):
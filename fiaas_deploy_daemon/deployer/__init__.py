@@ -22,10 +22,15 @@ import pinject
 
 from .bookkeeper import Bookkeeper
 from .deploy import Deployer
+from .kubernetes.deployment_watcher import CachedDeploymentWatcher, DeploymentWatcher, DisabledDeploymentWatcher
 from .scheduler import Scheduler
 
 
 class DeployerBindings(pinject.BindingSpec):
+    def __init__(self, enable_deployment_watch=False, enable_resource_cache=False):
+        self.enable_deployment_watch = enable_deployment_watch
+        self.enable_resource_cache = enable_resource_cache
+
     def configure(self, bind, require):
         require("config")
         require("deploy_queue")
@@ -33,6 +38,13 @@ class DeployerBindings(pinject.BindingSpec):
         bind("bookkeeper", to_class=Bookkeeper)
         bind("scheduler", to_class=Scheduler)
         bind("deployer", to_class=Deployer)
+        if self.enable_deployment_watch and self.enable_resource_cache:
+            # the resource cache already watches Deployments
+            bind("deployment_watcher", to_class=CachedDeploymentWatcher)
+        elif self.enable_deployment_watch:
+            bind("deployment_watcher", to_class=DeploymentWatcher)
+        else:
+            bind("deployment_watcher", to_class=DisabledDeploymentWatcher)
 
 
 DeployerEvent = namedtuple("DeployerEvent", ["action", "app_spec", "lifecycle_subject"])
@@ -17,9 +17,11 @@
 
 
 import logging
+import zlib
 from queue import Queue
 
 from k8s.client import K8sClientException
+from prometheus_client import Gauge
 from requests.exceptions import RetryError
 
 from fiaas_deploy_daemon.config import Configuration
@@ -31,11 +33,16 @@ from ..base_thread import DaemonThread
 from ..log_extras import set_extras
 from ..specs.models import AppSpec
 from .bookkeeper import Bookkeeper
+from .deploy_queue import DeployQueue
+from .kubernetes.deployment_watcher import DeploymentWatcher
 from .kubernetes.ready_check import ReadyCheck
 from .scheduler import Scheduler
 
 LOG = logging.getLogger(__name__)
 
+deployer_workers = Gauge("fiaas_deployer_workers", "Number of threads deploying applications")
+deployer_busy_workers = Gauge("fiaas_deployer_busy_workers", "Number of threads currently deploying an application")
+
 
 class Deployer(DaemonThread):
     """Take incoming AppSpecs and use the framework-adapter to deploy the app
@@ -44,7 +51,15 @@ class Deployer(DaemonThread):
     """
 
     def __init__(
-        self, deploy_queue: Queue, bookkeeper, adapter, scheduler: Scheduler, lifecycle, ingress_adapter, config
+        self,
+        deploy_queue: Queue,
+        bookkeeper,
+        adapter,
+        scheduler: Scheduler,
+        lifecycle,
+        ingress_adapter,
+        config,
+        deployment_watcher,
     ):
         super(Deployer, self).__init__()
         self._queue = _make_gen(deploy_queue.get)
@@ -54,15 +69,33 @@ class Deployer(DaemonThread):
         self._lifecycle: Lifecycle = lifecycle
         self._ingress_adapter: IngressAdapterInterface = ingress_adapter
         self._config: Configuration = config
+        self._deployment_watcher: DeploymentWatcher = deployment_watcher
+        self._workers = []
 
     def __call__(self):
+        self._start_workers()
         for event in self._queue:
-            set_extras(event.app_spec)
-            LOG.info("Received %r for %s", event.app_spec, event.action)
-            if event.action == "UPDATE":
-                self._update(event.app_spec, event.lifecycle_subject)
-            else:
+            if event.action != "UPDATE":
                 raise ValueError("Unknown DeployerEvent action {}".format(event.action))
+            if self._workers:
+                # events for the same application always go to the same worker, which handles them in order
+                key = "{}/{}".format(event.app_spec.namespace, event.app_spec.name)
+                self._workers[zlib.crc32(key.encode("utf-8")) % len(self._workers)].put(event)
+            else:
+                self._handle(event)
+
+    def _start_workers(self):
+        if self._config.deploy_workers > 1 and not self._workers:
+            self._workers = [DeployWorker(self, i) for i in range(self._config.deploy_workers)]
+            for worker in self._workers:
+                worker.start()
+        deployer_workers.set(max(1, len(self._workers)))
+
+    def _handle(self, event):
+        set_extras(event.app_spec)
+        LOG.info("Received %r for %s", event.app_spec, event.action)
+        with deployer_busy_workers.track_inprogress():
+            self._update(event.app_spec, event.lifecycle_subject)
 
     def _update(self, app_spec: AppSpec, lifecycle_subject: Subject):
         try:
@@ -70,16 +103,17 @@ class Deployer(DaemonThread):
             with self._bookkeeper.time(app_spec):
                 self._adapter.deploy(app_spec)
             if app_spec.name != "fiaas-deploy-daemon":
-                self._scheduler.add(
-                    ReadyCheck(
-                        app_spec,
-                        self._bookkeeper,
-                        self._lifecycle,
-                        lifecycle_subject,
-                        self._ingress_adapter,
-                        self._config,
-                    )
+                ready_check = ReadyCheck(
+                    app_spec,
+                    self._bookkeeper,
+                    self._lifecycle,
+                    lifecycle_subject,
+                    self._ingress_adapter,
+                    self._config,
+                    self._deployment_watcher,
                 )
+                self._deployment_watcher.register(app_spec.name, app_spec.namespace, ready_check)
+                self._scheduler.add(ready_check)
             else:
                 self._lifecycle.success(lifecycle_subject)
                 self._bookkeeper.success(app_spec)
@@ -96,6 +130,26 @@ class Deployer(DaemonThread):
             self._bookkeeper.failed(app_spec)
 
 
+class DeployWorker(DaemonThread):
+    """Handle the deploy events the Deployer assigns to this worker, one at a time"""
+
+    def __init__(self, deployer, index):
+        self._index = index
+        super(DeployWorker, self).__init__()
+        self._deployer = deployer
+        self._queue = DeployQueue(deployer._lifecycle, "worker")
+
+    def _make_name(self):
+        return "{}-{}".format(self.__class__.__name__, self._index)
+
+    def put(self, event):
+        self._queue.put(event)
+
+    def __call__(self):
+        for event in _make_gen(self._queue.get):
+            self._deployer._handle(event)
+
+
 def _make_gen(func):
     while True:
         yield func()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+from collections import deque
+from queue import Queue
+from time import monotonic as time_monotonic
+
+from k8s.client import K8sClientException
+from prometheus_client import Counter, Histogram
+from requests.exceptions import RetryError
+
+from ..lifecycle import Lifecycle
+
+LOG = logging.getLogger(__name__)
+
+deploy_queue_wait = Histogram(
+    "fiaas_deploy_queue_wait_seconds", "Time a deploy event waited in a queue before being handled", ["queue"]
+)
+deploy_queue_superseded = Counter(
+    "fiaas_deploy_queue_superseded", "Deploy events replaced by a newer event for the same application", ["queue"]
+)
+
+
+class DeployQueue(Queue):
+    """Queue of DeployerEvents which only keeps the latest event for each application
+
+    When an event arrives for an application which already has an event waiting in the queue, the waiting event is
+    replaced by the new one, keeping its place in the queue. The deploy of the replaced event is marked as superseded.
+    The queue also measures how long each event waits before it is taken from the queue.
+    """
+
+    def __init__(self, lifecycle, name="deploy", time_func=time_monotonic):
+        super(DeployQueue, self).__init__()
+        self._lifecycle: Lifecycle = lifecycle
+        self._name = name
+        self._wait_histogram = deploy_queue_wait.labels(name)
+        self._superseded_counter = deploy_queue_superseded.labels(name)
+        self._time_func = time_func
+
+    def put(self, item, block=True, timeout=None):
+        # The queue is unbounded, so put never blocks. A replaced event is never taken from the queue, so only events
+        # which got their own place in the queue are counted as unfinished tasks.
+        with self.not_full:
+            superseded = self._put(item)
+            if superseded is None:
+                self.unfinished_tasks += 1
+                self.not_empty.notify()
+        # signal outside of the queue lock, as the status updates triggered by the signal call the API
+        if superseded is not None:
+            self._supersede(superseded, item)
+
+    def _supersede(self, event, newer_event):
+        LOG.info(
+            "Deploy of %s with deployment_id %s superseded by deployment_id %s",
+            event.app_spec.name,
+            event.app_spec.deployment_id,
+            newer_event.app_spec.deployment_id,
+        )
+        self._superseded_counter.inc()
+        if event.lifecycle_subject is None or event.app_spec.deployment_id == newer_event.app_spec.deployment_id:
+            return
+        try:
+            self._lifecycle.superseded(event.lifecycle_subject)
+        except (K8sClientException, RetryError):
+            # K8sClientException: any unhandled server or client error (non-200 responses).
+            # RetryError: request which received server error (e.g. 409 or 5xx response) was retried, and
+            # exponential retries were exhausted.
+            LOG.exception("Error while saving status for %s: ", event.app_spec.name)
+
+    def _init(self, maxsize):
+        # self.queue holds the keys of the waiting events in order, the events themselves are in self._events
+        self.queue = deque()
+        self._events = {}
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        """Add item to the queue, returning the waiting event it replaced, or None"""
+        key = (item.app_spec.namespace, item.app_spec.name)
+        if key in self._events:
+            enqueued_at, waiting = self._events[key]
+            self._events[key] = (enqueued_at, item)
+            return waiting
+        self.queue.append(key)
+        self._events[key] = (self._time_func(), item)
+        return None
+
+    def _get(self):
+        enqueued_at, item = self._events.pop(self.queue.popleft())
+        self._wait_histogram.observe(self._time_func() - enqueued_at)
+        return item
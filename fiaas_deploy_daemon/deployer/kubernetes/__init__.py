@@ -27,6 +27,9 @@ from .ingress_networkingv1 import NetworkingV1IngressAdapter
 from .service import ServiceDeployer
 from .service_account import ServiceAccountDeployer
 from .owner_references import OwnerReferences
+from .resource_cache import DisabledResourceCache, ResourceCache
+from .resource_client import ResourceClient
+from .resourcequota_cache import ResourceQuotaCache
 from .role_binding import RoleBindingDeployer
 from .pod_disruption_budget import PodDisruptionBudgetDeployer
 from k8s.models.ingress import IngressTLS as V1Beta1IngressTLS
@@ -34,8 +37,9 @@ from k8s.models.networking_v1_ingress import IngressTLS as StableIngressTLS
 
 
 class K8sAdapterBindings(pinject.BindingSpec):
-    def __init__(self, use_networkingv1_ingress):
+    def __init__(self, use_networkingv1_ingress, enable_resource_cache=False):
         self.use_networkingv1_ingress = use_networkingv1_ingress
+        self.enable_resource_cache = enable_resource_cache
 
     def configure(self, bind):
         bind("adapter", to_class=K8s)
@@ -47,6 +51,12 @@ class K8sAdapterBindings(pinject.BindingSpec):
         bind("owner_references", to_class=OwnerReferences)
         bind("pod_disruption_budget_deployer", to_class=PodDisruptionBudgetDeployer)
         bind("role_binding_deployer", to_class=RoleBindingDeployer)
+        bind("resourcequota_cache", to_class=ResourceQuotaCache)
+        bind("resource_client", to_class=ResourceClient)
+        if self.enable_resource_cache:
+            bind("resource_cache", to_class=ResourceCache)
+        else:
+            bind("resource_cache", to_class=DisabledResourceCache)
 
         if self.use_networkingv1_ingress:
             bind("ingress_adapter", to_class=NetworkingV1IngressAdapter)
@@ -16,10 +16,17 @@
 # limitations under the License.
 
 
+import functools
 import logging
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
 
-from k8s.models.resourcequota import ResourceQuota, NotBestEffort
+from k8s.client import ClientError
+from k8s.models.resourcequota import NotBestEffort
 
+from ...extension_hook_caller import ExtensionHookCaller
+from ...log_extras import set_extras
 from ...specs.models import AppSpec, ResourcesSpec, ResourceRequirementSpec
 
 from .autoscaler import AutoscalerDeployer
@@ -28,10 +35,15 @@ from .ingress import IngressDeployer
 from .service import ServiceDeployer
 from .service_account import ServiceAccountDeployer
 from .pod_disruption_budget import PodDisruptionBudgetDeployer
+from .resourcequota_cache import ResourceQuotaCache
 from .role_binding import RoleBindingDeployer
 
 LOG = logging.getLogger(__name__)
 
+# A step deploys one kind of resource, once the steps it must come after have completed. Steps which can render their
+# objects before saving them have the extension hook called for all their objects together, before any are saved.
+Step = namedtuple("Step", ["name", "deploy", "after", "render", "save"], defaults=(None, None))
+
 
 class K8s(object):
     """Adapt from an AppSpec to the necessary definitions for a kubernetes cluster"""
@@ -39,7 +51,7 @@ class K8s(object):
     def __init__(
         self, config, service_deployer, deployment_deployer, ingress_deployer,
         autoscaler, service_account_deployer, pod_disruption_budget_deployer,
-        role_binding_deployer
+        role_binding_deployer, resourcequota_cache, extension_hook
     ):
         self._version = config.version
         self._enable_service_account_per_app = config.enable_service_account_per_app
@@ -50,20 +62,101 @@ class K8s(object):
         self._service_account_deployer: ServiceAccountDeployer = service_account_deployer
         self._pod_disruption_budget_deployer: PodDisruptionBudgetDeployer = pod_disruption_budget_deployer
         self._role_binding_deployer: RoleBindingDeployer = role_binding_deployer
+        self._resourcequota_cache: ResourceQuotaCache = resourcequota_cache
+        self._extension_hook: ExtensionHookCaller = extension_hook
+        self._executor = None
+        if config.resource_deploy_workers > 1:
+            self._executor = ThreadPoolExecutor(config.resource_deploy_workers, thread_name_prefix="ResourceDeployer")
 
     def deploy(self, app_spec: AppSpec):
-        if _besteffort_qos_is_required(app_spec):
+        besteffort_qos_is_required = self._besteffort_qos_is_required(app_spec)
+        if besteffort_qos_is_required:
             app_spec = _remove_resource_requirements(app_spec)
         selector = _make_selector(app_spec)
         labels = self._make_labels(app_spec)
+        steps = self._make_steps(app_spec, selector, labels, besteffort_qos_is_required)
+        rendered = self._render(app_spec, steps)
+        self._extension_hook.apply_all(list(chain.from_iterable(rendered.values())), app_spec)
+        if self._executor:
+            self._deploy_in_parallel(app_spec, steps, rendered)
+        else:
+            for step in steps:
+                _run_step(app_spec, step, rendered)
+
+    def _render(self, app_spec: AppSpec, steps):
+        """Render the objects of all steps that can, before anything is saved"""
+        steps = [step for step in steps if step.render is not None]
+        if self._executor:
+            objects = self._executor.map(functools.partial(_render_step, app_spec), steps)
+        else:
+            objects = (step.render() for step in steps)
+        return {step.name: list(objs) for step, objs in zip(steps, objects)}
+
+    def _make_steps(self, app_spec: AppSpec, selector, labels, besteffort_qos_is_required):
+        steps = []
+        # Pods of the Deployment can not be created before the ServiceAccount they use exists
+        after_service_account = ()
         if self._enable_service_account_per_app is True:
-            self._service_account_deployer.deploy(app_spec, labels)
-            self._role_binding_deployer.deploy(app_spec, labels)
-        self._service_deployer.deploy(app_spec, selector, labels)
-        self._ingress_deployer.deploy(app_spec, labels)
-        self._deployment_deployer.deploy(app_spec, selector, labels, _besteffort_qos_is_required(app_spec))
-        self._autoscaler_deployer.deploy(app_spec, labels)
-        self._pod_disruption_budget_deployer.deploy(app_spec, selector, labels)
+            steps.append(
+                Step("service_account", functools.partial(self._service_account_deployer.deploy, app_spec, labels), ())
+            )
+            after_service_account = ("service_account",)
+            steps.append(
+                Step(
+                    "role_binding",
+                    functools.partial(self._role_binding_deployer.deploy, app_spec, labels),
+                    after_service_account,
+                )
+            )
+        steps.append(_rendered_step("service", self._service_deployer, (), app_spec, selector, labels))
+        steps.append(_rendered_step("ingress", self._ingress_deployer, (), app_spec, labels))
+        steps.append(
+            _rendered_step(
+                "deployment",
+                self._deployment_deployer,
+                after_service_account,
+                app_spec,
+                selector,
+                labels,
+                besteffort_qos_is_required,
+            )
+        )
+        # The autoscaler scales the Deployment, and the Deployment keeps the replicas set by the autoscaler
+        steps.append(_rendered_step("autoscaler", self._autoscaler_deployer, ("deployment",), app_spec, labels))
+        steps.append(
+            _rendered_step("pod_disruption_budget", self._pod_disruption_budget_deployer, (), app_spec, selector, labels)
+        )
+        return steps
+
+    def _deploy_in_parallel(self, app_spec: AppSpec, steps, rendered):
+        """Run each step as soon as the steps it comes after have completed
+
+        If a step fails, no more steps are started, and the error is raised once the running steps have completed.
+        """
+        waiting = list(steps)
+        running = {}
+        completed = set()
+        error = None
+        while waiting or running:
+            if error is None:
+                for step in [step for step in waiting if completed.issuperset(step.after)]:
+                    waiting.remove(step)
+                    running[self._executor.submit(_run_step, app_spec, step, rendered)] = step
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                if future.exception() is None:
+                    completed.add(step.name)
+                elif error is None:
+                    error = future.exception()
+        if error is not None:
+            raise error
+
+    def _besteffort_qos_is_required(self, app_spec: AppSpec):
+        resourcequotas = self._resourcequota_cache.list(app_spec.namespace)
+        return any(rq.spec.hard.get("pods") == "0" and NotBestEffort in rq.spec.scopes for rq in resourcequotas)
 
     def _make_labels(self, app_spec: AppSpec):
         labels = {
@@ -89,6 +182,37 @@ def _to_valid_label_value(value):
     return value.lower().replace(" ", "-").replace("ø", "oe").replace("å", "aa").replace("æ", "ae").replace(":", "-")
 
 
+def _rendered_step(name, deployer, after, *args):
+    # render and save take the same arguments as deploy, and save is also given the rendered objects
+    return Step(
+        name,
+        functools.partial(deployer.deploy, *args),
+        after,
+        functools.partial(deployer.render, *args),
+        functools.partial(deployer.save, *args),
+    )
+
+
+def _render_step(app_spec: AppSpec, step):
+    set_extras(app_spec)
+    return step.render()
+
+
+def _run_step(app_spec: AppSpec, step, rendered):
+    set_extras(app_spec)
+    if step.save is None:
+        step.deploy()
+        return
+    try:
+        step.save(rendered[step.name])
+    except ClientError as e:
+        if e.response is None or e.response.status_code != 409:
+            raise
+        # The resource changed after it was rendered, so it is rendered and saved again, retrying further conflicts
+        LOG.info("Conflict saving %s of %s, deploying it again", step.name, app_spec.name)
+        step.deploy()
+
+
 def _make_selector(app_spec: AppSpec):
     return {"app": app_spec.name}
 
@@ -96,8 +220,3 @@ def _make_selector(app_spec: AppSpec):
 def _remove_resource_requirements(app_spec: AppSpec):
     no_requirements = ResourceRequirementSpec(cpu=None, memory=None)
     return app_spec._replace(resources=ResourcesSpec(limits=no_requirements, requests=no_requirements))
-
-
-def _besteffort_qos_is_required(app_spec: AppSpec):
-    resourcequotas = ResourceQuota.list(namespace=app_spec.namespace)
-    return any(rq.spec.hard.get("pods") == "0" and NotBestEffort in rq.spec.scopes for rq in resourcequotas)
@@ -29,13 +29,21 @@ LOG = logging.getLogger(__name__)
 
 
 class AutoscalerDeployer(object):
-    def __init__(self, owner_references, extension_hook):
+    def __init__(self, owner_references, extension_hook, resource_client):
         self.name = "autoscaler"
         self._owner_references = owner_references
         self._extension_hook = extension_hook
+        self._resource_client = resource_client
 
     @retry_on_upsert_conflict
     def deploy(self, app_spec, labels):
+        autoscalers = self.render(app_spec, labels)
+        for autoscaler in autoscalers:
+            self._extension_hook.apply(autoscaler, app_spec)
+        self.save(app_spec, labels, autoscalers)
+
+    def render(self, app_spec, labels):
+        """Make the autoscaler of the application, without calling the extension hook or saving it"""
         if should_have_autoscaler(app_spec):
             LOG.info("Creating/updating %s for %s", self.name, app_spec.name)
             custom_labels = merge_dicts(app_spec.labels.horizontal_pod_autoscaler, labels)
@@ -52,11 +60,16 @@ class AutoscalerDeployer(object):
                 maxReplicas=app_spec.autoscaler.max_replicas,
                 targetCPUUtilizationPercentage=app_spec.autoscaler.cpu_threshold_percentage,
             )
-            autoscaler = HorizontalPodAutoscaler.get_or_create(metadata=metadata, spec=spec)
+            autoscaler = self._resource_client.get_or_create(HorizontalPodAutoscaler, metadata=metadata, spec=spec)
             self._owner_references.apply(autoscaler, app_spec)
-            self._extension_hook.apply(autoscaler, app_spec)
-            autoscaler.save()
-        else:
+            return [autoscaler]
+        return []
+
+    def save(self, app_spec, labels, autoscalers):
+        """Save the rendered autoscaler, or delete it if the application should not have one"""
+        for autoscaler in autoscalers:
+            self._resource_client.save(autoscaler)
+        if not autoscalers:
             self._delete(app_spec)
 
     def _delete(self, app_spec):
@@ -58,6 +58,7 @@ from fiaas_deploy_daemon.deployer.kubernetes.deployment.datadog import DataDog
 from fiaas_deploy_daemon.deployer.kubernetes.deployment.prometheus import Prometheus
 from fiaas_deploy_daemon.deployer.kubernetes.deployment.secrets import Secrets
 from fiaas_deploy_daemon.deployer.kubernetes.owner_references import OwnerReferences
+from fiaas_deploy_daemon.deployer.kubernetes.resource_client import ResourceClient
 from fiaas_deploy_daemon.extension_hook_caller import ExtensionHookCaller
 from fiaas_deploy_daemon.retry import retry_on_upsert_conflict
 from fiaas_deploy_daemon.tools import merge_dicts
@@ -70,13 +71,21 @@ class DeploymentDeployer(object):
     DATADOG_PRE_STOP_DELAY = 5
 
     def __init__(
-        self, config: Configuration, datadog, prometheus, deployment_secrets, owner_references, extension_hook
+        self,
+        config: Configuration,
+        datadog,
+        prometheus,
+        deployment_secrets,
+        owner_references,
+        extension_hook,
+        resource_client,
     ):
         self._datadog: DataDog = datadog
         self._prometheus: Prometheus = prometheus
         self._secrets: Secrets = deployment_secrets
         self._owner_references: OwnerReferences = owner_references
         self._extension_hook: ExtensionHookCaller = extension_hook
+        self._resource_client: ResourceClient = resource_client
         self._pre_stop_delay = config.pre_stop_delay
         self._legacy_fiaas_env = _build_fiaas_env(config)
         self._global_env = _build_global_env(config.global_env)
@@ -96,6 +105,13 @@ class DeploymentDeployer(object):
 
     @retry_on_upsert_conflict(max_value_seconds=5, max_tries=5)
     def deploy(self, app_spec, selector, labels, besteffort_qos_is_required):
+        deployments = self.render(app_spec, selector, labels, besteffort_qos_is_required)
+        for deployment in deployments:
+            self._extension_hook.apply(deployment, app_spec)
+        self.save(app_spec, selector, labels, besteffort_qos_is_required, deployments)
+
+    def render(self, app_spec, selector, labels, besteffort_qos_is_required):
+        """Make the Deployment of the application, without calling the extension hook or saving it"""
         LOG.info("Creating new deployment for %s", app_spec.name)
         deployment_labels = merge_dicts(app_spec.labels.deployment, labels)
         metadata = ObjectMeta(
@@ -157,7 +173,7 @@ class DeploymentDeployer(object):
         # we must avoid that the deployment scales up to app_spec.autoscaler.min_replicas if autoscaler has set another value
         if should_have_autoscaler(app_spec):
             try:
-                deployment = Deployment.get(app_spec.name, app_spec.namespace)
+                deployment = self._resource_client.get(Deployment, app_spec.name, app_spec.namespace)
                 # the autoscaler won't scale up the deployment if the current number of replicas is 0
                 if deployment.spec.replicas > 0:
                     replicas = deployment.spec.replicas
@@ -186,15 +202,19 @@ class DeploymentDeployer(object):
             strategy=deployment_strategy,
         )
 
-        deployment = Deployment.get_or_create(metadata=metadata, spec=spec)
+        deployment = self._resource_client.get_or_create(Deployment, metadata=metadata, spec=spec)
         self._datadog.apply(
             deployment, app_spec, besteffort_qos_is_required, self._pre_stop_delay + self.DATADOG_PRE_STOP_DELAY
         )
         self._prometheus.apply(deployment, app_spec)
         self._secrets.apply(deployment, app_spec)
         self._owner_references.apply(deployment, app_spec)
-        self._extension_hook.apply(deployment, app_spec)
-        deployment.save()
+        return [deployment]
+
+    def save(self, app_spec, selector, labels, besteffort_qos_is_required, deployments):
+        """Save the rendered Deployment"""
+        for deployment in deployments:
+            self._resource_client.save(deployment)
 
     def _make_volumes(self, app_spec):
         volumes = []
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from collections import defaultdict
+
+from k8s.base import WatchEvent
+from k8s.models.deployment import Deployment
+from k8s.watcher import Watcher
+from prometheus_client import Counter, Gauge
+
+from ...base_thread import DaemonThread
+from ...config import Configuration
+from ...retry import watch_forever
+from ..scheduler import Scheduler
+
+deployment_watch_events = Counter("fiaas_deployment_watch_events", "Deployment watch events received", ["type"])
+deployment_watch_cached = Gauge("fiaas_deployment_watch_cached", "Number of Deployments in the watch cache")
+deployment_watch_pending = Gauge(
+    "fiaas_deployment_watch_pending_checks", "Number of ready checks waiting for Deployment changes"
+)
+
+
+class DeploymentWatcher(DaemonThread):
+    """Keep track of fiaas-managed Deployments and notify pending ready checks when they change
+
+    A single watch on Deployments labeled with `fiaas/deployment_id` keeps an up-to-date copy of each Deployment.
+    Ready checks read the Deployment from here instead of getting it from the API, and whenever a Deployment changes,
+    the ready checks registered for it are executed right away instead of waiting for their next scheduled run.
+    """
+
+    def __init__(self, config: Configuration, scheduler: Scheduler):
+        super(DeploymentWatcher, self).__init__()
+        self._watcher = Watcher(Deployment)
+        self._namespace = None if config.enable_deprecated_multi_namespace_support else config.namespace
+        self._lock = threading.Lock()
+        self._deployments = {}
+        self._ready_checks = PendingReadyChecks(scheduler)
+
+    def __call__(self):
+        watch_forever(self._watch, "Deployments")
+
+    def _watch(self):
+        for event in self._watcher.watch(namespace=self._namespace):
+            self._handle_watch_event(event)
+
+    def _handle_watch_event(self, event: WatchEvent):
+        deployment = event.object
+        if not _is_managed(deployment):
+            return
+        deployment_watch_events.labels(event.type).inc()
+        key = (deployment.metadata.name, deployment.metadata.namespace)
+        with self._lock:
+            if event.type == WatchEvent.DELETED:
+                self._deployments.pop(key, None)
+            else:
+                self._deployments[key] = deployment
+            deployment_watch_cached.set(len(self._deployments))
+        self._ready_checks.changed(*key)
+
+    def get(self, name, namespace):
+        """Return the latest seen version of a Deployment, or None if it has not been seen"""
+        with self._lock:
+            return self._deployments.get((name, namespace))
+
+    def register(self, name, namespace, task):
+        """Execute task as soon as the named Deployment changes, until it is unregistered"""
+        self._ready_checks.register(name, namespace, task)
+
+    def unregister(self, name, namespace, task):
+        self._ready_checks.unregister(name, namespace, task)
+
+
+class CachedDeploymentWatcher(object):
+    """Used instead of the DeploymentWatcher when the resource cache is enabled
+
+    The resource cache already watches Deployments, so Deployments are read from there, and the ready checks are
+    notified of the changes seen by the resource cache, instead of watching and keeping the Deployments twice.
+    """
+
+    def __init__(self, scheduler: Scheduler, resource_cache):
+        self._resource_cache = resource_cache
+        self._ready_checks = PendingReadyChecks(scheduler)
+        resource_cache.add_listener(Deployment, self._handle_watch_event)
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def _handle_watch_event(self, event: WatchEvent):
+        deployment = event.object
+        if not _is_managed(deployment):
+            return
+        deployment_watch_events.labels(event.type).inc()
+        self._ready_checks.changed(deployment.metadata.name, deployment.metadata.namespace)
+
+    def get(self, name, namespace):
+        deployment = self._resource_cache.get(Deployment, name, namespace)
+        return deployment if deployment is not None and _is_managed(deployment) else None
+
+    def register(self, name, namespace, task):
+        self._ready_checks.register(name, namespace, task)
+
+    def unregister(self, name, namespace, task):
+        self._ready_checks.unregister(name, namespace, task)
+
+
+class PendingReadyChecks(object):
+    """Ready checks registered for Deployments, which are executed right away when their Deployment changes"""
+
+    def __init__(self, scheduler: Scheduler):
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._pending = defaultdict(list)
+
+    def changed(self, name, namespace):
+        with self._lock:
+            tasks = list(self._pending.get((name, namespace), ()))
+        for task in tasks:
+            self._scheduler.run_now(task)
+
+    def register(self, name, namespace, task):
+        with self._lock:
+            self._pending[(name, namespace)].append(task)
+            deployment_watch_pending.inc()
+
+    def unregister(self, name, namespace, task):
+        key = (name, namespace)
+        with self._lock:
+            tasks = [t for t in self._pending.get(key, ()) if t is not task]
+            if len(tasks) < len(self._pending.get(key, ())):
+                deployment_watch_pending.dec()
+            if tasks:
+                self._pending[key] = tasks
+            else:
+                self._pending.pop(key, None)
+
+
+class DisabledDeploymentWatcher(object):
+    """Used when the Deployment watch is disabled, making ready checks get Deployments from the API"""
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def get(self, name, namespace):
+        return None
+
+    def register(self, name, namespace, task):
+        pass
+
+    def unregister(self, name, namespace, task):
+        pass
+
+
+def _is_managed(deployment):
+    return "fiaas/deployment_id" in (deployment.metadata.labels or {})
@@ -45,6 +45,14 @@ class IngressAdapterInterface(ABC):
     def create_ingress(self, app_spec: AppSpec, annotated_ingress: AnnotatedIngress, labels: dict[str, str]):
         ...
 
+    @abstractmethod
+    def render_ingress(self, app_spec: AppSpec, annotated_ingress: AnnotatedIngress, labels: dict[str, str]):
+        ...
+
+    @abstractmethod
+    def save_ingress(self, ingress):
+        ...
+
     @abstractmethod
     def delete_unused(self, app_spec: AppSpec, labels: dict[str, str]):
         ...
@@ -80,10 +88,31 @@ class IngressDeployer(object):
         else:
             self._ingress_adapter.delete_unused(app_spec, labels)
 
+    def render(self, app_spec, labels):
+        """Make the ingresses of the application, without calling the extension hook or saving them"""
+        if not self._should_have_ingress(app_spec):
+            return []
+        custom_labels = merge_dicts(app_spec.labels.ingress, labels)
+        return [
+            self._ingress_adapter.render_ingress(app_spec, annotated_ingress, custom_labels)
+            for annotated_ingress in self._annotated_ingresses(app_spec)
+        ]
+
+    def save(self, app_spec, labels, ingresses):
+        """Save the rendered ingresses, and delete the ingresses of earlier deployments"""
+        for ingress in ingresses:
+            self._ingress_adapter.save_ingress(ingress)
+        self._ingress_adapter.delete_unused(app_spec, labels)
+
     def _create(self, app_spec, labels):
-        LOG.info("Creating/updating ingresses for %s", app_spec.name)
         custom_labels = merge_dicts(app_spec.labels.ingress, labels)
+        for annotated_ingress in self._annotated_ingresses(app_spec):
+            self._ingress_adapter.create_ingress(app_spec, annotated_ingress, custom_labels)
+
+        self._ingress_adapter.delete_unused(app_spec, custom_labels)
 
+    def _annotated_ingresses(self, app_spec):
+        LOG.info("Creating/updating ingresses for %s", app_spec.name)
         ingresses = self._group_ingresses(app_spec)
 
         LOG.info("Will create %s ingresses", len(ingresses))
@@ -92,9 +121,7 @@ class IngressDeployer(object):
                 LOG.info("No items, skipping: %s", annotated_ingress)
                 continue
 
-            self._ingress_adapter.create_ingress(app_spec, annotated_ingress, custom_labels)
-
-        self._ingress_adapter.delete_unused(app_spec, custom_labels)
+            yield annotated_ingress
 
     def _expand_default_hosts(self, app_spec):
         all_pathmappings = list(
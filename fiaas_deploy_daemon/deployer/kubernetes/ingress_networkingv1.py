@@ -39,13 +39,19 @@ from .ingress import IngressAdapterInterface, IngressTLSDeployer, deduplicate_in
 
 
 class NetworkingV1IngressAdapter(IngressAdapterInterface):
-    def __init__(self, ingress_tls_deployer, owner_references, extension_hook):
+    def __init__(self, ingress_tls_deployer, owner_references, extension_hook, resource_client):
         self._ingress_tls_deployer: IngressTLSDeployer = ingress_tls_deployer
         self._owner_references: OwnerReferences = owner_references
         self._extension_hook: ExtensionHookCaller = extension_hook
+        self._resource_client = resource_client
 
     @retry_on_upsert_conflict
     def create_ingress(self, app_spec, annotated_ingress, labels):
+        ingress = self.render_ingress(app_spec, annotated_ingress, labels)
+        self._extension_hook.apply(ingress, app_spec)
+        self.save_ingress(ingress)
+
+    def render_ingress(self, app_spec, annotated_ingress, labels):
         default_annotations = {"fiaas/expose": "true" if annotated_ingress.explicit_host else "false"}
         annotations = merge_dicts(app_spec.annotations.ingress, annotated_ingress.annotations, default_annotations)
 
@@ -67,7 +73,7 @@ class NetworkingV1IngressAdapter(IngressAdapterInterface):
 
         ingress_spec = IngressSpec(rules=per_host_ingress_rules)
 
-        ingress = Ingress.get_or_create(metadata=metadata, spec=ingress_spec)
+        ingress = self._resource_client.get_or_create(Ingress, metadata=metadata, spec=ingress_spec)
 
         hosts_for_tls = [rule.host for rule in per_host_ingress_rules]
         self._ingress_tls_deployer.apply(
@@ -79,8 +85,10 @@ class NetworkingV1IngressAdapter(IngressAdapterInterface):
             use_suffixes=use_suffixes,
         )
         self._owner_references.apply(ingress, app_spec)
-        self._extension_hook.apply(ingress, app_spec)
-        ingress.save()
+        return ingress
+
+    def save_ingress(self, ingress):
+        self._resource_client.save(ingress)
 
     def delete_unused(self, app_spec, labels):
         filter_labels = [
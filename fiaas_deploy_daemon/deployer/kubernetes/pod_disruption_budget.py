@@ -30,18 +30,24 @@ LOG = logging.getLogger(__name__)
 
 
 class PodDisruptionBudgetDeployer(object):
-    def __init__(self, owner_references, extension_hook, config):
+    def __init__(self, owner_references, extension_hook, config, resource_client):
         self._owner_references = owner_references
         self._extension_hook = extension_hook
+        self._resource_client = resource_client
         self.max_unavailable = config.pdb_max_unavailable
         self.unhealthy_pod_eviction_policy = config.pdb_unhealthy_pod_eviction_policy
 
     @retry_on_upsert_conflict
     def deploy(self, app_spec: AppSpec, selector: dict[str, any], labels: dict[str, any]):
+        pdbs = self.render(app_spec, selector, labels)
+        for pdb in pdbs:
+            self._extension_hook.apply(pdb, app_spec)
+        self.save(app_spec, selector, labels, pdbs)
+
+    def render(self, app_spec: AppSpec, selector: dict[str, any], labels: dict[str, any]):
+        """Make the podDisruptionBudget of the application, without calling the extension hook or saving it"""
         if app_spec.autoscaler.min_replicas <= 1 or app_spec.autoscaler.max_replicas <= 1:
-            # delete possible existing pdb
-            self.delete(app_spec)
-            return
+            return []
 
         custom_labels = labels
         custom_labels = merge_dicts(app_spec.labels.pod_disruption_budget, custom_labels)
@@ -63,11 +69,17 @@ class PodDisruptionBudgetDeployer(object):
             unhealthyPodEvictionPolicy=self.unhealthy_pod_eviction_policy
         )
 
-        pdb = PodDisruptionBudget.get_or_create(metadata=metadata, spec=spec)
+        pdb = self._resource_client.get_or_create(PodDisruptionBudget, metadata=metadata, spec=spec)
 
         self._owner_references.apply(pdb, app_spec)
-        self._extension_hook.apply(pdb, app_spec)
-        pdb.save()
+        return [pdb]
+
+    def save(self, app_spec: AppSpec, selector: dict[str, any], labels: dict[str, any], pdbs):
+        """Save the rendered podDisruptionBudget, or delete any existing one if the application should not have one"""
+        for pdb in pdbs:
+            self._resource_client.save(pdb)
+        if not pdbs:
+            self.delete(app_spec)
 
     def delete(self, app_spec):
         LOG.info("Deleting podDisruptionBudget for %s", app_spec.name)
@@ -30,7 +30,7 @@ LOG = logging.getLogger(__name__)
 
 
 class ReadyCheck(object):
-    def __init__(self, app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config):
+    def __init__(self, app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher):
         self._app_spec = app_spec
         self._bookkeeper = bookkeeper
         self._lifecycle = lifecycle
@@ -43,8 +43,18 @@ class ReadyCheck(object):
         self._fail_after = time_monotonic() + self._fail_after_seconds
         self._should_check_ingress = config.tls_certificate_ready
         self._ingress_adapter: IngressAdapterInterface = ingress_adapter
+        self._deployment_watcher = deployment_watcher
 
     def __call__(self):
+        check_again = False
+        try:
+            check_again = self._check()
+        finally:
+            if not check_again:
+                self._deployment_watcher.unregister(self._app_spec.name, self._app_spec.namespace, self)
+        return check_again
+
+    def _check(self):
         if self._ready():
             self._lifecycle.success(self._lifecycle_subject)
             self._bookkeeper.success(self._app_spec)
@@ -61,9 +71,14 @@ class ReadyCheck(object):
         return True
 
     def _deployment_ready(self):
-        try:
-            dep = Deployment.get(self._app_spec.name, self._app_spec.namespace)
-        except NotFound:
+        dep = self._deployment_watcher.get(self._app_spec.name, self._app_spec.namespace)
+        if dep is None:
+            try:
+                dep = Deployment.get(self._app_spec.name, self._app_spec.namespace)
+            except NotFound:
+                return False
+        elif dep.metadata.labels.get("fiaas/deployment_id") != self._app_spec.deployment_id:
+            # the watch has not yet delivered the Deployment for this deploy, the one seen is from an earlier deploy
             return False
         expected_value = dep.spec.replicas if dep.spec.replicas > 0 else None
 
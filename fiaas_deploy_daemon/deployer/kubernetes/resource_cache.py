@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from time import monotonic as time_monotonic
+
+from k8s.base import APIServerError, SyntheticAddedWatchEvent, WatchEvent
+from k8s.models.autoscaler import HorizontalPodAutoscaler
+from k8s.models.deployment import Deployment
+from k8s.models.ingress import Ingress as V1Beta1Ingress
+from k8s.models.networking_v1_ingress import Ingress as NetworkingV1Ingress
+from k8s.models.policy_v1_pod_disruption_budget import PodDisruptionBudget
+from k8s.models.role_binding import RoleBinding
+from k8s.models.service import Service
+from k8s.models.service_account import ServiceAccount
+from prometheus_client import Counter, Gauge, Histogram
+
+from ...base_thread import DaemonThread
+from ...config import Configuration
+from ...retry import watch_forever
+
+LOG = logging.getLogger(__name__)
+
+resource_cache_objects = Gauge("fiaas_resource_cache_objects", "Number of resources in the resource cache", ["kind"])
+resource_cache_bytes = Gauge(
+    "fiaas_resource_cache_bytes", "Approximate memory used by resources in the resource cache", ["kind"]
+)
+resource_cache_requests = Counter(
+    "fiaas_resource_cache_requests", "Lookups in the resource cache, by result (hit or miss)", ["kind", "result"]
+)
+resource_cache_sync_lag = Histogram(
+    "fiaas_resource_cache_sync_lag_seconds",
+    "Time from writing a resource until the resource cache has seen it",
+    ["kind"],
+)
+
+
+class ResourceCache(object):
+    """Keep an up-to-date copy of the resources deployed for applications
+
+    Each kind of resource is listed and then watched in a separate thread. The deployers read resources from here
+    instead of getting them from the API before every write. Only resources with an `app` label are kept, which is the
+    label used to find the resources belonging to an application, in addition to the default ServiceAccount, which is
+    read when creating ServiceAccounts for applications.
+
+    Until the initial list of a kind has been received, and for resources that are not found in the cache, lookups
+    return None and the caller gets the resource from the API instead.
+    """
+
+    def __init__(self, config: Configuration, time_func=time_monotonic):
+        namespace = None if config.enable_deprecated_multi_namespace_support else config.namespace
+        ingress = NetworkingV1Ingress if config.use_networkingv1_ingress else V1Beta1Ingress
+        models = (
+            Deployment,
+            Service,
+            ingress,
+            HorizontalPodAutoscaler,
+            PodDisruptionBudget,
+            ServiceAccount,
+            RoleBinding,
+        )
+        self._stores = {model: ResourceStore(model, namespace, time_func) for model in models}
+
+    def start(self):
+        for store in self._stores.values():
+            store.start()
+
+    def is_alive(self):
+        return all(store.is_alive() for store in self._stores.values())
+
+    def get(self, cls, name, namespace):
+        """Return a copy of the named resource, or None if it is not in the cache"""
+        store = self._stores.get(cls)
+        return store.get(name, namespace) if store else None
+
+    def find(self, cls, name, namespace):
+        """Return copies of the resources labeled with `app=<name>`, or None if the cache is not ready"""
+        store = self._stores.get(cls)
+        return store.find(name, namespace) if store else None
+
+    def add_listener(self, cls, listener):
+        """Call listener with every change to resources of a kind seen by the cache
+
+        Returns False if the kind is not cached, in which case the listener is never called.
+        """
+        store = self._stores.get(cls)
+        if store is None:
+            return False
+        store.add_listener(listener)
+        return True
+
+    def written(self, instance):
+        """Update the cache with a resource that has just been written to the API"""
+        store = self._stores.get(type(instance))
+        if store:
+            store.written(instance)
+
+    def invalidate(self, instance):
+        """Remove a resource that turned out to be out of date, so that it is read from the API the next time"""
+        store = self._stores.get(type(instance))
+        if store:
+            store.invalidate(instance)
+
+
+class ResourceStore(DaemonThread):
+    """List and watch one kind of resource, keeping the latest version of each resource
+
+    Resources are kept serialized, both to hand out independent copies and to keep track of the memory used. Listeners
+    are called with each watch event that changes the store, and with an ADDED event for each resource when all
+    resources are listed.
+    """
+
+    def __init__(self, model, namespace, time_func=time_monotonic, sleep_func=time.sleep):
+        self._model = model
+        super(ResourceStore, self).__init__()
+        self._namespace = namespace
+        self._time_func = time_func
+        self._sleep_func = sleep_func
+        self._kind = model.__name__
+        self._lock = threading.Lock()
+        self._synced = False
+        self._resources = defaultdict(dict)
+        self._written = {}
+        self._bytes = 0
+        self._listeners = []
+
+    def _make_name(self):
+        return "{}-{}".format(self.__class__.__name__, self._model.__name__)
+
+    def __call__(self):
+        watch_forever(self._list_and_watch, self._kind, sleep_func=self._sleep_func, time_func=self._time_func)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _list_and_watch(self):
+        model_list = self._model.list_with_meta(namespace=self._namespace)
+        self._replace(model_list.items)
+        resource_version = model_list.metadata.resourceVersion
+        while True:
+            try:
+                for event in self._model.watch_list(
+                    namespace=self._namespace, resource_version=resource_version, allow_bookmarks=True
+                ):
+                    resource_version = event.resource_version
+                    if event.has_object():
+                        self._handle_watch_event(event)
+            except APIServerError as e:
+                # 410 Gone means that the resource version is too old to resume the watch from, so list again
+                if e.api_error["code"] == 410:
+                    LOG.info("Resource version of %s watch expired, listing again", self._kind)
+                    return
+                raise
+
+    def _replace(self, resources):
+        relevant = [resource for resource in resources if _is_relevant(resource)]
+        with self._lock:
+            self._resources.clear()
+            self._written.clear()
+            self._bytes = 0
+            for resource in relevant:
+                self._store(resource)
+            self._synced = True
+            self._update_metrics()
+        LOG.info("Listed %d %s resources", len(resources), self._kind)
+        for resource in relevant:
+            self._notify(SyntheticAddedWatchEvent(resource))
+
+    def _handle_watch_event(self, event: WatchEvent):
+        resource = event.object
+        if not _is_relevant(resource):
+            return
+        key = (resource.metadata.namespace, resource.metadata.name)
+        with self._lock:
+            written = self._written.get(key)
+            if written:
+                # Events for a resource arrive in order, so events older than our own write are skipped. A write that
+                # changed nothing keeps its resourceVersion and produces no event, so any event that is not older
+                # ends the wait for our write, whether it is for our write or a later change.
+                written_version, written_at = written
+                if _is_older(resource.metadata.resourceVersion, written_version):
+                    return
+                del self._written[key]
+                if resource.metadata.resourceVersion == written_version:
+                    resource_cache_sync_lag.labels(self._kind).observe(self._time_func() - written_at)
+            if event.type == WatchEvent.DELETED:
+                self._remove(*key)
+            else:
+                self._store(resource)
+            self._update_metrics()
+        self._notify(event)
+
+    def _notify(self, event):
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                LOG.exception("Error in listener for changes on %s", self._kind)
+
+    def get(self, name, namespace):
+        with self._lock:
+            entry = self._resources.get(namespace, {}).get(name)
+        if entry is None:
+            resource_cache_requests.labels(self._kind, "miss").inc()
+            return None
+        resource_cache_requests.labels(self._kind, "hit").inc()
+        labels, serialized = entry
+        return self._model.from_dict(json.loads(serialized))
+
+    def find(self, name, namespace):
+        with self._lock:
+            if not self._synced:
+                resource_cache_requests.labels(self._kind, "miss").inc()
+                return None
+            found = [
+                serialized
+                for labels, serialized in self._resources.get(namespace, {}).values()
+                if labels.get("app") == name
+            ]
+        resource_cache_requests.labels(self._kind, "hit").inc()
+        return [self._model.from_dict(json.loads(serialized)) for serialized in found]
+
+    def written(self, instance):
+        key = (instance.metadata.namespace, instance.metadata.name)
+        with self._lock:
+            self._written[key] = (instance.metadata.resourceVersion, self._time_func())
+            self._store(instance)
+            self._update_metrics()
+
+    def invalidate(self, instance):
+        key = (instance.metadata.namespace, instance.metadata.name)
+        with self._lock:
+            self._written.pop(key, None)
+            self._remove(*key)
+            self._update_metrics()
+
+    def _store(self, resource):
+        self._remove(resource.metadata.namespace, resource.metadata.name)
+        serialized = json.dumps(resource.as_dict())
+        labels = dict(resource.metadata.labels or {})
+        self._resources[resource.metadata.namespace][resource.metadata.name] = (labels, serialized)
+        self._bytes += len(serialized)
+
+    def _remove(self, namespace, name):
+        resources = self._resources.get(namespace)
+        if not resources:
+            return
+        removed = resources.pop(name, None)
+        if removed:
+            self._bytes -= len(removed[1])
+        if not resources:
+            del self._resources[namespace]
+
+    def _update_metrics(self):
+        resource_cache_objects.labels(self._kind).set(sum(len(r) for r in self._resources.values()))
+        resource_cache_bytes.labels(self._kind).set(self._bytes)
+
+
+class DisabledResourceCache(object):
+    """Used when the resource cache is disabled, making the deployers get resources from the API"""
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def get(self, cls, name, namespace):
+        return None
+
+    def find(self, cls, name, namespace):
+        return None
+
+    def add_listener(self, cls, listener):
+        return False
+
+    def written(self, instance):
+        pass
+
+    def invalidate(self, instance):
+        pass
+
+
+def _is_older(version, than):
+    # Resource versions are meant to be opaque, but the API server uses increasing integers. If they are not
+    # integers, the event is not known to be older, so it is not skipped.
+    try:
+        return int(version) < int(than)
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_relevant(resource):
+    if "app" in (resource.metadata.labels or {}):
+        return True
+    return isinstance(resource, ServiceAccount) and resource.metadata.name == "default"
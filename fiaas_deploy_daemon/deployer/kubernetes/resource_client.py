@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import threading
+from collections import OrderedDict
+
+from k8s.base import Model
+from k8s.client import Client, ClientError, NotFound
+from k8s.fields import OnceField, ReadOnlyField
+from k8s.models.common import ObjectMeta
+from prometheus_client import Counter
+
+from ...config import Configuration
+from ...tools import digest
+
+LOG = logging.getLogger(__name__)
+
+DESIRED_STATE_HASH = "fiaas/desired-state-hash"
+FIELD_MANAGER = "fiaas-deploy-daemon"
+APPLY_PATCH_CONTENT_TYPE = "application/apply-patch+yaml"
+JSON_PATCH_CONTENT_TYPE = "application/json-patch+json"
+# Live resources that are read but never saved are dropped from the remembered hashes once there are this many
+MAX_REMEMBERED = 10000
+# Metadata set by the API server, which an apply must not send, as it would make the apply a conditional update
+SERVER_METADATA = frozenset(field.name for field in ObjectMeta._meta.fields if isinstance(field, ReadOnlyField)) | {
+    "managedFields"
+}
+
+resource_writes_performed = Counter(
+    "fiaas_resource_writes_performed", "Number of resources written to the API server", ["kind"]
+)
+resource_writes_skipped = Counter(
+    "fiaas_resource_writes_skipped",
+    "Number of resource writes skipped because the desired state was unchanged",
+    ["kind"],
+)
+
+
+class ResourceClient(object):
+    """Read and write the resources managed for an application
+
+    Resources are read from the resource cache when they are found there, and from the API otherwise.
+
+    When skipping of unchanged writes is enabled, a hash of the desired state of each resource is stored in an
+    annotation when it is written. The deployers read the live resource through this client, which remembers the hash
+    stored on it, and if the desired state is unchanged when the resource is saved again, the write is skipped.
+
+    When server-side apply is enabled, the live resource is not read before it is written. Instead the desired state
+    is sent in a single apply PATCH, and the API server merges it with the fields owned by others. Server-side apply
+    takes precedence over skipping unchanged writes, since the API server does not persist an apply that changes
+    nothing.
+
+    Fields of resources written with PUT before server-side apply was enabled are owned by the manager of those
+    updates. An apply would only share ownership of them, so fields left out of later applies would never be removed.
+    The first apply to such a resource therefore moves the fields of the update manager to the apply manager, and
+    applies again, which removes the fields the desired state no longer has.
+    """
+
+    def __init__(self, config: Configuration, resource_cache):
+        self._resource_cache = resource_cache
+        self._server_side_apply = config.enable_server_side_apply
+        self._skip_unchanged = config.skip_unchanged_writes and not self._server_side_apply
+        self._client = Client()
+        self._lock = threading.Lock()
+        self._live_hashes = OrderedDict()
+
+    def get(self, cls, name, namespace):
+        instance = self._resource_cache.get(cls, name, namespace)
+        if instance is None:
+            instance = cls.get(name, namespace)
+        self._remember(instance)
+        return instance
+
+    def find(self, cls, name, namespace):
+        instances = self._resource_cache.find(cls, name, namespace)
+        if instances is None:
+            instances = cls.find(name=name, namespace=namespace)
+        for instance in instances:
+            self._remember(instance)
+        return instances
+
+    def get_or_create(self, cls, **kwargs):
+        if self._server_side_apply:
+            return cls(new=True, **kwargs)
+        metadata = kwargs["metadata"]
+        instance = self._resource_cache.get(cls, metadata.name, metadata.namespace)
+        if instance is None:
+            if not self._skip_unchanged:
+                return cls.get_or_create(**kwargs)
+            try:
+                instance = cls.get(metadata.name, metadata.namespace)
+            except NotFound:
+                return cls(new=True, **kwargs)
+        self._remember(instance)
+        for field in cls._meta.fields:
+            field.set(instance, kwargs)
+        return instance
+
+    def save(self, instance):
+        kind = type(instance).__name__
+        if self._skip_unchanged:
+            live_hash = self._forget(instance)
+            desired_hash = desired_state_hash(instance)
+            annotations = instance.metadata.annotations or {}
+            annotations[DESIRED_STATE_HASH] = desired_hash
+            instance.metadata.annotations = annotations
+            if not instance._new and live_hash == desired_hash:
+                LOG.debug("Skipping write of unchanged %s %s", kind, instance.metadata.name)
+                resource_writes_skipped.labels(kind).inc()
+                return
+        try:
+            # Resources created with generateName have no name to apply to, so they are always created with a POST
+            if self._server_side_apply and instance.metadata.name:
+                self._apply(instance)
+            else:
+                instance.save()
+        except (ClientError, NotFound) as e:
+            # A conflict or a missing resource means that the cached copy was out of date
+            if e.response is not None and e.response.status_code in (404, 409):
+                self._resource_cache.invalidate(instance)
+            raise
+        self._resource_cache.written(instance)
+        resource_writes_performed.labels(kind).inc()
+
+    def forget(self, instance):
+        """Drop what is remembered about a resource that was read, but will not be saved"""
+        self._forget(instance)
+
+    def _apply(self, instance):
+        body = instance.as_dict()
+        body.pop("status", None)
+        if "metadata" in body:
+            body["metadata"] = {k: v for k, v in body["metadata"].items() if k not in SERVER_METADATA}
+        body["apiVersion"] = _api_version(type(instance))
+        body["kind"] = type(instance).__name__
+        url = instance._build_url(name=instance.metadata.name, namespace=instance.metadata.namespace)
+        live = self._apply_patch(url, body)
+        if self._take_over_updated_fields(url, live):
+            live = self._apply_patch(url, body)
+        instance.update_from_dict(live)
+        instance._new = False
+
+    def _apply_patch(self, url, body):
+        resp = self._client._call(
+            "PATCH",
+            url,
+            body,
+            headers={"Content-Type": APPLY_PATCH_CONTENT_TYPE},
+            params={"fieldManager": FIELD_MANAGER, "force": "true"},
+        )
+        return resp.json()
+
+    def _take_over_updated_fields(self, url, live):
+        """Move the fields owned by earlier PUTs of fiaas-deploy-daemon to the apply manager
+
+        Returns True if ownership was moved, and the resource should be applied again.
+        """
+        metadata = live.get("metadata") or {}
+        managed_fields = metadata.get("managedFields") or []
+        update_manager = _update_manager()
+        updated = [entry for entry in managed_fields if _is_entry(entry, update_manager, "Update")]
+        applied = [entry for entry in managed_fields if _is_entry(entry, FIELD_MANAGER, "Apply")]
+        if not updated or not applied:
+            return False
+        fields = applied[0].get("fieldsV1") or {}
+        for entry in updated:
+            fields = _merge_fields(fields, entry.get("fieldsV1") or {})
+        taken_over = [
+            dict(entry, fieldsV1=fields) if entry is applied[0] else entry
+            for entry in managed_fields
+            if not any(entry is u for u in updated)
+        ]
+        patch = [
+            # only replace the managed fields the apply responded with, as they may have changed since
+            {"op": "test", "path": "/metadata/resourceVersion", "value": metadata.get("resourceVersion")},
+            {"op": "replace", "path": "/metadata/managedFields", "value": taken_over},
+        ]
+        try:
+            self._client._call("PATCH", url, patch, headers={"Content-Type": JSON_PATCH_CONTENT_TYPE})
+        except ClientError as e:
+            if e.response is None or e.response.status_code not in (409, 422):
+                raise
+            LOG.info(
+                "%s changed while taking over fields from %s, trying again on the next deploy", url, update_manager
+            )
+            return False
+        LOG.info("Took over ownership of fields of %s from %s", url, update_manager)
+        return True
+
+    def _remember(self, instance):
+        if not self._skip_unchanged:
+            return
+        live_hash = (instance.metadata.annotations or {}).get(DESIRED_STATE_HASH)
+        key = _key(instance)
+        with self._lock:
+            self._live_hashes[key] = live_hash
+            self._live_hashes.move_to_end(key)
+            while len(self._live_hashes) > MAX_REMEMBERED:
+                self._live_hashes.popitem(last=False)
+
+    def _forget(self, instance):
+        with self._lock:
+            return self._live_hashes.pop(_key(instance), None)
+
+
+def desired_state_hash(instance):
+    """Hash the fields of a resource that are set by the client
+
+    Read-only fields are set by the API server, and fields that can only be set on creation are left out, since
+    they never change after the resource has been created. The hash annotation itself is left out as well.
+    """
+    state = _desired_state(instance)
+    annotations = state.get("metadata", {}).get("annotations")
+    if annotations:
+        annotations.pop(DESIRED_STATE_HASH, None)
+    return digest(state)
+
+
+def _desired_state(value):
+    if isinstance(value, Model):
+        return {
+            field.name: _desired_state(getattr(value, field.attr_name))
+            for field in value._meta.fields
+            if not isinstance(field, (ReadOnlyField, OnceField))
+        }
+    if isinstance(value, list):
+        return [_desired_state(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _desired_state(v) for k, v in value.items() if v is not None}
+    return value
+
+
+def _update_manager():
+    # The API server names the manager of a write without fieldManager by the first part of the User-Agent
+    return Client._session.headers.get("User-Agent", "").split("/")[0]
+
+
+def _is_entry(entry, manager, operation):
+    # Entries for subresources like status are written by others, and are left alone
+    return entry.get("manager") == manager and entry.get("operation") == operation and not entry.get("subresource")
+
+
+def _merge_fields(fields, other):
+    """Merge two field sets in the fieldsV1 format of managedFields"""
+    merged = dict(fields)
+    for key, value in other.items():
+        merged[key] = _merge_fields(merged[key], value) if key in merged else value
+    return merged
+
+
+def _api_version(cls):
+    # url templates are either /api/<version>/... for the core group, or /apis/<group>/<version>/...
+    parts = cls._meta.url_template.split("/")
+    if parts[1] == "api":
+        return parts[2]
+    return "{}/{}".format(parts[2], parts[3])
+
+
+def _key(instance):
+    return type(instance).__name__, instance.metadata.namespace, instance.metadata.name
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from time import monotonic as time_monotonic
+
+from k8s.models.resourcequota import ResourceQuota
+from prometheus_client import Counter
+
+resourcequota_cache_lookups = Counter(
+    "fiaas_resourcequota_cache_lookups", "Lookups of ResourceQuotas in the cache, misses list them again", ["result"]
+)
+
+
+class ResourceQuotaCache(object):
+    """Keep the ResourceQuotas of each namespace for a while, as they rarely change
+
+    The ResourceQuotas of a namespace are listed again when they were last listed more than the configured TTL ago.
+    """
+
+    def __init__(self, config, time_func=time_monotonic):
+        self._ttl = config.resourcequota_cache_ttl
+        self._time_func = time_func
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def list(self, namespace):
+        now = self._time_func()
+        with self._lock:
+            listed_at, resourcequotas = self._cache.get(namespace, (None, None))
+        if listed_at is not None and now - listed_at < self._ttl:
+            resourcequota_cache_lookups.labels("hit").inc()
+            return resourcequotas
+        resourcequota_cache_lookups.labels("miss").inc()
+        resourcequotas = ResourceQuota.list(namespace=namespace)
+        with self._lock:
+            self._cache[namespace] = (now, resourcequotas)
+        return resourcequotas
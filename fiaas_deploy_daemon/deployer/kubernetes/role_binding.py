@@ -4,14 +4,16 @@ from k8s.models.common import ObjectMeta
 from k8s.models.role_binding import RoleBinding, RoleRef, Subject
 from fiaas_deploy_daemon.specs.models import AppSpec
 from fiaas_deploy_daemon.deployer.kubernetes.owner_references import OwnerReferences
+from fiaas_deploy_daemon.deployer.kubernetes.resource_client import ResourceClient
 from fiaas_deploy_daemon.tools import merge_dicts
 
 LOG = logging.getLogger(__name__)
 
 
 class RoleBindingDeployer:
-    def __init__(self, config, owner_references):
+    def __init__(self, config, owner_references, resource_client):
         self._owner_references: OwnerReferences = owner_references
+        self._resource_client: ResourceClient = resource_client
         self._list_of_roles = config.list_of_roles
         self._list_of_cluster_roles = config.list_of_cluster_roles
 
@@ -21,7 +23,7 @@ class RoleBindingDeployer:
         custom_labels = merge_dicts(app_spec.labels.role_binding, custom_labels)
         custom_annotations = merge_dicts(app_spec.annotations.role_binding, custom_annotations)
         # Getting list of rolebindings with the label app=app_name
-        role_bindings = RoleBinding.find(name=app_spec.name, namespace=app_spec.namespace)
+        role_bindings = self._resource_client.find(RoleBinding, app_spec.name, app_spec.namespace)
         self._clean_not_needed_role_bindings(role_bindings)
         self._update_or_create_role_bindings(app_spec, self._list_of_roles, "Role", custom_annotations, custom_labels, role_bindings)
         self._update_or_create_role_bindings(app_spec, self._list_of_cluster_roles, "ClusterRole", custom_annotations, custom_labels,
@@ -71,7 +73,7 @@ class RoleBindingDeployer:
         role_binding.roleRef = role_ref
         role_binding.subjects = [subject]
         self._owner_references.apply(role_binding, app_spec)
-        role_binding.save()
+        self._resource_client.save(role_binding)
 
     def _find_role_in_role_bindings(self, role_kind, role_name, role_bindings: list[RoleBinding]):
         for role_binding in role_bindings:
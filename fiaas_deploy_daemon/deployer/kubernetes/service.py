@@ -30,15 +30,30 @@ LOG = logging.getLogger(__name__)
 
 
 class ServiceDeployer(object):
-    def __init__(self, config, owner_references, extension_hook):
+    def __init__(self, config, owner_references, extension_hook, resource_client):
         self._service_type = config.service_type
         self._owner_references = owner_references
         self._extension_hook = extension_hook
+        self._resource_client = resource_client
 
+    @retry_on_upsert_conflict
     def deploy(self, app_spec, selector, labels):
+        services = self.render(app_spec, selector, labels)
+        for svc in services:
+            self._extension_hook.apply(svc, app_spec)
+        self.save(app_spec, selector, labels, services)
+
+    def render(self, app_spec, selector, labels):
+        """Make the Service of the application, without calling the extension hook or saving it"""
         if self._should_have_service(app_spec):
-            self._create(app_spec, selector, labels)
-        else:
+            return [self._make_service(app_spec, selector, labels)]
+        return []
+
+    def save(self, app_spec, selector, labels, services):
+        """Save the rendered Service, or delete it if the application should not have one"""
+        for svc in services:
+            self._resource_client.save(svc)
+        if not services:
             self._delete(app_spec)
 
     def _delete(self, app_spec):
@@ -48,12 +63,11 @@ class ServiceDeployer(object):
         except NotFound:
             pass
 
-    @retry_on_upsert_conflict
-    def _create(self, app_spec, selector, labels):
+    def _make_service(self, app_spec, selector, labels):
         LOG.info("Creating/updating service for %s with labels: %s", app_spec.name, labels)
         ports = [self._make_service_port(port_spec) for port_spec in app_spec.ports]
         try:
-            svc = Service.get(app_spec.name, app_spec.namespace)
+            svc = self._resource_client.get(Service, app_spec.name, app_spec.namespace)
             ports = self._merge_ports(svc.spec.ports, ports)
         except NotFound:
             pass
@@ -64,10 +78,9 @@ class ServiceDeployer(object):
             name=service_name, namespace=app_spec.namespace, labels=custom_labels, annotations=custom_annotations
         )
         spec = ServiceSpec(selector=selector, ports=ports, type=self._service_type)
-        svc = Service.get_or_create(metadata=metadata, spec=spec)
+        svc = self._resource_client.get_or_create(Service, metadata=metadata, spec=spec)
         self._owner_references.apply(svc, app_spec)
-        self._extension_hook.apply(svc, app_spec)
-        svc.save()
+        return svc
 
     @staticmethod
     def _merge_ports(existing_ports, wanted_ports):
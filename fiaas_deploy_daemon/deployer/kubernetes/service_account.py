@@ -23,6 +23,7 @@ from k8s.models.common import ObjectMeta
 from k8s.models.service_account import ServiceAccount
 
 from fiaas_deploy_daemon.deployer.kubernetes.owner_references import OwnerReferences
+from fiaas_deploy_daemon.deployer.kubernetes.resource_client import ResourceClient
 from fiaas_deploy_daemon.retry import retry_on_upsert_conflict
 from fiaas_deploy_daemon.specs.models import AppSpec
 from fiaas_deploy_daemon.tools import merge_dicts
@@ -31,8 +32,9 @@ LOG = logging.getLogger(__name__)
 
 
 class ServiceAccountDeployer(object):
-    def __init__(self, config, owner_references):
+    def __init__(self, config, owner_references, resource_client):
         self._owner_references: OwnerReferences = owner_references
+        self._resource_client: ResourceClient = resource_client
 
     def deploy(self, app_spec: AppSpec, labels):
         self._create(app_spec, labels)
@@ -51,7 +53,7 @@ class ServiceAccountDeployer(object):
             name=service_account_name, namespace=namespace, labels=custom_labels, annotations=custom_annotations
         )
         try:
-            service_account = ServiceAccount.get(service_account_name, namespace)
+            service_account = self._resource_client.get(ServiceAccount, service_account_name, namespace)
             if not self._owned_by_fiaas(service_account):
                 LOG.info("Found serviceAccount %s not managed by us.", service_account_name)
                 LOG.info(
@@ -59,21 +61,23 @@ class ServiceAccountDeployer(object):
                     service_account_name,
                     labels,
                 )
+                self._resource_client.forget(service_account)
                 return
         except NotFound:
             service_account = ServiceAccount()
 
         image_pull_secrets = []
         try:
-            default_service_account = ServiceAccount.get("default", namespace)
+            default_service_account = self._resource_client.get(ServiceAccount, "default", namespace)
             image_pull_secrets = default_service_account.imagePullSecrets
+            self._resource_client.forget(default_service_account)
         except NotFound:
             LOG.info("No default service account found in namespace: %s", namespace)
 
         service_account.metadata = metadata
         service_account.imagePullSecrets = image_pull_secrets
         self._owner_references.apply(service_account, app_spec)
-        service_account.save()
+        self._resource_client.save(service_account)
 
     def _owned_by_fiaas(self, service_account):
         return any(
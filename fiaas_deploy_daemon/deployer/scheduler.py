@@ -14,47 +14,236 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import heapq
+import itertools
 import logging
-import time
-from queue import PriorityQueue
+import threading
+from queue import Queue
 from time import monotonic as time_monotonic
 from typing import Callable
 
 from k8s.client import K8sClientException
+from prometheus_client import Counter, Gauge, Histogram
 from requests.exceptions import RetryError
 
 from ..base_thread import DaemonThread
 
 LOG = logging.getLogger(__name__)
 
+# Hung workers are abandoned rather than stopped, so their threads are only released when the task returns
+MAX_ABANDONED_WORKERS = 10
+
+scheduler_pending_tasks = Gauge("fiaas_scheduler_pending_tasks", "Number of tasks waiting to be executed")
+scheduler_due_tasks = Gauge("fiaas_scheduler_due_tasks", "Number of tasks found due in the latest scheduler pass")
+scheduler_task_lateness = Histogram(
+    "fiaas_scheduler_task_lateness_seconds", "Time from when a task was due until it was executed"
+)
+scheduler_task_duration = Histogram("fiaas_scheduler_task_duration_seconds", "Time spent executing a task")
+scheduler_workers = Gauge("fiaas_scheduler_workers", "Number of worker threads in the scheduler pool")
+scheduler_busy_workers = Gauge("fiaas_scheduler_busy_workers", "Number of scheduler workers currently executing a task")
+scheduler_queued_tasks = Gauge("fiaas_scheduler_queued_tasks", "Number of due tasks waiting for a free worker")
+scheduler_task_timeouts = Counter(
+    "fiaas_scheduler_task_timeouts",
+    "Number of tasks that exceeded the task timeout, causing their worker to be replaced",
+)
+scheduler_abandoned_workers = Gauge(
+    "fiaas_scheduler_abandoned_workers", "Number of replaced workers whose threads are still executing a hung task"
+)
+
 
 class Scheduler(DaemonThread):
-    def __init__(self, time_func=time_monotonic, delay_func=time.sleep):
+    """Execute tasks when they are due
+
+    Tasks are kept in a heap ordered by when they should execute. The scheduler sleeps until the earliest task is due,
+    and runs every task that is due in a single pass. Adding a task that is due earlier than the current earliest task
+    wakes the scheduler up.
+
+    When configured with scheduler workers, due tasks are handed to a pool of worker threads instead of being executed
+    in the scheduler thread. A worker spending longer than the task timeout on a single task is abandoned and replaced,
+    so that a hanging task can't starve the rest of the pool. At most MAX_ABANDONED_WORKERS hung workers are abandoned
+    at any time; beyond that, hung workers are kept in the pool until an abandoned worker finishes its task. A worker
+    whose thread has died is replaced as well.
+    """
+
+    def __init__(self, config, time_func=time_monotonic):
         super(Scheduler, self).__init__()
-        self._tasks = PriorityQueue()
+        self._tasks = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
         self._time_func: Callable[[], float] = time_func
-        self._delay_func: Callable[[float], None] = delay_func
+        self._worker_count = config.scheduler_workers
+        self._task_timeout = config.scheduler_task_timeout
+        self._work_queue = Queue()
+        self._workers = []
+        self._abandoned_workers = []
+        self._workers_lock = threading.Lock()
+        self._worker_index = itertools.count()
 
     def __call__(self, *args, run_forever=True, **kwargs):
+        self._start_workers()
         while True:
-            execute_at, task = self._tasks.get()
-            if self._time_func() >= execute_at:
-                try:
-                    if task():
-                        self.add(task, 10)
-                except (K8sClientException, RetryError):
-                    # K8sClientException: any unhandled server or client error (non-200 responses).
-                    # RetryError: request which received server error (e.g. 409 or 5xx response) was retried, and
-                    # exponential retries were exhausted.
-                    LOG.exception("Error while processing task")
-            else:
-                self.add(task)
-            self._delay_func(1)
+            for execute_at, task in self._wait_for_due_tasks():
+                self._dispatch(execute_at, task)
             # the run_forever parameter is only to enable testing
             if not run_forever:
                 LOG.warning("breaking task processing loop because run_forever=%s", run_forever)
                 break
 
+    def _start_workers(self):
+        with self._workers_lock:
+            while len(self._workers) < self._worker_count:
+                self._workers.append(self._new_worker())
+            self._update_pool_metrics()
+
+    def _new_worker(self):
+        worker = SchedulerWorker(self, next(self._worker_index))
+        worker.start()
+        return worker
+
+    def _wait_for_due_tasks(self):
+        with self._condition:
+            while True:
+                worker_deadline = self._replace_hung_workers()
+                now = self._time_func()
+                due_tasks = []
+                while self._tasks and self._tasks[0][0] <= now:
+                    execute_at, _, task = heapq.heappop(self._tasks)
+                    due_tasks.append((execute_at, task))
+                if due_tasks:
+                    scheduler_due_tasks.set(len(due_tasks))
+                    scheduler_pending_tasks.set(len(self._tasks))
+                    return due_tasks
+                deadlines = [d for d in (self._tasks[0][0] if self._tasks else None, worker_deadline) if d is not None]
+                timeout = max(0, min(deadlines) - now) if deadlines else None
+                self._condition.wait(timeout)
+
+    def _replace_hung_workers(self):
+        """Replace workers that have been busy with one task for longer than the task timeout
+
+        Returns the earliest point in time when one of the remaining busy workers will time out, or None if no workers
+        are busy.
+        """
+        if not self._worker_count:
+            return None
+        now = self._time_func()
+        earliest_deadline = None
+        with self._workers_lock:
+            self._abandoned_workers = [worker for worker in self._abandoned_workers if worker.started_at is not None]
+            for i, worker in enumerate(self._workers):
+                if not worker.is_alive():
+                    LOG.warning("%s has stopped, replacing it", worker.name)
+                    self._workers[i] = self._new_worker()
+                    continue
+                if worker.started_at is None:
+                    continue
+                deadline = worker.started_at + self._task_timeout
+                if deadline > now:
+                    if earliest_deadline is None or deadline < earliest_deadline:
+                        earliest_deadline = deadline
+                elif len(self._abandoned_workers) < MAX_ABANDONED_WORKERS:
+                    LOG.warning(
+                        "%s has been executing a task for more than %s seconds, replacing it",
+                        worker.name,
+                        self._task_timeout,
+                    )
+                    scheduler_task_timeouts.inc()
+                    worker.abandoned = True
+                    self._abandoned_workers.append(worker)
+                    self._workers[i] = self._new_worker()
+                else:
+                    # checked again when an abandoned worker finishes its task
+                    LOG.debug("%s is hung, but %d workers are abandoned already", worker.name, MAX_ABANDONED_WORKERS)
+            self._update_pool_metrics()
+        return earliest_deadline
+
+    def _update_pool_metrics(self):
+        scheduler_workers.set(len(self._workers))
+        scheduler_busy_workers.set(sum(1 for worker in self._workers if worker.started_at is not None))
+        scheduler_abandoned_workers.set(len(self._abandoned_workers))
+
+    def _dispatch(self, execute_at, task):
+        if self._worker_count:
+            self._work_queue.put((execute_at, task))
+            scheduler_queued_tasks.set(self._work_queue.qsize())
+        else:
+            self._execute(execute_at, task)
+
+    def _run_on_worker(self, worker):
+        execute_at, task = self._work_queue.get()
+        scheduler_queued_tasks.set(self._work_queue.qsize())
+        with self._workers_lock:
+            worker.started_at = self._time_func()
+            self._update_pool_metrics()
+        # make sure the scheduler knows when this task times out, even if it is waiting for a task due much later
+        with self._condition:
+            self._condition.notify()
+        try:
+            self._execute(execute_at, task)
+        except Exception:
+            # the exceptions _execute lets through would otherwise stop the worker
+            LOG.exception("Error while processing task")
+        finally:
+            with self._workers_lock:
+                worker.started_at = None
+                self._update_pool_metrics()
+            if worker.abandoned:
+                # room for abandoning another hung worker
+                with self._condition:
+                    self._condition.notify()
+
+    def _execute(self, execute_at, task):
+        scheduler_task_lateness.observe(max(0, self._time_func() - execute_at))
+        try:
+            with scheduler_task_duration.time():
+                if task():
+                    self.add(task, 10)
+        except (K8sClientException, RetryError):
+            # K8sClientException: any unhandled server or client error (non-200 responses).
+            # RetryError: request which received server error (e.g. 409 or 5xx response) was retried, and
+            # exponential retries were exhausted.
+            LOG.exception("Error while processing task")
+
     def add(self, task: Callable[[], bool], delay=1):
         execute_at = self._time_func() + delay
-        self._tasks.put((execute_at, task))
+        with self._condition:
+            # the sequence number keeps tasks due at the same time in insertion order, and avoids comparing tasks
+            heapq.heappush(self._tasks, (execute_at, next(self._sequence), task))
+            scheduler_pending_tasks.set(len(self._tasks))
+            if self._tasks[0][2] is task:
+                self._condition.notify()
+
+    def run_now(self, task: Callable[[], bool]):
+        """Make a task that is waiting in the scheduler due immediately
+
+        Does nothing if the task is not currently waiting to be executed.
+        """
+        now = self._time_func()
+        with self._condition:
+            for i, (execute_at, sequence, pending_task) in enumerate(self._tasks):
+                if pending_task is task:
+                    if execute_at > now:
+                        self._tasks[i] = (now, sequence, task)
+                        heapq.heapify(self._tasks)
+                        self._condition.notify()
+                    return
+
+
+class SchedulerWorker(DaemonThread):
+    """Execute due tasks handed over by the scheduler
+
+    A worker that has been abandoned by the scheduler exits as soon as it has finished the task it is working on.
+    """
+
+    def __init__(self, scheduler, index):
+        self._index = index
+        super(SchedulerWorker, self).__init__()
+        self._scheduler = scheduler
+        self.started_at = None
+        self.abandoned = False
+
+    def _make_name(self):
+        return "{}-{}".format(self.__class__.__name__, self._index)
+
+    def __call__(self, *args, **kwargs):
+        while not self.abandoned:
+            self._scheduler._run_on_worker(self)
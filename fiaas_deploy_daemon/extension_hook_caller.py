@@ -14,30 +14,175 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import copy
 import json
 import logging
 import posixpath
+import threading
+import time
 import urllib.parse
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge
+
+from .tools import digest
 
 LOG = logging.getLogger(__name__)
 
+extension_hook_cache_lookups = Counter(
+    "fiaas_extension_hook_cache_lookups", "Lookups of extension hook results in the cache", ["result"]
+)
+extension_hook_cache_size = Gauge("fiaas_extension_hook_cache_size", "Number of extension hook results in the cache")
+
+# Set by the API server, so they change between deploys without the hook caring about them
+_SERVER_METADATA = (
+    "creationTimestamp",
+    "deletionGracePeriodSeconds",
+    "deletionTimestamp",
+    "generation",
+    "resourceVersion",
+    "selfLink",
+    "uid",
+)
+
+_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+
 
 class ExtensionHookCaller(object):
     def __init__(self, config, session):
         self._url = config.extension_hook_url
         self._session = session
+        self._batch_supported = True
+        self._cache = None
+        if not config.disable_extension_hook_cache:
+            self._cache = ExtensionHookCache(config.extension_hook_cache_size, config.extension_hook_cache_ttl)
 
     def apply(self, obj, app_spec):
         if self._url is None:
             return obj
+        key = None
+        if self._cache is not None:
+            key = self._cache.key(obj, app_spec)
+            if self._cache.apply(key, obj):
+                return
+        self._apply_one(obj, app_spec)
+        if key is not None:
+            self._cache.put(key, obj)
+
+    def apply_all(self, objs, app_spec):
+        """Call the hook for all objects of a deploy, sending the ones not found in the cache in one request"""
+        if self._url is None:
+            return
+        keys = {}
+        if self._cache is not None:
+            for obj in objs:
+                key = self._cache.key(obj, app_spec)
+                if not self._cache.apply(key, obj):
+                    keys[id(obj)] = key
+            objs = [obj for obj in objs if id(obj) in keys]
+        if not objs:
+            return
+        self._apply_batch(objs, app_spec)
+        for obj in objs:
+            if id(obj) in keys:
+                self._cache.put(keys[id(obj)], obj)
+
+    def _apply_one(self, obj, app_spec):
         url = urllib.parse.urljoin(self._url, "fiaas/deploy/")
         url = posixpath.join(url, type(obj).__name__)
         dump = json.dumps({"object": obj.as_dict(), "application": app_spec.app_config})
-        response = self._session.post(
-            url, data=dump, headers={"Content-Type": "application/json", "Accept": "application/json"}
-        )
+        response = self._session.post(url, data=dump, headers=_HEADERS)
         if response.status_code == 200:
             data = response.json()
             obj.update_from_dict(data)
         elif response.status_code != 404:
             response.raise_for_status()
+
+    def _apply_batch(self, objs, app_spec):
+        """Send all objects to the hook in one request
+
+        The hook responds with a list of objects in the same order, where null means the object is left unchanged. A
+        hook responding 404 does not support batches, so it is called once per object from then on.
+        """
+        if not self._batch_supported:
+            for obj in objs:
+                self._apply_one(obj, app_spec)
+            return
+        url = urllib.parse.urljoin(self._url, "fiaas/deploy/batch")
+        dump = json.dumps(
+            {
+                "objects": [{"kind": type(obj).__name__, "object": obj.as_dict()} for obj in objs],
+                "application": app_spec.app_config,
+            }
+        )
+        response = self._session.post(url, data=dump, headers=_HEADERS)
+        if response.status_code == 200:
+            for obj, data in zip(objs, response.json()["objects"]):
+                if data is not None:
+                    obj.update_from_dict(data)
+        elif response.status_code == 404:
+            LOG.warning("Extension hook does not support batches, calling it once per object from now on")
+            self._batch_supported = False
+            for obj in objs:
+                self._apply_one(obj, app_spec)
+        else:
+            response.raise_for_status()
+
+
+class ExtensionHookCache(object):
+    """Keep the result of the extension hook for objects and application configs it has already been called with
+
+    The key leaves out the metadata set by the API server, and a cached result is applied with the current values of
+    those fields, so an unchanged object hits the cache on the next deploy even though it has been saved in between.
+    """
+
+    def __init__(self, max_size, ttl, time_func=time.monotonic):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._time_func = time_func
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    @staticmethod
+    def key(obj, app_spec):
+        return type(obj).__name__, digest(_without_server_fields(obj.as_dict() or {})), digest(app_spec.app_config)
+
+    def apply(self, key, obj):
+        """Update obj with the cached result for key, returning False if there is none"""
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and self._time_func() - entry[1] >= self._ttl:
+                del self._results[key]
+                extension_hook_cache_size.set(len(self._results))
+                entry = None
+            if entry is None:
+                extension_hook_cache_lookups.labels("miss").inc()
+                return False
+            self._results.move_to_end(key)
+            extension_hook_cache_lookups.labels("hit").inc()
+        result = copy.deepcopy(entry[0])
+        current = obj.as_dict() or {}
+        result.setdefault("metadata", {}).update(
+            (name, value) for name, value in current.get("metadata", {}).items() if name in _SERVER_METADATA
+        )
+        if "status" in current:
+            result["status"] = current["status"]
+        obj.update_from_dict(result)
+        return True
+
+    def put(self, key, obj):
+        result = _without_server_fields(copy.deepcopy(obj.as_dict() or {}))
+        with self._lock:
+            self._results[key] = (result, self._time_func())
+            self._results.move_to_end(key)
+            while len(self._results) > self._max_size:
+                self._results.popitem(last=False)
+            extension_hook_cache_size.set(len(self._results))
+
+
+def _without_server_fields(data):
+    data = dict(data)
+    data.pop("status", None)
+    if "metadata" in data:
+        data["metadata"] = {name: value for name, value in data["metadata"].items() if name not in _SERVER_METADATA}
+    return data
@@ -24,10 +24,13 @@ STATUS_FAILED = "failed"
 STATUS_STARTED = "started"
 STATUS_SUCCESS = "success"
 STATUS_INITIATED = "initiated"
+STATUS_SUPERSEDED = "superseded"
 
 
 Subject = namedtuple(
-    "Subject", ("uid", "app_name", "namespace", "deployment_id", "repository", "labels", "annotations")
+    "Subject",
+    ("uid", "app_name", "namespace", "deployment_id", "repository", "labels", "annotations", "generation"),
+    defaults=(None,),
 )
 
 
@@ -38,9 +41,9 @@ class Lifecycle(object):
         self.state_change_signal.send(status=status, subject=subject)
 
     def initiate(
-        self, uid, app_name, namespace, deployment_id, repository=None, labels=None, annotations=None
+        self, uid, app_name, namespace, deployment_id, repository=None, labels=None, annotations=None, generation=None
     ) -> Subject:
-        subject = Subject(uid, app_name, namespace, deployment_id, repository, labels, annotations)
+        subject = Subject(uid, app_name, namespace, deployment_id, repository, labels, annotations, generation)
         self.state_change_signal.send(status=STATUS_INITIATED, subject=subject)
         return subject
 
@@ -52,3 +55,6 @@ class Lifecycle(object):
 
     def failed(self, subject: Subject):
         self.change(STATUS_FAILED, subject)
+
+    def superseded(self, subject: Subject):
+        self.change(STATUS_SUPERSEDED, subject)
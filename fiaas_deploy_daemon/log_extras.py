@@ -15,12 +15,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import time
 import traceback
 import threading
-from collections import defaultdict
+from collections import OrderedDict, deque
+
+from prometheus_client import Counter, Gauge
+
+MAX_LINES_PER_DEPLOYMENT = 1000
+MAX_BYTES = 64 * 1024 * 1024
+TTL_SECONDS = 3600
+
+log_capture_bytes = Gauge(
+    "fiaas_log_capture_bytes", "Size of the log lines captured for deployment statuses", ["store"]
+)
+log_capture_evicted = Counter(
+    "fiaas_log_capture_evicted", "Captured logs of deployments evicted before they were finished", ["store", "reason"]
+)
+log_capture_lines_dropped = Counter(
+    "fiaas_log_capture_lines_dropped", "Captured log lines dropped because a deployment had too many lines", ["store"]
+)
 
-_LOGS = defaultdict(list)
-_ERROR_LOGS = defaultdict(list)
 _LOG_EXTRAS = threading.local()
 _LOG_FORMAT = (
     "[%(asctime)s|%(levelname)7s] %(message)s " "[%(name)s|%(threadName)s|%(extras_namespace)s/%(extras_app_name)s]"
@@ -29,6 +44,9 @@ _LOG_FORMAT = (
 
 class ExtraFilter(logging.Filter):
     def filter(self, record):
+        if hasattr(record, "extras"):
+            # Already added by a filter in the thread that logged the record
+            return 1
         extras = {}
         for key in ("app_name", "namespace", "deployment_id"):
             extras[key] = getattr(_LOG_EXTRAS, key, "")
@@ -41,16 +59,36 @@ class ExtraErrorFilter(logging.Filter):
         return record.levelno >= logging.ERROR
 
 
+class DeploymentContextFilter(logging.Filter):
+    """Skip records logged outside of a deployment before they are formatted, since they are never saved"""
+
+    def filter(self, record):
+        return 1 if record.extras["deployment_id"] else 0
+
+
 class StatusFormatter(logging.Formatter):
+    """Format records for the status of a deployment, once per record
+
+    The formatted record is kept on the record, so the status handlers share it. The exception is formatted by
+    this formatter alone, leaving the full traceback cached on the record for other handlers.
+    """
+
     def __init__(self):
         super(StatusFormatter, self).__init__(_LOG_FORMAT, None)
 
     def format(self, record):
-        # clear the cached rendered exception if it's set
-        if record.exc_text:
-            record.exc_text = None
-        record = self._flatten_extras(record)
-        return super(StatusFormatter, self).format(record)
+        formatted = getattr(record, "status_message", None)
+        if formatted is None:
+            record = self._flatten_extras(record)
+            record.message = record.getMessage()
+            record.asctime = self.formatTime(record, self.datefmt)
+            formatted = self.formatMessage(record)
+            if record.exc_info:
+                formatted = "{}\n{}".format(formatted, self.formatException(record.exc_info))
+            if record.stack_info:
+                formatted = "{}\n{}".format(formatted, self.formatStack(record.stack_info))
+            record.status_message = formatted
+        return formatted
 
     def formatException(self, ei):  # noqa: N802
         """
@@ -74,6 +112,7 @@ class StatusHandler(logging.Handler):
     def __init__(self):
         super(StatusHandler, self).__init__(logging.INFO)
         self.addFilter(ExtraFilter())
+        self.addFilter(DeploymentContextFilter())
         self.setFormatter(StatusFormatter())
 
     def emit(self, record):
@@ -85,12 +124,113 @@ class StatusErrorHandler(logging.Handler):
         super(StatusErrorHandler, self).__init__(logging.ERROR)
         self.addFilter(ExtraErrorFilter())
         self.addFilter(ExtraFilter())
+        self.addFilter(DeploymentContextFilter())
         self.setFormatter(StatusFormatter())
 
     def emit(self, record):
         append_error_log(record, self.format(record))
 
 
+class _CapturedLines(object):
+    def __init__(self, max_lines):
+        self.lines = deque(maxlen=max_lines)
+        self.size = 0
+        self.dropped = 0
+        self.touched = None
+
+    def as_list(self):
+        if self.dropped:
+            return ["[{} earlier lines were dropped]".format(self.dropped)] + list(self.lines)
+        return list(self.lines)
+
+
+class LogStore(object):
+    """Hold the log lines captured for each deployment until its final status is saved
+
+    Each deployment keeps at most max_lines lines, dropping the oldest. When the lines of all deployments exceed
+    max_bytes, or the lines of a deployment have not been touched for ttl seconds, for instance because the deployment
+    never got a final status, the lines of the least recently touched deployments are evicted.
+    """
+
+    def __init__(
+        self, name, max_lines=MAX_LINES_PER_DEPLOYMENT, max_bytes=MAX_BYTES, ttl=TTL_SECONDS, time_func=time.monotonic
+    ):
+        self._name = name
+        self.configure(max_lines, max_bytes, ttl)
+        self._time_func = time_func
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def configure(self, max_lines, max_bytes, ttl):
+        self._max_lines = max_lines
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+
+    def append(self, key, message):
+        now = self._time_func()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _CapturedLines(self._max_lines)
+            if len(entry.lines) == entry.lines.maxlen:
+                removed = len(entry.lines.popleft())
+                entry.size -= removed
+                self._size -= removed
+                entry.dropped += 1
+                log_capture_lines_dropped.labels(self._name).inc()
+            entry.lines.append(message)
+            entry.size += len(message)
+            self._size += len(message)
+            self._touch(key, entry, now)
+            self._evict(now)
+            log_capture_bytes.labels(self._name).set(self._size)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return []
+            self._touch(key, entry, self._time_func())
+            return entry.as_list()
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return []
+            self._size -= entry.size
+            log_capture_bytes.labels(self._name).set(self._size)
+            return entry.as_list()
+
+    def _touch(self, key, entry, now):
+        entry.touched = now
+        self._entries.move_to_end(key)
+
+    def _evict(self, now):
+        while self._entries:
+            key, oldest = next(iter(self._entries.items()))
+            if now - oldest.touched > self._ttl:
+                reason = "ttl"
+            elif self._size > self._max_bytes:
+                reason = "memory"
+            else:
+                return
+            del self._entries[key]
+            self._size -= oldest.size
+            log_capture_evicted.labels(self._name, reason).inc()
+
+
+_LOGS = LogStore("logs")
+_ERROR_LOGS = LogStore("error_logs")
+
+
+def configure_log_capture(max_lines, max_bytes, ttl):
+    """Set the limits of the logs captured for each deployment, see LogStore"""
+    _LOGS.configure(max_lines, max_bytes, ttl)
+    _ERROR_LOGS.configure(max_lines, max_bytes, ttl)
+
+
 def set_extras(app_spec=None, app_name=None, namespace=None, deployment_id=None):
     if app_spec:
         app_name = app_spec.name
@@ -106,31 +246,31 @@ def set_extras(app_spec=None, app_name=None, namespace=None, deployment_id=None)
 
 def get_running_logs(app_name, namespace, deployment_id):
     key = (app_name, namespace, deployment_id)
-    return _LOGS.get(key, [])
+    return _LOGS.get(key)
 
 
 def get_final_logs(app_name, namespace, deployment_id):
     key = (app_name, namespace, deployment_id)
-    return _LOGS.pop(key, [])
+    return _LOGS.pop(key)
 
 
 def append_log(record, message):
     if hasattr(record, "extras"):
         key = (record.extras.get("app_name"), record.extras.get("namespace"), record.extras.get("deployment_id"))
-        _LOGS[key].append(message)
+        _LOGS.append(key, message)
 
 
 def get_running_error_logs(app_name, namespace, deployment_id):
     key = (app_name, namespace, deployment_id)
-    return _ERROR_LOGS.get(key, [])
+    return _ERROR_LOGS.get(key)
 
 
 def get_final_error_logs(app_name, namespace, deployment_id):
     key = (app_name, namespace, deployment_id)
-    return _ERROR_LOGS.pop(key, [])
+    return _ERROR_LOGS.pop(key)
 
 
 def append_error_log(record, message):
     if hasattr(record, "extras"):
         key = (record.extras.get("app_name"), record.extras.get("namespace"), record.extras.get("deployment_id"))
-        _ERROR_LOGS[key].append(message)
+        _ERROR_LOGS.append(key, message)
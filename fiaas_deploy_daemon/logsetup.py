@@ -16,30 +16,42 @@
 # limitations under the License.
 
 
+import atexit
+import copy
 import datetime
 import json
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from prometheus_client import Counter, Gauge
 
 from fiaas_deploy_daemon.log_extras import StatusHandler
-from .log_extras import ExtraFilter, StatusErrorHandler
+from .log_extras import ExtraFilter, StatusErrorHandler, configure_log_capture
 from .config import Configuration
 
+log_queue_depth = Gauge("fiaas_log_queue_depth", "Number of log records waiting to be written by the log thread")
+log_records_dropped = Counter("fiaas_log_records_dropped", "Log records dropped because the log queue was full")
+
 
 class FiaasFormatter(logging.Formatter):
-    UNWANTED = (
-        "msg",
-        "args",
-        "exc_info",
-        "exc_text",
-        "levelno",
-        "created",
-        "msecs",
-        "relativeCreated",
-        "funcName",
-        "filename",
-        "lineno",
-        "module",
+    UNWANTED = frozenset(
+        (
+            "msg",
+            "args",
+            "exc_info",
+            "exc_text",
+            "levelno",
+            "created",
+            "msecs",
+            "relativeCreated",
+            "funcName",
+            "filename",
+            "lineno",
+            "module",
+            "status_message",
+        )
     )
     RENAME = {
         "levelname": "level",
@@ -48,18 +60,17 @@ class FiaasFormatter(logging.Formatter):
     }
 
     def format(self, record):
-        fields = vars(record).copy()
+        fields = {self.RENAME.get(key, key): value for key, value in vars(record).items() if key not in self.UNWANTED}
         fields["@timestamp"] = self.format_time(record)
         fields["@version"] = 1
-        fields["LocationInfo"] = self._build_location(fields)
+        fields["LocationInfo"] = self._build_location(record)
         fields["message"] = record.getMessage()
         fields["extras"] = getattr(record, "extras", {})
-        if "exc_info" in fields and fields["exc_info"]:
-            fields["throwable"] = self.formatException(fields["exc_info"])
-        for original, replacement in self.RENAME.items():
-            fields[replacement] = fields.pop(original)
-        for unwanted in self.UNWANTED:
-            fields.pop(unwanted)
+        if record.exc_info:
+            # The rendered traceback is cached on the record, like logging.Formatter does
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            fields["throwable"] = record.exc_text
         return json.dumps(fields, default=self._default_json_default)
 
     @staticmethod
@@ -80,15 +91,44 @@ class FiaasFormatter(logging.Formatter):
             return str(obj)
 
     @staticmethod
-    def _build_location(fields):
+    def _build_location(record):
         return {
-            "method": fields["funcName"],
-            "file": fields["filename"],
-            "line": fields["lineno"],
-            "module": fields["module"],
+            "method": record.funcName,
+            "file": record.filename,
+            "line": record.lineno,
+            "module": record.module,
         }
 
 
+class AsyncLogHandler(QueueHandler):
+    """Put log records on a bounded queue, to be formatted and written by a QueueListener in a background thread
+
+    When the queue is full, new records are dropped, unless block is set, in which case the logging thread waits until
+    there is room in the queue.
+    """
+
+    def __init__(self, log_queue, block=False):
+        super(AsyncLogHandler, self).__init__(log_queue)
+        self._block = block
+
+    def prepare(self, record):
+        # The record is copied so the status handlers can't change it before it is written. The arguments are merged
+        # into the message now, in case they change later, but formatting is left to the background thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self._block:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
 def init_logging(config: Configuration):
     """Set up logging system, according to FINN best practice for cloud
 
@@ -102,7 +142,13 @@ def init_logging(config: Configuration):
     root.setLevel(logging.INFO)
     if config.debug:
         root.setLevel(logging.DEBUG)
-    root.addHandler(_create_default_handler(config))
+    if config.enable_async_logging:
+        root.addHandler(_create_async_handler(config, _create_default_handler(config)))
+    else:
+        root.addHandler(_create_default_handler(config))
+    configure_log_capture(
+        config.log_capture_max_lines, config.log_capture_max_megabytes * 1024 * 1024, config.log_capture_ttl
+    )
     root.addHandler(StatusHandler())
     root.addHandler(StatusErrorHandler())
     _set_special_levels()
@@ -118,6 +164,18 @@ def _create_default_handler(config: Configuration):
     return handler
 
 
+def _create_async_handler(config: Configuration, handler):
+    log_queue = queue.Queue(config.async_logging_queue_size)
+    async_handler = AsyncLogHandler(log_queue, block=config.async_logging_overflow == "block")
+    # Extras are thread local, so they must be added before the record is handed to the background thread
+    async_handler.addFilter(ExtraFilter())
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    log_queue_depth.set_function(log_queue.qsize)
+    return async_handler
+
+
 def _set_special_levels():
     logging.getLogger("werkzeug").setLevel(logging.WARN)
     # Kafka is really noisy...
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import functools
+import logging
+import time
 
 import backoff
 from k8s.client import ClientError
@@ -19,6 +21,11 @@ from prometheus_client import Counter
 
 CONFLICT_MAX_RETRIES = 2
 CONFLICT_MAX_VALUE = 3
+# Seconds to wait before watching again after an error, doubling for each consecutive error
+WATCH_RETRY_MIN_DELAY = 1
+WATCH_RETRY_MAX_DELAY = 60
+
+LOG = logging.getLogger(__name__)
 
 fiaas_upsert_conflict_retry_counter = Counter(
     "fiaas_upsert_conflict_retry",
@@ -93,3 +100,24 @@ def retry_on_upsert_conflict(_func=None, max_value_seconds=CONFLICT_MAX_VALUE, m
         return _retry_decorator
     else:
         return _retry_decorator(_func)
+
+
+def watch_forever(watch, kind, sleep_func=time.sleep, time_func=time.monotonic):
+    """Call watch over and over, waiting longer after each consecutive error
+
+    Used by the threads that list and watch resources, so that an API outage or missing permissions doesn't make them
+    list again in a tight loop. The delay starts over when watch returns, or when it has been running for longer than
+    the longest delay before failing.
+    """
+    delay = WATCH_RETRY_MIN_DELAY
+    while True:
+        started = time_func()
+        try:
+            watch()
+            delay = WATCH_RETRY_MIN_DELAY
+        except Exception:
+            if time_func() - started > WATCH_RETRY_MAX_DELAY:
+                delay = WATCH_RETRY_MIN_DELAY
+            LOG.exception("Error while watching for changes on %s, retrying in %d seconds", kind, delay)
+            sleep_func(delay)
+            delay = min(delay * 2, WATCH_RETRY_MAX_DELAY)
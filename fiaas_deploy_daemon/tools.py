@@ -14,6 +14,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import hashlib
+import json
 import logging
 from queue import Queue
 from collections.abc import Iterator
@@ -29,6 +31,12 @@ def merge_dicts(*args):
     return result
 
 
+def digest(data):
+    """Return a stable hex digest of a JSON-serializable structure, independent of dict ordering"""
+    serialized = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
 def log_request_response(resp, *args, **kwargs):
     if resp.url.startswith(config.api_server):
         return  # k8s library already does its own dumping, we don't need to do it here
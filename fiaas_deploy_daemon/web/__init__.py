@@ -16,6 +16,7 @@
 # limitations under the License.
 
 
+import json
 import logging
 import pkgutil
 
@@ -54,6 +55,7 @@ frontpage_histogram = request_histogram.labels("frontpage")
 metrics_histogram = request_histogram.labels("metrics")
 transform_histogram = request_histogram.labels("transform")
 healthz_histogram = request_histogram.labels("healthz")
+shards_histogram = request_histogram.labels("shards")
 
 
 @web.route("/")
@@ -91,6 +93,15 @@ def healthz():
         return "I don't feel so good...", 500
 
 
+@web.route("/healthz/shards")
+@shards_histogram.time()
+def shards():
+    ownership = current_app.health_check.shard_ownership()
+    if ownership is None:
+        abort(404)
+    return current_app.response_class(json.dumps(ownership), content_type="application/json")
+
+
 @web.route("/transform", methods=["GET", "POST"])
 @transform_histogram.time()
 def transform():
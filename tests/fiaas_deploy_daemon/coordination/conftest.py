@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+from unittest import mock
+
+import pytest
+from k8s.client import ClientError, NotFound
+
+
+class FakeLeaseStore(object):
+    """In-memory replacement for LeaseStore, keeping a resourceVersion to detect conflicting writes"""
+
+    namespace = "default"
+
+    def __init__(self):
+        self._leases = {}
+        self._version = 0
+
+    def get(self, name):
+        try:
+            return copy.deepcopy(self._leases[name])
+        except KeyError:
+            raise NotFound()
+
+    def find(self, labels):
+        return [
+            copy.deepcopy(lease)
+            for lease in self._leases.values()
+            if all(lease.metadata.labels.get(k) == v for k, v in labels.items())
+        ]
+
+    def save(self, lease):
+        name = lease.metadata.name
+        current = self._leases.get(name)
+        if lease._new and current is not None:
+            raise _conflict()
+        if not lease._new and (current is None or current.metadata.resourceVersion != lease.metadata.resourceVersion):
+            raise _conflict()
+        self._version += 1
+        # resourceVersion is read-only in the model, since only the API server sets it
+        lease.metadata._values["resourceVersion"] = str(self._version)
+        lease._new = False
+        self._leases[name] = copy.deepcopy(lease)
+        return lease
+
+    def delete(self, name):
+        try:
+            del self._leases[name]
+        except KeyError:
+            raise NotFound()
+
+
+def _conflict():
+    response = mock.MagicMock(status_code=409)
+    return ClientError("Conflict", response=response)
+
+
+@pytest.fixture
+def lease_store():
+    return FakeLeaseStore()
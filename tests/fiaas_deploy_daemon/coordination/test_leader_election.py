@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+from unittest import mock
+
+import pytest
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.coordination import leader_election as leader_election_module
+from fiaas_deploy_daemon.coordination.leader_election import LEADER_LEASE_NAME, LeaderElection
+
+LEASE_DURATION = 15
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLeaderElection(object):
+    @pytest.fixture
+    def config(self):
+        config = Configuration([])
+        config.leader_lease_duration = LEASE_DURATION
+        return config
+
+    @pytest.fixture
+    def clock(self):
+        return Clock()
+
+    def _election(self, config, lease_store, clock, identity):
+        return LeaderElection(config, lease_store, identity=identity, time_func=clock)
+
+    def test_not_leader_before_first_attempt(self, config, lease_store, clock):
+        election = self._election(config, lease_store, clock, "replica-1")
+
+        assert not election.is_leader()
+        assert not election.owns("default", "app")
+
+    def test_first_replica_becomes_leader(self, config, lease_store, clock):
+        election = self._election(config, lease_store, clock, "replica-1")
+
+        election._tick()
+
+        assert election.is_leader()
+        assert election.owns("default", "app")
+        lease = lease_store.get(LEADER_LEASE_NAME)
+        assert lease.spec.holderIdentity == "replica-1"
+        assert lease.spec.leaseDurationSeconds == LEASE_DURATION
+        assert lease.spec.leaseTransitions == 0
+
+    def test_standby_does_not_take_over_while_leader_renews(self, config, lease_store, clock):
+        leader = self._election(config, lease_store, clock, "replica-1")
+        standby = self._election(config, lease_store, clock, "replica-2")
+        leader._tick()
+
+        for _ in range(10):
+            standby._tick()
+            clock.now += 5
+            leader._tick()
+
+        assert leader.is_leader()
+        assert not standby.is_leader()
+        assert standby.ownership()["leader"] == "replica-1"
+
+    def test_standby_takes_over_when_leader_stops_renewing(self, config, lease_store, clock):
+        leader = self._election(config, lease_store, clock, "replica-1")
+        standby = self._election(config, lease_store, clock, "replica-2")
+        leader._tick()
+        standby._tick()
+
+        clock.now += LEASE_DURATION
+        standby._tick()
+        assert not standby.is_leader()
+
+        clock.now += 1
+        standby._tick()
+        assert standby.is_leader()
+        lease = lease_store.get(LEADER_LEASE_NAME)
+        assert lease.spec.holderIdentity == "replica-2"
+        assert lease.spec.leaseTransitions == 1
+
+    def test_only_one_standby_wins_a_conflicting_take_over(self, config, lease_store, clock):
+        leader = self._election(config, lease_store, clock, "replica-1")
+        standbys = [self._election(config, lease_store, clock, identity) for identity in ("replica-2", "replica-3")]
+        leader._tick()
+        for standby in standbys:
+            standby._tick()
+        clock.now += LEASE_DURATION + 1
+        expired_lease = lease_store.get(LEADER_LEASE_NAME)
+
+        # Both standbys read the expired Lease before either of them writes it
+        with mock.patch.object(lease_store, "get", side_effect=lambda name: copy.deepcopy(expired_lease)):
+            for standby in standbys:
+                standby._tick()
+
+        assert [standby.is_leader() for standby in standbys] == [True, False]
+        assert lease_store.get(LEADER_LEASE_NAME).spec.holderIdentity == "replica-2"
+
+    def test_steps_down_when_lease_can_not_be_renewed(self, config, lease_store, clock):
+        election = self._election(config, lease_store, clock, "replica-1")
+        election._tick()
+
+        with mock.patch.object(lease_store, "save", side_effect=IOError("API unavailable")):
+            clock.now += 5
+            election._tick()
+            assert election.is_leader()
+
+            clock.now += 6
+            election._tick()
+            assert not election.is_leader()
+
+    def test_calls_listeners_with_previous_ring(self, config, lease_store, clock):
+        election = self._election(config, lease_store, clock, "replica-1")
+        listener = mock.MagicMock()
+        election.add_listener(listener)
+
+        election._tick()
+        election._tick()
+
+        listener.assert_called_once()
+        previous_ring = listener.call_args[0][0]
+        assert not election.owns("default", "app", previous_ring)
+        assert election.owns("default", "app")
+
+    def test_updates_metrics_when_leadership_changes(self, config, lease_store, clock):
+        election = self._election(config, lease_store, clock, "replica-1")
+
+        with (
+            mock.patch.object(leader_election_module.leader_gauge, "set") as leader_gauge,
+            mock.patch.object(leader_election_module.leader_transitions, "inc") as transitions,
+        ):
+            election._tick()
+
+        leader_gauge.assert_called_once_with(1)
+        transitions.assert_called_once_with()
+
+    def test_ownership(self, config, lease_store, clock):
+        election = self._election(config, lease_store, clock, "replica-1")
+        election._tick()
+
+        assert election.ownership() == {
+            "identity": "replica-1",
+            "leader": "replica-1",
+            "members": ["replica-1"],
+            "owned_share": 1.0,
+        }
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime, timezone
+from unittest import mock
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.coordination.lease import Lease, LeaseStore, micro_time
+
+
+def test_micro_time_has_microseconds():
+    assert micro_time(datetime(2020, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)) == "2020-01-02T03:04:05.000006Z"
+
+
+class TestLeaseStore(object):
+    def test_finds_leases_in_own_namespace(self):
+        config = Configuration([])
+        config.namespace = "fiaas"
+        store = LeaseStore(config)
+
+        with mock.patch.object(Lease, "find") as find:
+            store.find({"fiaas/shard-group": "fiaas-deploy-daemon"})
+
+        find.assert_called_once_with(namespace="fiaas", labels={"fiaas/shard-group": "fiaas-deploy-daemon"})
+
+    def test_gets_leases_from_own_namespace(self):
+        config = Configuration([])
+        config.namespace = "fiaas"
+        store = LeaseStore(config)
+
+        with mock.patch.object(Lease, "get") as get:
+            store.get("my-lease")
+
+        get.assert_called_once_with("my-lease", "fiaas")
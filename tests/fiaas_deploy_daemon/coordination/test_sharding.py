@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.coordination import sharding as sharding_module
+from fiaas_deploy_daemon.coordination.sharding import ShardRing, Sharding
+
+LEASE_DURATION = 15
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestShardRing(object):
+    def test_empty_ring_has_no_owner(self):
+        assert ShardRing([]).owner("default/app") is None
+
+    def test_assigns_each_key_to_one_member(self):
+        ring = ShardRing(["a", "b", "c"])
+
+        owners = {ring.owner("ns/app-{}".format(i)) for i in range(300)}
+
+        assert owners == {"a", "b", "c"}
+
+    def test_only_moves_keys_of_leaving_member(self):
+        keys = ["ns/app-{}".format(i) for i in range(300)]
+        before = ShardRing(["a", "b", "c"])
+        after = ShardRing(["a", "b"])
+
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+
+        assert moved
+        assert all(before.owner(key) == "c" for key in moved)
+
+    def test_shares_add_up(self):
+        ring = ShardRing(["a", "b", "c"])
+
+        assert sum(ring.share(member) for member in "abc") == pytest.approx(1.0)
+        assert ring.share("d") == 0.0
+
+
+class TestSharding(object):
+    @pytest.fixture
+    def config(self):
+        config = Configuration([])
+        config.shard_lease_duration = LEASE_DURATION
+        config.sharding_key = "application"
+        return config
+
+    @pytest.fixture
+    def clock(self):
+        return Clock()
+
+    def _sharding(self, config, lease_store, clock, identity):
+        return Sharding(config, lease_store, identity=identity, time_func=clock)
+
+    def test_owns_nothing_before_joining(self, config, lease_store, clock):
+        sharding = self._sharding(config, lease_store, clock, "replica-1")
+
+        assert not sharding.owns("default", "app")
+
+    def test_single_replica_owns_everything(self, config, lease_store, clock):
+        sharding = self._sharding(config, lease_store, clock, "replica-1")
+
+        sharding._tick()
+
+        assert all(sharding.owns("default", "app-{}".format(i)) for i in range(50))
+        assert lease_store.get("fiaas-deploy-daemon-shard-replica-1").spec.holderIdentity == "replica-1"
+        assert sharding.ownership() == {"identity": "replica-1", "members": ["replica-1"], "owned_share": 1.0}
+
+    def test_replicas_share_applications(self, config, lease_store, clock):
+        replicas = [self._sharding(config, lease_store, clock, "replica-{}".format(i)) for i in range(3)]
+
+        for _ in range(2):
+            for replica in replicas:
+                replica._tick()
+
+        for i in range(100):
+            owners = [replica for replica in replicas if replica.owns("default", "app-{}".format(i))]
+            assert len(owners) == 1
+
+    def test_shards_by_namespace(self, config, lease_store, clock):
+        config.sharding_key = "namespace"
+        replicas = [self._sharding(config, lease_store, clock, "replica-{}".format(i)) for i in range(3)]
+        for _ in range(2):
+            for replica in replicas:
+                replica._tick()
+
+        for i in range(20):
+            namespace = "namespace-{}".format(i)
+            owners = {replica for replica in replicas for app in ("a", "b", "c") if replica.owns(namespace, app)}
+            assert len(owners) == 1
+
+    def test_takes_over_from_replica_that_stops_renewing(self, config, lease_store, clock):
+        first = self._sharding(config, lease_store, clock, "replica-1")
+        second = self._sharding(config, lease_store, clock, "replica-2")
+        listener = mock.MagicMock()
+        first.add_listener(listener)
+        first._tick()
+        second._tick()
+        first._tick()
+        assert first.ownership()["members"] == ["replica-1", "replica-2"]
+
+        clock.now += LEASE_DURATION - 1
+        first._tick()
+        assert first.ownership()["members"] == ["replica-1", "replica-2"]
+
+        clock.now += 2
+        first._tick()
+
+        assert first.ownership()["members"] == ["replica-1"]
+        assert all(first.owns("default", "app-{}".format(i)) for i in range(50))
+        previous_ring = listener.call_args.args[0]
+        assert previous_ring.members == {"replica-1", "replica-2"}
+
+    def test_gives_up_applications_when_own_lease_can_not_be_renewed(self, config, lease_store, clock):
+        sharding = self._sharding(config, lease_store, clock, "replica-1")
+        sharding._tick()
+        lease_store.save = mock.MagicMock(side_effect=Exception("API unavailable"))
+
+        clock.now += LEASE_DURATION + 1
+        sharding._tick()
+
+        assert not sharding.owns("default", "app")
+
+    def test_updates_metrics_when_members_change(self, config, lease_store, clock):
+        sharding = self._sharding(config, lease_store, clock, "replica-1")
+
+        with mock.patch.object(sharding_module.shard_members, "set") as members:
+            sharding._tick()
+            sharding._tick()
+
+        members.assert_called_once_with(1)
+
+    def test_release_deletes_own_lease(self, config, lease_store, clock):
+        first = self._sharding(config, lease_store, clock, "replica-1")
+        second = self._sharding(config, lease_store, clock, "replica-2")
+        first._tick()
+        second._tick()
+        first._tick()
+
+        second.release()
+        second.release()
+        first._tick()
+
+        assert [lease.metadata.name for lease in lease_store.find({})] == ["fiaas-deploy-daemon-shard-replica-1"]
+        assert first.ownership()["members"] == ["replica-1"]
+
+    def test_deletes_leases_expired_long_ago(self, config, lease_store, clock):
+        first = self._sharding(config, lease_store, clock, "replica-1")
+        second = self._sharding(config, lease_store, clock, "replica-2")
+        second._tick()
+        first._tick()
+
+        clock.now += sharding_module.EXPIRED_LEASE_GC_FACTOR * LEASE_DURATION
+        first._tick()
+        assert len(lease_store.find({})) == 2
+
+        clock.now += 1
+        first._tick()
+        assert [lease.metadata.name for lease in lease_store.find({})] == ["fiaas-deploy-daemon-shard-replica-1"]
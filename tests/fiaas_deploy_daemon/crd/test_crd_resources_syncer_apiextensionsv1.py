@@ -16,12 +16,15 @@
 # limitations under the License.
 
 
+import copy
 from unittest import mock
 from requests import Response
 
 from k8s.client import NotFound
 
 from fiaas_deploy_daemon.crd.crd_resources_syncer_apiextensionsv1 import CrdResourcesSyncerApiextensionsV1
+from fiaas_deploy_daemon.crd.definition import SPEC_HASH_ANNOTATION
+from fiaas_deploy_daemon.tools import digest
 
 
 object_with_unknown_fields = {"type": "object", "x-kubernetes-preserve-unknown-fields": True}
@@ -165,6 +168,12 @@ EXPECTED_STATUS = {
 }
 
 
+def _with_spec_hash(definition):
+    definition = copy.deepcopy(definition)
+    definition["metadata"]["annotations"] = {SPEC_HASH_ANNOTATION: digest(definition["spec"])}
+    return definition
+
+
 class TestCrdResourcesSyncerV1(object):
     def test_creates_crd_resources_when_not_found(self, post, get):
         get.side_effect = NotFound("Something")
@@ -179,8 +188,8 @@ class TestCrdResourcesSyncerV1(object):
         CrdResourcesSyncerApiextensionsV1.update_crd_resources()
 
         calls = [
-            mock.call("/apis/apiextensions.k8s.io/v1/customresourcedefinitions/", EXPECTED_APPLICATION),
-            mock.call("/apis/apiextensions.k8s.io/v1/customresourcedefinitions/", EXPECTED_STATUS),
+            mock.call("/apis/apiextensions.k8s.io/v1/customresourcedefinitions/", _with_spec_hash(EXPECTED_APPLICATION)),
+            mock.call("/apis/apiextensions.k8s.io/v1/customresourcedefinitions/", _with_spec_hash(EXPECTED_STATUS)),
         ]
         assert post.call_args_list == calls
 
@@ -198,11 +207,26 @@ class TestCrdResourcesSyncerV1(object):
         calls = [
             mock.call(
                 "/apis/apiextensions.k8s.io/v1/customresourcedefinitions/applications.fiaas.schibsted.io",
-                EXPECTED_APPLICATION,
+                _with_spec_hash(EXPECTED_APPLICATION),
             ),
             mock.call(
                 "/apis/apiextensions.k8s.io/v1/customresourcedefinitions/application-statuses.fiaas.schibsted.io",
-                EXPECTED_STATUS,
+                _with_spec_hash(EXPECTED_STATUS),
             ),
         ]
         assert put.call_args_list == calls
+
+    def test_does_not_update_crd_resources_with_same_spec(self, put, get):
+        def make_response(data):
+            mock_response = mock.create_autospec(Response)
+            mock_response.json.return_value = data
+            return mock_response
+
+        get.side_effect = [
+            make_response(_with_spec_hash(EXPECTED_APPLICATION)),
+            make_response(_with_spec_hash(EXPECTED_STATUS)),
+        ]
+
+        CrdResourcesSyncerApiextensionsV1.update_crd_resources()
+
+        put.assert_not_called()
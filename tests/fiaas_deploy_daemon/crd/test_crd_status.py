@@ -25,6 +25,8 @@ from requests import Response
 
 from fiaas_deploy_daemon.crd import status
 from fiaas_deploy_daemon.crd.status import _cleanup, OLD_STATUSES_TO_KEEP, LAST_UPDATED_KEY, now
+from fiaas_deploy_daemon.crd.status_index import IndexedStatus, StatusIndex
+from fiaas_deploy_daemon.crd.status_writer import StatusWriter
 from fiaas_deploy_daemon.crd.types import FiaasApplicationStatus, FiaasApplication
 from fiaas_deploy_daemon.lifecycle import (
     DEPLOY_STATUS_CHANGED,
@@ -235,6 +237,116 @@ class TestStatusReport(object):
         expected_calls.insert(0, mock.call("name-100", "test"))
         assert delete.call_args_list == expected_calls
 
+    def test_clean_up_with_status_index(self, app_spec, find, delete, monkeypatch):
+        status_index = mock.create_autospec(StatusIndex, spec_set=True, instance=True)
+        status_index.find.return_value = [
+            IndexedStatus("name-{}".format(i), "test", "SUCCESS", "2020-12-12T23.59.{:02}".format(i))
+            for i in range(OLD_STATUSES_TO_KEEP + 2)
+        ]
+        monkeypatch.setattr(status, "_status_index", status_index)
+
+        _cleanup(app_spec.name, app_spec.namespace)
+
+        status_index.find.assert_called_once_with(app_spec.name, app_spec.namespace)
+        find.assert_not_called()
+        assert delete.call_args_list == [mock.call("name-0", "test"), mock.call("name-1", "test")]
+
+    def test_clean_up_does_not_list_statuses_unless_a_status_was_created(self, app_spec, find, delete):
+        _cleanup(app_spec.name, app_spec.namespace, created=False)
+
+        find.assert_not_called()
+        delete.assert_not_called()
+
+    def test_clean_up_counts_deleted_statuses(self, app_spec, find, delete):
+        find.return_value = [_create_status(i) for i in range(OLD_STATUSES_TO_KEEP + 3)]
+
+        with mock.patch.object(status.status_deletions, "labels") as labels:
+            _cleanup(app_spec.name, app_spec.namespace)
+
+        assert labels.call_args_list == [mock.call("deploy")] * 3
+
+    @pytest.mark.parametrize(
+        "include_status_in_app,write",
+        (
+            (False, status._save_status_and_cleanup),
+            (True, status._save_status_inline_and_cleanup),
+        ),
+    )
+    def test_writes_status_through_status_writer(self, app_spec, get, get_app, monkeypatch, include_status_in_app, write):
+        status_writer = mock.create_autospec(StatusWriter, spec_set=True, instance=True)
+        monkeypatch.setattr(status, "_status_writer", status_writer)
+        handle_signal = status._handle_signal_with_status if include_status_in_app else status._handle_signal_without_status
+        subject = _subject_from_app_spec(app_spec)
+
+        handle_signal(None, status=STATUS_STARTED, subject=subject)
+
+        status_writer.put.assert_called_once_with(write, "RUNNING", subject)
+        get.assert_not_called()
+        get_app.assert_not_called()
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = mock.MagicMock()
+        monkeypatch.setattr(status, "_client", client)
+        return client
+
+    @pytest.fixture
+    def save_status(self):
+        with mock.patch("fiaas_deploy_daemon.crd.status._save_status", return_value=False) as m:
+            yield m
+
+    @pytest.mark.usefixtures("find", "logs")
+    def test_patches_inline_status_without_reading_application(self, app_spec, get_app, client, save_status, signal):
+        subject = _subject_from_app_spec(app_spec)._replace(generation=3)
+        status.connect_signals(True)
+
+        with mock.patch("fiaas_deploy_daemon.crd.status._get_error_logs", return_value=[LOG_LINE]):
+            signal(DEPLOY_STATUS_CHANGED).send(status=STATUS_SUCCESS, subject=subject)
+
+        get_app.assert_not_called()
+        client._call.assert_called_once_with(
+            "PATCH",
+            "/apis/fiaas.schibsted.io/v1/namespaces/default/applications/testapp/status",
+            [
+                {"op": "test", "path": "/metadata/labels/fiaas~1deployment_id", "value": app_spec.deployment_id},
+                {
+                    "op": "add",
+                    "path": "/status",
+                    "value": {
+                        "result": "SUCCESS",
+                        "observedGeneration": 3,
+                        "logs": [LOG_LINE],
+                        "deployment_id": app_spec.deployment_id,
+                    },
+                },
+            ],
+            headers={"Content-Type": "application/json-patch+json"},
+        )
+
+    @pytest.mark.usefixtures("find", "logs")
+    def test_skips_inline_status_when_application_has_other_deployment_id(self, app_spec, client, save_status, signal):
+        client._call.side_effect = ClientError("Unprocessable Entity", response=mock.MagicMock(status_code=422))
+        subject = _subject_from_app_spec(app_spec)._replace(generation=3)
+        status.connect_signals(True)
+
+        signal(DEPLOY_STATUS_CHANGED).send(status=STATUS_SUCCESS, subject=subject)
+
+        client._call.assert_called_once()
+        save_status.assert_called_once_with("SUCCESS", subject)
+
+    @pytest.mark.usefixtures("find", "logs")
+    def test_updates_inline_status_when_not_allowed_to_patch(self, app_spec, client, save_status, signal):
+        client._call.side_effect = ClientError("Forbidden", response=mock.MagicMock(status_code=403))
+        subject = _subject_from_app_spec(app_spec)._replace(generation=3)
+        status.connect_signals(True)
+
+        with mock.patch("fiaas_deploy_daemon.crd.status._save_status_inline") as save_status_inline:
+            signal(DEPLOY_STATUS_CHANGED).send(status=STATUS_SUCCESS, subject=subject)
+
+        client._call.assert_called_once()
+        save_status_inline.assert_called_once_with("SUCCESS", subject)
+        save_status.assert_called_once_with("SUCCESS", subject)
+
     def test_ignore_notfound_on_cleanup(self, find, delete, app_spec):
         delete.side_effect = NotFound()
         find.return_value = [_create_status(i) for i in range(OLD_STATUSES_TO_KEEP + 1)]
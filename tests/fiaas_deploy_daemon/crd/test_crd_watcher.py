@@ -17,17 +17,21 @@
 
 
 import copy
+import threading
 from queue import Queue
 
 from unittest import mock
 import pytest
 from k8s.base import WatchEvent
 from k8s.client import NotFound
-from k8s.watcher import Watcher
 from yaml import YAMLError
 
 from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.coordination.sharding import DisabledSharding, ShardRing, Sharding
 from fiaas_deploy_daemon.crd import CrdWatcher
+from fiaas_deploy_daemon.crd.resumable_watcher import ResumableWatcher
+from fiaas_deploy_daemon.crd.status_index import StatusIndex
+from fiaas_deploy_daemon.crd.watcher import OwnedApplication, ParseWorker
 from fiaas_deploy_daemon.crd.types import FiaasApplication, AdditionalLabelsOrAnnotations, FiaasApplicationStatus
 from fiaas_deploy_daemon.deployer import DeployerEvent
 from fiaas_deploy_daemon.lifecycle import Lifecycle, Subject
@@ -85,6 +89,17 @@ STATUS_EVENT = {
 }
 
 
+class WatchRestarted(Exception):
+    pass
+
+
+def _run_until_second_watch(crd_watcher):
+    with mock.patch.object(crd_watcher, "_watch", side_effect=[None, WatchRestarted]) as watch:
+        with pytest.raises(WatchRestarted):
+            crd_watcher()
+    assert watch.call_count == 2
+
+
 class FakeCrdResourcesSyncer(object):
     @classmethod
     def update_crd_resources(cls):
@@ -103,15 +118,27 @@ class TestWatcher(object):
 
     @pytest.fixture
     def watcher(self):
-        return mock.create_autospec(spec=Watcher, spec_set=True, instance=True)
+        return mock.create_autospec(spec=ResumableWatcher, spec_set=True, instance=True)
 
     @pytest.fixture
     def lifecycle(self):
         return mock.create_autospec(spec=Lifecycle, spec_set=True, instance=True)
 
     @pytest.fixture
-    def crd_watcher(self, spec_factory, deploy_queue, watcher, lifecycle):
-        crd_watcher = CrdWatcher(spec_factory, deploy_queue, Configuration([]), lifecycle, FakeCrdResourcesSyncer)
+    def status_index(self):
+        status_index = mock.create_autospec(spec=StatusIndex, spec_set=True, instance=True)
+        status_index.result.return_value = None
+        return status_index
+
+    @pytest.fixture
+    def sharding(self):
+        return DisabledSharding()
+
+    @pytest.fixture
+    def crd_watcher(self, spec_factory, deploy_queue, watcher, lifecycle, status_index, sharding):
+        crd_watcher = CrdWatcher(
+            spec_factory, deploy_queue, Configuration([]), lifecycle, FakeCrdResourcesSyncer, status_index, sharding
+        )
         crd_watcher._watcher = watcher
         return crd_watcher
 
@@ -120,10 +147,14 @@ class TestWatcher(object):
         return FakeCrdResourcesSyncer()
 
     @pytest.fixture
-    def crd_watcher_creation_disabled(self, spec_factory, deploy_queue, lifecycle, crd_resources_syncer, watcher):
+    def crd_watcher_creation_disabled(
+        self, spec_factory, deploy_queue, lifecycle, crd_resources_syncer, watcher, status_index, sharding
+    ):
         config = Configuration([])
         config.disable_crd_creation = True
-        crd_watcher = CrdWatcher(spec_factory, deploy_queue, config, lifecycle, crd_resources_syncer)
+        crd_watcher = CrdWatcher(
+            spec_factory, deploy_queue, config, lifecycle, crd_resources_syncer, status_index, sharding
+        )
         crd_watcher._watcher = watcher
         return crd_watcher
 
@@ -135,14 +166,27 @@ class TestWatcher(object):
 
     def test_does_not_update_crd_when_disabled(self, crd_watcher_creation_disabled, crd_resources_syncer):
         with mock.patch.object(crd_resources_syncer, "update_crd_resources") as m:
-            crd_watcher_creation_disabled._watch(None)
+            _run_until_second_watch(crd_watcher_creation_disabled)
             assert not m.called
 
-    def test_updates_crd_resources_when_watching_it(self, crd_watcher):
+    def test_updates_crd_resources_once_when_starting(self, crd_watcher):
         with mock.patch.object(FakeCrdResourcesSyncer, "update_crd_resources", return_value=None) as m:
-            crd_watcher._watch(None)
+            _run_until_second_watch(crd_watcher)
             m.assert_called_once()
 
+    def test_waits_configured_time_for_status_index_before_watching(self, crd_watcher, status_index):
+        crd_watcher._status_index_sync_timeout = 3
+        status_index.wait_until_synced.return_value = False
+
+        _run_until_second_watch(crd_watcher)
+
+        status_index.wait_until_synced.assert_called_once_with(3)
+
+    def test_does_not_update_crd_resources_when_watch_restarts(self, crd_watcher):
+        with mock.patch.object(FakeCrdResourcesSyncer, "update_crd_resources", return_value=None) as m:
+            crd_watcher._watch(None)
+            m.assert_not_called()
+
     def test_is_able_to_watch_custom_resource_definition(self, crd_watcher, deploy_queue, watcher):
         watcher.watch.return_value = [WatchEvent(ADD_EVENT, FiaasApplication)]
 
@@ -199,6 +243,7 @@ class TestWatcher(object):
                 repository=repository,
                 labels=None,
                 annotations=None,
+                generation=event["object"]["metadata"].get("generation"),
             )
 
         app_config = spec["config"]
@@ -306,6 +351,19 @@ class TestWatcher(object):
         crd_watcher._watch(None)
         assert deploy_queue.qsize() == count
 
+    @pytest.mark.parametrize("result, count", (("SUCCESS", 0), ("FAILED", 1)))
+    def test_deploy_based_on_indexed_status_result(
+        self, crd_watcher, deploy_queue, watcher, status_get, status_index, result, count
+    ):
+        watcher.watch.return_value = [WatchEvent(ADD_EVENT, FiaasApplication)]
+        status_index.result.return_value = result
+
+        crd_watcher._watch(None)
+
+        assert deploy_queue.qsize() == count
+        status_index.result.assert_called_once_with("example", "the-namespace", "deployment_id")
+        status_get.assert_not_called()
+
     def test_deploy_save_status(self, crd_watcher, deploy_queue, watcher, status_get):
         watcher.watch.return_value = [WatchEvent(STATUS_EVENT, FiaasApplication)]
 
@@ -315,9 +373,185 @@ class TestWatcher(object):
 
     def test_deploy_skip_deleted_app(self, crd_watcher, deploy_queue, watcher, status_get):
         event = copy.deepcopy(MODIFIED_EVENT)
-        event['object']['metadata']['deletionTimestamp'] = '2000-01-01T00:00:00Z'
+        event["object"]["metadata"]["deletionTimestamp"] = "2000-01-01T00:00:00Z"
         watcher.watch.return_value = [WatchEvent(event, FiaasApplication)]
 
         assert deploy_queue.qsize() == 0
         crd_watcher._watch(None)
         assert deploy_queue.qsize() == 0
+
+    def test_parse_workers_build_specs_outside_watch_and_each_app_in_order(
+        self, spec_factory, deploy_queue, watcher, lifecycle, status_index, sharding
+    ):
+        config = Configuration([])
+        config.parse_workers = 2
+        crd_watcher = CrdWatcher(
+            spec_factory, deploy_queue, config, lifecycle, FakeCrdResourcesSyncer, status_index, sharding
+        )
+        crd_watcher._watcher = watcher
+        release = threading.Event()
+
+        def build_spec(name, deployment_id, **kwargs):
+            if deployment_id == "0":
+                assert release.wait(5)
+            return app_spec_for(name, deployment_id)
+
+        def app_spec_for(name, deployment_id):
+            app_spec = mock.MagicMock()
+            app_spec.name = name
+            app_spec.deployment_id = deployment_id
+            return app_spec
+
+        def event(deployment_id):
+            event = copy.deepcopy(ADD_EVENT)
+            event["object"]["metadata"]["labels"]["fiaas/deployment_id"] = deployment_id
+            return WatchEvent(event, FiaasApplication)
+
+        spec_factory.side_effect = build_spec
+        watcher.watch.return_value = [event("0"), event("1"), event("2")]
+
+        crd_watcher._start_parse_workers()
+        # the watch is not held up by the spec of the first event, which is still being built
+        crd_watcher._watch(None)
+        assert deploy_queue.empty()
+        release.set()
+
+        deployed = [deploy_queue.get(timeout=5).app_spec.deployment_id for _ in range(3)]
+        assert deployed == ["0", "1", "2"]
+        assert lifecycle.initiate.call_count == 3
+
+
+class TestShardedWatcher(object):
+    @pytest.fixture
+    def sharding(self):
+        sharding = mock.create_autospec(Sharding, spec_set=True, instance=True)
+        sharding.enabled = True
+        sharding.owns.return_value = False
+        return sharding
+
+    @pytest.fixture
+    def status_index(self):
+        status_index = mock.create_autospec(StatusIndex, spec_set=True, instance=True)
+        status_index.result.return_value = None
+        return status_index
+
+    @pytest.fixture
+    def deploy_queue(self):
+        return Queue()
+
+    @pytest.fixture
+    def crd_watcher(self, deploy_queue, status_index, sharding):
+        spec_factory = mock.MagicMock()
+        lifecycle = mock.create_autospec(spec=Lifecycle, spec_set=True, instance=True)
+        crd_watcher = CrdWatcher(
+            spec_factory, deploy_queue, Configuration([]), lifecycle, FakeCrdResourcesSyncer, status_index, sharding
+        )
+        crd_watcher._watcher = mock.create_autospec(spec=ResumableWatcher, spec_set=True, instance=True)
+        crd_watcher._start_parse_workers()
+        return crd_watcher
+
+    @pytest.fixture(autouse=True)
+    def status_get(self):
+        with mock.patch("fiaas_deploy_daemon.crd.status.FiaasApplicationStatus.get", spec_set=True) as m:
+            m.side_effect = NotFound
+            yield m
+
+    @staticmethod
+    def _wait_for_workers(crd_watcher):
+        for worker in crd_watcher._parse_workers:
+            worker._queue.join()
+
+    def test_starts_a_parse_worker_when_sharding(self, crd_watcher):
+        assert len(crd_watcher._parse_workers) == 1
+
+    def test_listens_for_shard_changes(self, crd_watcher, sharding):
+        sharding.add_listener.assert_called_once_with(crd_watcher._shards_changed)
+
+    @pytest.mark.parametrize("owned, count", ((True, 1), (False, 0)))
+    def test_deploys_only_owned_applications(self, crd_watcher, deploy_queue, sharding, owned, count):
+        sharding.owns.return_value = owned
+        crd_watcher._watcher.watch.return_value = [WatchEvent(ADD_EVENT, FiaasApplication)]
+
+        crd_watcher._watch(None)
+        self._wait_for_workers(crd_watcher)
+
+        sharding.owns.assert_called_with("the-namespace", "example")
+        assert deploy_queue.qsize() == count
+
+    def test_checks_status_of_owned_applications_without_holding_lock(
+        self, crd_watcher, deploy_queue, sharding, status_get
+    ):
+        sharding.owns.return_value = True
+        locked = []
+
+        def get(*args):
+            locked.append(crd_watcher._applications_lock.locked())
+            raise NotFound
+
+        status_get.side_effect = get
+        crd_watcher._watcher.watch.return_value = [WatchEvent(ADD_EVENT, FiaasApplication)]
+
+        crd_watcher._watch(None)
+        self._wait_for_workers(crd_watcher)
+
+        assert locked == [False]
+        assert deploy_queue.qsize() == 1
+
+    def test_deploys_applications_moved_to_this_replica(self, crd_watcher, deploy_queue, sharding):
+        crd_watcher._watcher.watch.return_value = [WatchEvent(ADD_EVENT, FiaasApplication)]
+        crd_watcher._watch(None)
+        self._wait_for_workers(crd_watcher)
+        assert deploy_queue.empty()
+        previous_ring = ShardRing(["other-replica"])
+        sharding.owns.side_effect = lambda namespace, app_name, ring=None: ring is not previous_ring
+
+        crd_watcher._shards_changed(previous_ring)
+
+        assert deploy_queue.get(timeout=5).app_spec is not None
+
+    def test_queues_moved_applications_behind_earlier_events_of_the_application(self, crd_watcher, sharding):
+        worker = mock.create_autospec(ParseWorker, spec_set=True, instance=True)
+        crd_watcher._parse_workers = [worker]
+        sharding.owns.return_value = True
+        crd_watcher._watcher.watch.return_value = [WatchEvent(ADD_EVENT, FiaasApplication)]
+        crd_watcher._watch(None)
+        sharding.owns.side_effect = lambda namespace, app_name, ring=None: ring is None
+
+        crd_watcher._shards_changed(ShardRing(["other-replica"]))
+
+        assert worker.put.call_count == 2
+        changed, moved = (c.args[0] for c in worker.put.call_args_list)
+        assert isinstance(changed, OwnedApplication)
+        assert isinstance(moved, OwnedApplication)
+        assert moved.application.spec.application == changed.application.spec.application
+
+    def test_does_not_deploy_moved_applications_which_have_moved_on(self, crd_watcher, deploy_queue, sharding):
+        application = WatchEvent(ADD_EVENT, FiaasApplication).object
+        sharding.owns.return_value = False
+
+        crd_watcher._deploy_owned(application)
+
+        assert deploy_queue.empty()
+
+    def test_does_not_deploy_applications_owned_before(self, crd_watcher, deploy_queue, sharding):
+        crd_watcher._watcher.watch.return_value = [WatchEvent(ADD_EVENT, FiaasApplication)]
+        crd_watcher._watch(None)
+        sharding.owns.return_value = True
+
+        crd_watcher._shards_changed(ShardRing(["this-replica"]))
+        self._wait_for_workers(crd_watcher)
+
+        assert deploy_queue.empty()
+
+    def test_forgets_deleted_applications(self, crd_watcher, deploy_queue, sharding):
+        crd_watcher._watcher.watch.return_value = [
+            WatchEvent(ADD_EVENT, FiaasApplication),
+            WatchEvent(DELETED_EVENT, FiaasApplication),
+        ]
+        crd_watcher._watch(None)
+        sharding.owns.side_effect = lambda namespace, app_name, ring=None: ring is None
+
+        crd_watcher._shards_changed(ShardRing([]))
+        self._wait_for_workers(crd_watcher)
+
+        assert deploy_queue.empty()
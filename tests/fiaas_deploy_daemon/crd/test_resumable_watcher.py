@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+from k8s.base import APIServerError, WatchBookmark, WatchEvent
+from k8s.client import ClientError, NotFound
+
+from fiaas_deploy_daemon.crd import resumable_watcher
+from fiaas_deploy_daemon.crd.resumable_watcher import ResumableWatcher
+from fiaas_deploy_daemon.crd.types import FiaasApplication
+
+NAMESPACE = "default"
+
+
+def _app_dict(name, resource_version):
+    return {
+        "metadata": {"name": name, "namespace": NAMESPACE, "resourceVersion": resource_version},
+        "spec": {"application": name, "image": "example.com/{}:1".format(name), "config": {}},
+    }
+
+
+def _page(resource_version, *items, _continue=None):
+    metadata = {"resourceVersion": resource_version}
+    if _continue:
+        metadata["continue"] = _continue
+    response = mock.MagicMock()
+    response.json.return_value = {"metadata": metadata, "items": list(items)}
+    return response
+
+
+def _event(event_type, name, resource_version):
+    return WatchEvent(_type=event_type, _object=FiaasApplication.from_dict(_app_dict(name, resource_version)))
+
+
+def _bookmark(resource_version):
+    bookmark = mock.create_autospec(WatchBookmark, instance=True)
+    bookmark.resource_version = resource_version
+    bookmark.has_object.return_value = False
+    return bookmark
+
+
+def _names(events):
+    return [(e.type, e.object.metadata.name) for e in events]
+
+
+class TestResumableWatcher(object):
+    @pytest.fixture
+    def client(self):
+        with mock.patch.object(FiaasApplication, "_client") as client:
+            client.get.return_value = _page("100", _app_dict("app1", "10"), _app_dict("app2", "20"))
+            yield client
+
+    @pytest.fixture
+    def watch_list(self):
+        with mock.patch.object(FiaasApplication, "watch_list") as mockk:
+            mockk.return_value = []
+            yield mockk
+
+    @pytest.fixture
+    def watcher(self):
+        return ResumableWatcher(FiaasApplication)
+
+    def test_lists_in_pages_and_watches_from_first_page_version(self, watcher, client, watch_list):
+        client.get.side_effect = [
+            _page("100", _app_dict("app1", "10"), _continue="token"),
+            _page("101", _app_dict("app2", "20")),
+        ]
+
+        events = list(watcher.watch(namespace=NAMESPACE))
+
+        assert _names(events) == [(WatchEvent.ADDED, "app1"), (WatchEvent.ADDED, "app2")]
+        url = "/apis/fiaas.schibsted.io/v1/namespaces/default/applications/"
+        assert client.get.call_args_list == [
+            mock.call(url, params={"limit": resumable_watcher.LIST_PAGE_SIZE}),
+            mock.call(url, params={"limit": resumable_watcher.LIST_PAGE_SIZE, "continue": "token"}),
+        ]
+        watch_list.assert_called_once_with(namespace=NAMESPACE, resource_version="100", allow_bookmarks=True)
+
+    def test_uses_configured_page_size(self, client, watch_list):
+        list(ResumableWatcher(FiaasApplication, page_size=10).watch(namespace=NAMESPACE))
+
+        assert client.get.call_args.kwargs["params"] == {"limit": 10}
+
+    def test_yields_page_before_getting_next(self, watcher, client, watch_list):
+        client.get.side_effect = [
+            _page("100", _app_dict("app1", "10"), _continue="token"),
+            _page("100", _app_dict("app2", "20")),
+        ]
+
+        events = watcher.watch(namespace=NAMESPACE)
+
+        assert next(events).object.metadata.name == "app1"
+        assert client.get.call_count == 1
+        assert next(events).object.metadata.name == "app2"
+
+    def test_lists_from_start_when_continue_token_expires(self, watcher, client, watch_list):
+        client.get.side_effect = [
+            _page("100", _app_dict("app1", "10"), _continue="token"),
+            ClientError(response=mock.MagicMock(status_code=410)),
+            _page("150", _app_dict("app1", "10"), _continue="token2"),
+            _page("150", _app_dict("app2", "20")),
+        ]
+
+        events = list(watcher.watch(namespace=NAMESPACE))
+
+        assert _names(events) == [(WatchEvent.ADDED, "app1"), (WatchEvent.ADDED, "app2")]
+        assert client.get.call_args_list[2].kwargs["params"] == {"limit": resumable_watcher.LIST_PAGE_SIZE}
+        watch_list.assert_called_once_with(namespace=NAMESPACE, resource_version="150", allow_bookmarks=True)
+
+    def test_list_errors_are_raised(self, watcher, client, watch_list):
+        client.get.side_effect = NotFound()
+
+        with pytest.raises(NotFound):
+            list(watcher.watch(namespace=NAMESPACE))
+        assert not watcher.synced.is_set()
+
+    def test_initial_sync_duration_is_recorded_once(self, watcher, client, watch_list):
+        watch_list.side_effect = [APIServerError({"code": 410}), []]
+
+        with mock.patch.object(resumable_watcher.watch_initial_sync_duration, "labels") as duration:
+            list(watcher.watch(namespace=NAMESPACE))
+            list(watcher.watch(namespace=NAMESPACE))
+
+        duration.assert_called_once_with("FiaasApplication")
+
+    def test_lists_all_namespaces_without_namespace(self, watcher, client, watch_list):
+        list(watcher.watch())
+
+        client.get.assert_called_once_with(
+            "/apis/fiaas.schibsted.io/v1/applications", params={"limit": resumable_watcher.LIST_PAGE_SIZE}
+        )
+
+    def test_resumes_from_last_seen_version_without_listing_again(self, watcher, client, watch_list):
+        watch_list.side_effect = [[_event(WatchEvent.MODIFIED, "app1", "110"), _bookmark("120")], []]
+
+        first = list(watcher.watch(namespace=NAMESPACE))
+        second = list(watcher.watch(namespace=NAMESPACE))
+
+        assert _names(first) == [(WatchEvent.ADDED, "app1"), (WatchEvent.ADDED, "app2"), (WatchEvent.MODIFIED, "app1")]
+        assert second == []
+        client.get.assert_called_once()
+        assert [c.kwargs["resource_version"] for c in watch_list.call_args_list] == ["100", "120"]
+
+    def test_skips_unchanged_resources_in_watch(self, watcher, client, watch_list):
+        watch_list.return_value = [
+            _event(WatchEvent.MODIFIED, "app1", "10"),
+            _event(WatchEvent.DELETED, "app2", "20"),
+            _event(WatchEvent.ADDED, "app2", "20"),
+        ]
+
+        events = list(watcher.watch(namespace=NAMESPACE))
+
+        assert _names(events)[2:] == [(WatchEvent.DELETED, "app2"), (WatchEvent.ADDED, "app2")]
+
+    def test_relists_on_gone_and_skips_replayed_resources(self, watcher, client, watch_list):
+        watch_list.side_effect = [APIServerError({"code": 410}), []]
+        list(watcher.watch(namespace=NAMESPACE))
+        client.get.return_value = _page("200", _app_dict("app1", "10"), _app_dict("app2", "21"))
+
+        with (
+            mock.patch.object(resumable_watcher.watch_replayed_events, "labels") as replayed,
+            mock.patch.object(resumable_watcher.watch_relists, "labels") as relists,
+        ):
+            events = list(watcher.watch(namespace=NAMESPACE))
+
+        assert _names(events) == [(WatchEvent.ADDED, "app2")]
+        replayed.assert_called_once_with("FiaasApplication")
+        relists.assert_called_once_with("FiaasApplication", "expired")
+        assert client.get.call_count == 2
+        assert watch_list.call_args_list[1].kwargs["resource_version"] == "200"
+
+    def test_first_list_is_counted_as_initial(self, watcher, client, watch_list):
+        with mock.patch.object(resumable_watcher.watch_relists, "labels") as relists:
+            assert not watcher.synced.is_set()
+            list(watcher.watch(namespace=NAMESPACE))
+
+        relists.assert_called_once_with("FiaasApplication", "initial")
+        assert watcher.synced.is_set()
+
+    def test_other_errors_are_raised_and_resumed_from(self, watcher, client, watch_list):
+        watch_list.side_effect = [APIServerError({"code": 500}), []]
+
+        with pytest.raises(APIServerError):
+            list(watcher.watch(namespace=NAMESPACE))
+        list(watcher.watch(namespace=NAMESPACE))
+
+        client.get.assert_called_once()
+        assert [c.kwargs["resource_version"] for c in watch_list.call_args_list] == ["100", "100"]
+
+    def test_forgets_deleted_resources(self, watcher, client, watch_list):
+        watch_list.return_value = [_event(WatchEvent.DELETED, "app1", "110")]
+
+        list(watcher.watch(namespace=NAMESPACE))
+
+        assert list(watcher._seen) == [("app2", NAMESPACE)]
+
+    def test_remembers_a_bounded_number_of_resources(self, client, watch_list):
+        watcher = ResumableWatcher(FiaasApplication, capacity=2)
+        watch_list.return_value = [_event(WatchEvent.ADDED, "app3", "110")]
+
+        list(watcher.watch(namespace=NAMESPACE))
+
+        assert list(watcher._seen) == [("app2", NAMESPACE), ("app3", NAMESPACE)]
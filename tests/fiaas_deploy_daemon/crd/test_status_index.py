@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+from k8s.base import WatchEvent
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.crd.status_index import IndexedStatus, StatusIndex
+from fiaas_deploy_daemon.crd.types import FiaasApplicationStatus
+
+NAMESPACE = "default"
+
+
+def _event(event_type, deployment_id, result="SUCCESS", app_name="testapp", last_updated="2020-01-01"):
+    status = FiaasApplicationStatus.from_dict(
+        {
+            "metadata": {
+                "name": "{}-{}".format(app_name, deployment_id),
+                "namespace": NAMESPACE,
+                "labels": {"app": app_name, "fiaas/deployment_id": deployment_id},
+                "annotations": {"fiaas/last_updated": last_updated},
+            },
+            "result": result,
+        }
+    )
+    return WatchEvent(_type=event_type, _object=status)
+
+
+class TestStatusIndex(object):
+    @pytest.fixture
+    def config(self):
+        config = Configuration([])
+        config.namespace = NAMESPACE
+        return config
+
+    @pytest.fixture
+    def status_index(self, config):
+        status_index = StatusIndex(config)
+        status_index._watcher = mock.MagicMock()
+        return status_index
+
+    def test_watches_configured_namespace(self, status_index):
+        status_index._watch()
+
+        status_index._watcher.watch.assert_called_once_with(namespace=NAMESPACE)
+
+    def test_watches_forever(self, status_index):
+        with mock.patch("fiaas_deploy_daemon.crd.status_index.watch_forever") as watch_forever:
+            status_index()
+
+        watch_forever.assert_called_once_with(status_index._watch, "FiaasApplicationStatuses")
+
+    def test_watches_all_namespaces_with_multi_namespace_support(self, config):
+        config.enable_deprecated_multi_namespace_support = True
+
+        assert StatusIndex(config)._namespace is None
+
+    def test_lookups_return_none_until_synced(self, status_index):
+        status_index._watcher.synced.is_set.return_value = False
+        status_index._handle_watch_event(_event(WatchEvent.ADDED, "1"))
+
+        assert status_index.result("testapp", NAMESPACE, "1") is None
+        assert status_index.find("testapp", NAMESPACE) is None
+        assert status_index.all() is None
+
+    def test_indexes_latest_result(self, status_index):
+        status_index._handle_watch_event(_event(WatchEvent.ADDED, "1", result="RUNNING"))
+        status_index._handle_watch_event(_event(WatchEvent.MODIFIED, "1", result="SUCCESS"))
+
+        assert status_index.result("testapp", NAMESPACE, "1") == "SUCCESS"
+        assert status_index.result("testapp", NAMESPACE, "2") is None
+        assert status_index.result("otherapp", NAMESPACE, "1") is None
+
+    def test_forgets_deleted_statuses(self, status_index):
+        status_index._handle_watch_event(_event(WatchEvent.ADDED, "1"))
+        status_index._handle_watch_event(_event(WatchEvent.ADDED, "2"))
+        status_index._handle_watch_event(_event(WatchEvent.DELETED, "1"))
+
+        assert status_index.result("testapp", NAMESPACE, "1") is None
+        assert status_index.find("testapp", NAMESPACE) == [
+            IndexedStatus("testapp-2", NAMESPACE, "SUCCESS", "2020-01-01")
+        ]
+
+        status_index._handle_watch_event(_event(WatchEvent.DELETED, "2"))
+
+        assert status_index.find("testapp", NAMESPACE) == []
+        assert status_index._statuses == {}
+
+    def test_ignores_statuses_without_labels(self, status_index):
+        event = _event(WatchEvent.ADDED, "1")
+        event.object.metadata.labels = {}
+
+        status_index._handle_watch_event(event)
+
+        assert status_index._statuses == {}
+
+    def test_returns_statuses_of_all_applications(self, status_index):
+        status_index._handle_watch_event(_event(WatchEvent.ADDED, "1"))
+        status_index._handle_watch_event(_event(WatchEvent.ADDED, "1", app_name="otherapp"))
+
+        assert status_index.all() == {
+            (NAMESPACE, "testapp"): [IndexedStatus("testapp-1", NAMESPACE, "SUCCESS", "2020-01-01")],
+            (NAMESPACE, "otherapp"): [IndexedStatus("otherapp-1", NAMESPACE, "SUCCESS", "2020-01-01")],
+        }
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.coordination.sharding import Sharding
+from fiaas_deploy_daemon.crd.status import OLD_STATUSES_TO_KEEP
+from fiaas_deploy_daemon.crd.status_index import IndexedStatus, StatusIndex
+from fiaas_deploy_daemon.crd.status_sweeper import StatusSweeper
+
+
+def _statuses(app_name, count):
+    return [
+        IndexedStatus("{}-{}".format(app_name, i), "default", "SUCCESS", "2020-12-12T23.59.{:02}".format(i))
+        for i in range(count)
+    ]
+
+
+class TestStatusSweeper(object):
+    @pytest.fixture
+    def status_index(self):
+        return mock.create_autospec(StatusIndex, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def sharding(self):
+        sharding = mock.create_autospec(Sharding, spec_set=True, instance=True)
+        sharding.owns.return_value = True
+        return sharding
+
+    @pytest.fixture
+    def sweeper(self, status_index, sharding):
+        return StatusSweeper(Configuration([]), status_index, sharding)
+
+    @pytest.fixture
+    def delete(self):
+        with mock.patch("fiaas_deploy_daemon.crd.status.FiaasApplicationStatus.delete", spec_set=True) as m:
+            yield m
+
+    def test_deletes_old_statuses_of_every_application(self, sweeper, status_index, delete):
+        status_index.all.return_value = {
+            ("default", "app"): _statuses("app", OLD_STATUSES_TO_KEEP + 2),
+            ("default", "other"): _statuses("other", OLD_STATUSES_TO_KEEP + 1),
+            ("default", "new"): _statuses("new", 1),
+        }
+
+        sweeper._sweep()
+
+        assert sorted(delete.call_args_list) == [
+            mock.call("app-0", "default"),
+            mock.call("app-1", "default"),
+            mock.call("other-0", "default"),
+        ]
+
+    def test_does_nothing_until_statuses_are_indexed(self, sweeper, status_index, delete):
+        status_index.all.return_value = None
+
+        sweeper._sweep()
+
+        delete.assert_not_called()
+
+    def test_only_deletes_old_statuses_of_owned_applications(self, sweeper, status_index, sharding, delete):
+        status_index.all.return_value = {
+            ("default", "app"): _statuses("app", OLD_STATUSES_TO_KEEP + 1),
+            ("default", "other"): _statuses("other", OLD_STATUSES_TO_KEEP + 1),
+        }
+        sharding.owns.side_effect = lambda namespace, app_name: app_name == "app"
+
+        sweeper._sweep()
+
+        delete.assert_called_once_with("app-0", "default")
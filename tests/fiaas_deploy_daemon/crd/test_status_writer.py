@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from unittest import mock
+
+import pytest
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.crd import status_writer as status_writer_module
+from fiaas_deploy_daemon.crd.status_writer import DisabledStatusWriter, StatusWriter
+from fiaas_deploy_daemon.lifecycle import Subject
+
+
+def _subject(app_name="app", deployment_id="1"):
+    return Subject("uid", app_name, "default", deployment_id, None, {}, {})
+
+
+class TestStatusWriter(object):
+    @pytest.fixture
+    def config(self):
+        config = Configuration([])
+        config.status_write_queue_size = 2
+        return config
+
+    @pytest.fixture
+    def status_writer(self, config):
+        return StatusWriter(config)
+
+    def _write_pending(self, status_writer):
+        while status_writer._pending:
+            _, (write, result, subject) = status_writer._pending.popitem(last=False)
+            status_writer._write(write, result, subject)
+
+    def test_writes_changes_in_order(self, status_writer):
+        write = mock.MagicMock()
+        first, second = _subject("first"), _subject("second")
+
+        status_writer.put(write, "RUNNING", first)
+        status_writer.put(write, "RUNNING", second)
+        self._write_pending(status_writer)
+
+        assert write.call_args_list == [mock.call("RUNNING", first), mock.call("RUNNING", second)]
+
+    def test_only_writes_latest_change_of_deployment(self, status_writer):
+        write = mock.MagicMock()
+        subject = _subject()
+
+        with mock.patch.object(status_writer_module.status_writes_coalesced, "inc") as coalesced:
+            for result in ("INITIATED", "RUNNING", "SUCCESS"):
+                status_writer.put(write, result, subject)
+        self._write_pending(status_writer)
+
+        write.assert_called_once_with("SUCCESS", subject)
+        assert coalesced.call_count == 2
+
+    def test_writes_each_deployment_of_application(self, status_writer):
+        write = mock.MagicMock()
+
+        status_writer.put(write, "SUCCESS", _subject(deployment_id="1"))
+        status_writer.put(write, "RUNNING", _subject(deployment_id="2"))
+        self._write_pending(status_writer)
+
+        assert write.call_count == 2
+
+    def test_continues_after_failed_write(self, status_writer):
+        failing = mock.MagicMock(side_effect=IOError("API unavailable"))
+        write = mock.MagicMock()
+
+        status_writer.put(failing, "RUNNING", _subject("first"))
+        status_writer.put(write, "RUNNING", _subject("second"))
+        self._write_pending(status_writer)
+
+        write.assert_called_once_with("RUNNING", _subject("second"))
+
+    def test_sets_log_extras_of_deployment_before_writing(self, status_writer):
+        write = mock.MagicMock()
+        subject = _subject()
+
+        with mock.patch("fiaas_deploy_daemon.crd.status_writer.set_extras") as set_extras:
+            status_writer.put(write, "RUNNING", subject)
+            self._write_pending(status_writer)
+
+        set_extras.assert_called_once_with(app_name="app", namespace="default", deployment_id="1")
+
+    def test_blocks_new_deployments_while_full(self, status_writer):
+        write = mock.MagicMock()
+        status_writer.put(write, "RUNNING", _subject("first"))
+        status_writer.put(write, "RUNNING", _subject("second"))
+        done = threading.Event()
+
+        def put_third():
+            status_writer.put(write, "RUNNING", _subject("third"))
+            done.set()
+
+        threading.Thread(target=put_third, daemon=True).start()
+        assert not done.wait(0.1)
+        status_writer.put(write, "SUCCESS", _subject("first"))
+
+        status_writer.start()
+        assert done.wait(5)
+
+
+class TestDisabledStatusWriter(object):
+    def test_writes_immediately(self):
+        write = mock.MagicMock()
+        subject = _subject()
+
+        DisabledStatusWriter().put(write, "RUNNING", subject)
+
+        write.assert_called_once_with("RUNNING", subject)
@@ -17,7 +17,10 @@
 import pytest
 from unittest import mock
 
+from fiaas_deploy_daemon.config import Configuration
 from fiaas_deploy_daemon.deployer.kubernetes.owner_references import OwnerReferences
+from fiaas_deploy_daemon.deployer.kubernetes.resource_cache import DisabledResourceCache
+from fiaas_deploy_daemon.deployer.kubernetes.resource_client import ResourceClient
 
 
 @pytest.helpers.register
@@ -49,3 +52,11 @@ def create_metadata(
 @pytest.fixture
 def owner_references():
     return mock.create_autospec(OwnerReferences(), spec_set=True, instance=True)
+
+
+@pytest.fixture
+def resource_client():
+    config = mock.create_autospec(Configuration([]), spec_set=True)
+    config.skip_unchanged_writes = False
+    config.enable_server_side_apply = False
+    return ResourceClient(config, DisabledResourceCache())
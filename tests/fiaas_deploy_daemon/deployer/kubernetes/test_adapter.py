@@ -11,11 +11,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import threading
+import time
 from unittest import mock
 import pytest
+from k8s.client import ClientError
 from k8s.models.common import ObjectMeta
 from k8s.models.resourcequota import ResourceQuota, ResourceQuotaSpec, NotBestEffort, BestEffort
+from k8s.models.service import Service
+from requests import Response, Session
 
+from fiaas_deploy_daemon import log_extras
 from fiaas_deploy_daemon.config import Configuration
 from fiaas_deploy_daemon.deployer.kubernetes.adapter import K8s, _make_selector
 from fiaas_deploy_daemon.deployer.kubernetes.autoscaler import AutoscalerDeployer
@@ -24,7 +30,9 @@ from fiaas_deploy_daemon.deployer.kubernetes.ingress import IngressDeployer
 from fiaas_deploy_daemon.deployer.kubernetes.service import ServiceDeployer
 from fiaas_deploy_daemon.deployer.kubernetes.service_account import ServiceAccountDeployer
 from fiaas_deploy_daemon.deployer.kubernetes.pod_disruption_budget import PodDisruptionBudgetDeployer
+from fiaas_deploy_daemon.deployer.kubernetes.resourcequota_cache import ResourceQuotaCache
 from fiaas_deploy_daemon.deployer.kubernetes.role_binding import RoleBindingDeployer
+from fiaas_deploy_daemon.extension_hook_caller import ExtensionHookCaller
 from fiaas_deploy_daemon.specs.models import ResourcesSpec, ResourceRequirementSpec
 
 FIAAS_VERSION = "1"
@@ -67,14 +75,46 @@ class TestK8s(object):
             mockk.return_value = []
             yield mockk
 
+    @pytest.fixture
+    def resourcequota_cache(self):
+        return ResourceQuotaCache(Configuration([]))
+
+    @pytest.fixture
+    def extension_hook(self):
+        return ExtensionHookCaller(Configuration([]), mock.create_autospec(Session))
+
     @pytest.fixture
     def k8s(
         self, service_deployer, deployment_deployer, ingress_deployer,
         autoscaler_deployer, service_account_deployer,
-        pod_disruption_budget_deployer, role_binding_deployer
+        pod_disruption_budget_deployer, role_binding_deployer, resourcequota_cache, extension_hook
+    ):
+        config = mock.create_autospec(Configuration([]), spec_set=True)
+        config.version = FIAAS_VERSION
+        config.resource_deploy_workers = 1
+        return K8s(
+            config,
+            service_deployer,
+            deployment_deployer,
+            ingress_deployer,
+            autoscaler_deployer,
+            service_account_deployer,
+            pod_disruption_budget_deployer,
+            role_binding_deployer,
+            resourcequota_cache,
+            extension_hook,
+        )
+
+    @pytest.fixture
+    def parallel_k8s(
+        self, service_deployer, deployment_deployer, ingress_deployer,
+        autoscaler_deployer, service_account_deployer,
+        pod_disruption_budget_deployer, role_binding_deployer, resourcequota_cache, extension_hook
     ):
         config = mock.create_autospec(Configuration([]), spec_set=True)
         config.version = FIAAS_VERSION
+        config.enable_service_account_per_app = True
+        config.resource_deploy_workers = 4
         return K8s(
             config,
             service_deployer,
@@ -83,7 +123,9 @@ class TestK8s(object):
             autoscaler_deployer,
             service_account_deployer,
             pod_disruption_budget_deployer,
-            role_binding_deployer
+            role_binding_deployer,
+            resourcequota_cache,
+            extension_hook,
         )
 
     def test_make_labels(self, k8s, app_spec):
@@ -170,7 +212,10 @@ class TestK8s(object):
         k8s.deploy(app_spec)
 
         pytest.helpers.assert_any_call(
-            deployment_deployer.deploy, expected_app_spec, selector, labels, expect_strip_resources
+            deployment_deployer.render, expected_app_spec, selector, labels, expect_strip_resources
+        )
+        pytest.helpers.assert_any_call(
+            deployment_deployer.save, expected_app_spec, selector, labels, expect_strip_resources, []
         )
 
     def test_pass_to_ingress(self, app_spec, k8s, ingress_deployer, resource_quota_list):
@@ -178,7 +223,8 @@ class TestK8s(object):
 
         k8s.deploy(app_spec)
 
-        pytest.helpers.assert_any_call(ingress_deployer.deploy, app_spec, labels)
+        pytest.helpers.assert_any_call(ingress_deployer.render, app_spec, labels)
+        pytest.helpers.assert_any_call(ingress_deployer.save, app_spec, labels, [])
 
     def test_pass_to_service(self, app_spec, k8s, service_deployer, resource_quota_list):
         selector = _make_selector(app_spec)
@@ -186,7 +232,8 @@ class TestK8s(object):
 
         k8s.deploy(app_spec)
 
-        pytest.helpers.assert_any_call(service_deployer.deploy, app_spec, selector, labels)
+        pytest.helpers.assert_any_call(service_deployer.render, app_spec, selector, labels)
+        pytest.helpers.assert_any_call(service_deployer.save, app_spec, selector, labels, [])
 
     def test_pass_to_pod_disruption_budget(self, app_spec, k8s, pod_disruption_budget_deployer, resource_quota_list):
         selector = _make_selector(app_spec)
@@ -194,7 +241,60 @@ class TestK8s(object):
 
         k8s.deploy(app_spec)
 
-        pytest.helpers.assert_any_call(pod_disruption_budget_deployer.deploy, app_spec, selector, labels)
+        pytest.helpers.assert_any_call(pod_disruption_budget_deployer.render, app_spec, selector, labels)
+        pytest.helpers.assert_any_call(pod_disruption_budget_deployer.save, app_spec, selector, labels, [])
+
+    def test_renders_all_resources_before_saving_any(
+        self, app_spec, k8s, service_deployer, ingress_deployer, deployment_deployer
+    ):
+        calls = []
+        for name, deployer in (
+            ("service", service_deployer),
+            ("ingress", ingress_deployer),
+            ("deployment", deployment_deployer),
+        ):
+            deployer.render.side_effect = lambda *args, name=name: calls.append("render " + name) or []
+            deployer.save.side_effect = lambda *args, name=name: calls.append("save " + name)
+
+        k8s.deploy(app_spec)
+
+        assert calls == [
+            "render service",
+            "render ingress",
+            "render deployment",
+            "save service",
+            "save ingress",
+            "save deployment",
+        ]
+
+    def test_deploys_resource_again_on_conflict(self, app_spec, k8s, service_deployer):
+        response = mock.create_autospec(Response)
+        response.status_code = 409
+        service_deployer.save.side_effect = ClientError("conflict", response=response)
+
+        k8s.deploy(app_spec)
+
+        pytest.helpers.assert_any_call(service_deployer.deploy, app_spec, _make_selector(app_spec), mock.ANY)
+
+    def test_raises_other_errors_when_saving(self, app_spec, k8s, service_deployer):
+        response = mock.create_autospec(Response)
+        response.status_code = 422
+        service_deployer.save.side_effect = ClientError("invalid", response=response)
+
+        with pytest.raises(ClientError):
+            k8s.deploy(app_spec)
+
+        service_deployer.deploy.assert_not_called()
+
+    def test_lists_resource_quotas_once_per_namespace(self, app_spec, k8s, resource_quota_list):
+        k8s.deploy(app_spec)
+        k8s.deploy(app_spec._replace(name="other"))
+        k8s.deploy(app_spec._replace(namespace="other"))
+
+        assert resource_quota_list.call_args_list == [
+            mock.call(namespace=app_spec.namespace),
+            mock.call(namespace="other"),
+        ]
 
     @pytest.mark.parametrize("service_account_per_app_enabled", (True, False))
     def test_pass_to_service_account(
@@ -209,11 +309,14 @@ class TestK8s(object):
         service_account_deployer,
         service_account_per_app_enabled,
         pod_disruption_budget_deployer,
-        role_binding_deployer
+        role_binding_deployer,
+        resourcequota_cache,
+        extension_hook,
     ):
 
         config = mock.create_autospec(Configuration([]), spec_set=True)
         config.version = FIAAS_VERSION
+        config.resource_deploy_workers = 1
         config.enable_service_account_per_app = service_account_per_app_enabled
         k8s = K8s(
             config,
@@ -223,7 +326,9 @@ class TestK8s(object):
             autoscaler_deployer,
             service_account_deployer,
             pod_disruption_budget_deployer,
-            role_binding_deployer
+            role_binding_deployer,
+            resourcequota_cache,
+            extension_hook,
         )
 
         labels = k8s._make_labels(app_spec)
@@ -248,11 +353,14 @@ class TestK8s(object):
         service_account_deployer,
         enable_service_account_per_app,
         pod_disruption_budget_deployer,
-        role_binding_deployer
+        role_binding_deployer,
+        resourcequota_cache,
+        extension_hook,
     ):
 
         config = mock.create_autospec(Configuration([]), spec_set=True)
         config.version = FIAAS_VERSION
+        config.resource_deploy_workers = 1
         config.enable_service_account_per_app = enable_service_account_per_app
         k8s = K8s(
             config,
@@ -262,7 +370,9 @@ class TestK8s(object):
             autoscaler_deployer,
             service_account_deployer,
             pod_disruption_budget_deployer,
-            role_binding_deployer
+            role_binding_deployer,
+            resourcequota_cache,
+            extension_hook,
         )
 
         labels = k8s._make_labels(app_spec)
@@ -273,3 +383,85 @@ class TestK8s(object):
             pytest.helpers.assert_any_call(role_binding_deployer.deploy, app_spec, labels)
         else:
             role_binding_deployer.deploy.assert_not_called()
+
+    def test_deploys_independent_resources_concurrently(
+        self, app_spec, parallel_k8s, service_deployer, ingress_deployer, pod_disruption_budget_deployer
+    ):
+        # Each of these waits for the others to have started, which can only happen when they run concurrently
+        barrier = threading.Barrier(3, timeout=5)
+        for deployer in (service_deployer, ingress_deployer, pod_disruption_budget_deployer):
+            deployer.save.side_effect = lambda *args: barrier.wait()
+
+        parallel_k8s.deploy(app_spec)
+
+        assert service_deployer.save.call_count == 1
+        assert ingress_deployer.save.call_count == 1
+        assert pod_disruption_budget_deployer.save.call_count == 1
+
+    @pytest.mark.parametrize("fixture", ("k8s", "parallel_k8s"))
+    def test_sends_objects_of_all_resources_to_extension_hook_together(
+        self, request, app_spec, fixture, service_deployer, ingress_deployer, pod_disruption_budget_deployer
+    ):
+        k8s = request.getfixturevalue(fixture)
+        session = mock.create_autospec(Session)
+        response = mock.create_autospec(Response)
+        response.status_code = 200
+        response.json.return_value = {"objects": [None, None, None]}
+        session.post.return_value = response
+        config = Configuration(["--extension-hook-url", "URL"])
+        k8s._extension_hook = ExtensionHookCaller(config, session)
+        for deployer in (service_deployer, ingress_deployer, pod_disruption_budget_deployer):
+            deployer.render.return_value = [Service()]
+
+        k8s.deploy(app_spec)
+
+        session.post.assert_called_once()
+        assert session.post.call_args.args[0] == "fiaas/deploy/batch"
+        service_deployer.deploy.assert_not_called()
+
+    def test_keeps_order_of_dependent_resources(
+        self, app_spec, parallel_k8s, service_account_deployer, role_binding_deployer, deployment_deployer,
+        autoscaler_deployer
+    ):
+        order = []
+        lock = threading.Lock()
+
+        def record(name):
+            def _record(*args):
+                time.sleep(0.01)
+                with lock:
+                    order.append(name)
+            return _record
+
+        service_account_deployer.deploy.side_effect = record("service_account")
+        role_binding_deployer.deploy.side_effect = record("role_binding")
+        deployment_deployer.save.side_effect = record("deployment")
+        autoscaler_deployer.save.side_effect = record("autoscaler")
+
+        parallel_k8s.deploy(app_spec)
+
+        assert order[0] == "service_account"
+        assert order.index("deployment") < order.index("autoscaler")
+        assert sorted(order) == ["autoscaler", "deployment", "role_binding", "service_account"]
+
+    def test_errors_propagate_and_stop_dependent_resources(
+        self, app_spec, parallel_k8s, deployment_deployer, autoscaler_deployer
+    ):
+        deployment_deployer.save.side_effect = ValueError("deployment failed")
+
+        with pytest.raises(ValueError, match="deployment failed"):
+            parallel_k8s.deploy(app_spec)
+
+        autoscaler_deployer.save.assert_not_called()
+
+    def test_sets_log_extras_in_worker_threads(self, app_spec, parallel_k8s, service_deployer):
+        extras = {}
+
+        def capture(*args):
+            extras["app_name"] = log_extras._LOG_EXTRAS.app_name
+
+        service_deployer.save.side_effect = capture
+
+        parallel_k8s.deploy(app_spec)
+
+        assert extras["app_name"] == app_spec.name
@@ -67,8 +67,8 @@ class TestAutoscalerDeployer(object):
         return create_autospec(ExtensionHookCaller, spec_set=True, instance=True)
 
     @pytest.fixture
-    def deployer(self, owner_references, extension_hook):
-        return AutoscalerDeployer(owner_references, extension_hook)
+    def deployer(self, owner_references, extension_hook, resource_client):
+        return AutoscalerDeployer(owner_references, extension_hook, resource_client)
 
     @pytest.mark.usefixtures("get")
     def test_new_autoscaler(self, deployer, post, app_spec, owner_references, extension_hook):
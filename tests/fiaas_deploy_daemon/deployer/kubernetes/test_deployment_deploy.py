@@ -275,9 +275,11 @@ class TestDeploymentDeployer(object):
 
     @pytest.mark.usefixtures("get")
     def test_managed_environment_variables(
-        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook
+        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
     ):
-        deployer = DeploymentDeployer(config, datadog, prometheus, secrets, owner_references, extension_hook)
+        deployer = DeploymentDeployer(
+            config, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
+        )
         env = deployer._make_env(app_spec)
         env_keys = [var.name for var in env]
         assert "FIAAS_ARTIFACT_NAME" in env_keys
@@ -289,7 +291,7 @@ class TestDeploymentDeployer(object):
 
     @pytest.mark.usefixtures("get")
     def test_disable_service_links(
-        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook
+        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
     ):
         # Modify config to disable service links
         config.enable_service_links = False
@@ -300,7 +302,9 @@ class TestDeploymentDeployer(object):
         post.side_effect = None
         post.return_value = mock_response
 
-        deployer = DeploymentDeployer(config, datadog, prometheus, secrets, owner_references, extension_hook)
+        deployer = DeploymentDeployer(
+            config, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
+        )
         deployer.deploy(app_spec, SELECTOR, LABELS, False)
 
         pytest.helpers.assert_any_call(post, DEPLOYMENTS_URI, expected_deployment)
@@ -312,7 +316,7 @@ class TestDeploymentDeployer(object):
 
     @pytest.mark.usefixtures("get")
     def test_deploy_new_deployment(
-        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook
+        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
     ):
         expected_deployment = create_expected_deployment(config, app_spec)
         mock_response = create_autospec(Response)
@@ -320,7 +324,9 @@ class TestDeploymentDeployer(object):
         post.side_effect = None
         post.return_value = mock_response
 
-        deployer = DeploymentDeployer(config, datadog, prometheus, secrets, owner_references, extension_hook)
+        deployer = DeploymentDeployer(
+            config, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
+        )
         deployer.deploy(app_spec, SELECTOR, LABELS, False)
 
         pytest.helpers.assert_any_call(post, DEPLOYMENTS_URI, expected_deployment)
@@ -344,14 +350,27 @@ class TestDeploymentDeployer(object):
         secrets,
         owner_references,
         extension_hook,
+        resource_client,
     ):
         config.enable_service_links = enable_service_links
-        deployer = DeploymentDeployer(config, datadog, prometheus, secrets, owner_references, extension_hook)
+        deployer = DeploymentDeployer(
+            config, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
+        )
         assert deployer._enable_service_links == expected_result
         # Check the podspec to see if the service links are enabled
 
     def test_deploy_clears_alpha_beta_annotations(
-        self, put, get, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook
+        self,
+        put,
+        get,
+        config,
+        app_spec,
+        datadog,
+        prometheus,
+        secrets,
+        owner_references,
+        extension_hook,
+        resource_client,
     ):
         old_strongbox_spec = app_spec.strongbox._replace(enabled=True, groups=["group1", "group2"])
         old_app_spec = app_spec._replace(strongbox=old_strongbox_spec)
@@ -367,7 +386,9 @@ class TestDeploymentDeployer(object):
         put.side_effect = None
         put.return_value = put_mock_response
 
-        deployer = DeploymentDeployer(config, datadog, prometheus, secrets, owner_references, extension_hook)
+        deployer = DeploymentDeployer(
+            config, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
+        )
         deployer.deploy(app_spec, SELECTOR, LABELS, False)
 
         pytest.helpers.assert_any_call(put, DEPLOYMENTS_URI + "testapp", expected_deployment)
@@ -401,8 +422,11 @@ class TestDeploymentDeployer(object):
         secrets,
         owner_references,
         extension_hook,
+        resource_client,
     ):
-        deployer = DeploymentDeployer(config, datadog, prometheus, secrets, owner_references, extension_hook)
+        deployer = DeploymentDeployer(
+            config, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
+        )
 
         image = "finntech/testimage:version2"
         version = "version2"
@@ -509,7 +533,7 @@ class TestDeploymentDeployer(object):
 
     @pytest.mark.usefixtures("get")
     def test_search_domains(
-        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook
+        self, post, config, app_spec, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
     ):
         config.dns_search_domains = ["example.com", "example.org"]
         expected_deployment = create_expected_deployment(config, app_spec)
@@ -521,7 +545,9 @@ class TestDeploymentDeployer(object):
         post.side_effect = None
         post.return_value = mock_response
 
-        deployer = DeploymentDeployer(config, datadog, prometheus, secrets, owner_references, extension_hook)
+        deployer = DeploymentDeployer(
+            config, datadog, prometheus, secrets, owner_references, extension_hook, resource_client
+        )
         deployer.deploy(app_spec, SELECTOR, LABELS, False)
 
         pytest.helpers.assert_any_call(post, DEPLOYMENTS_URI, expected_deployment)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+from k8s.base import WatchEvent
+from k8s.models.deployment import Deployment
+from k8s.watcher import Watcher
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.deployer.kubernetes.deployment_watcher import CachedDeploymentWatcher, DeploymentWatcher
+from fiaas_deploy_daemon.deployer.kubernetes.resource_cache import ResourceCache
+from fiaas_deploy_daemon.deployer.scheduler import Scheduler
+
+NAME = "testapp"
+NAMESPACE = "default"
+
+
+def _event(event_type, labels=None):
+    if labels is None:
+        labels = {"fiaas/deployment_id": "deployment_id"}
+    deployment = Deployment.from_dict({"metadata": {"name": NAME, "namespace": NAMESPACE, "labels": labels}})
+    return WatchEvent({"type": event_type, "object": deployment.as_dict()}, Deployment)
+
+
+class TestDeploymentWatcher(object):
+    @pytest.fixture
+    def scheduler(self):
+        return mock.create_autospec(Scheduler, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def watcher(self):
+        return mock.create_autospec(spec=Watcher, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def deployment_watcher(self, scheduler, watcher):
+        deployment_watcher = DeploymentWatcher(Configuration([]), scheduler)
+        deployment_watcher._watcher = watcher
+        return deployment_watcher
+
+    @pytest.mark.parametrize("event_type", (WatchEvent.ADDED, WatchEvent.MODIFIED))
+    def test_caches_deployments(self, deployment_watcher, watcher, event_type):
+        watcher.watch.return_value = [_event(event_type)]
+
+        deployment_watcher._watch()
+
+        deployment = deployment_watcher.get(NAME, NAMESPACE)
+        assert deployment.metadata.labels["fiaas/deployment_id"] == "deployment_id"
+
+    def test_removes_deleted_deployments(self, deployment_watcher, watcher):
+        watcher.watch.return_value = [_event(WatchEvent.ADDED), _event(WatchEvent.DELETED)]
+
+        deployment_watcher._watch()
+
+        assert deployment_watcher.get(NAME, NAMESPACE) is None
+
+    def test_ignores_deployments_not_managed_by_fiaas(self, deployment_watcher, watcher, scheduler):
+        task = mock.MagicMock()
+        deployment_watcher.register(NAME, NAMESPACE, task)
+        watcher.watch.return_value = [_event(WatchEvent.ADDED, labels={"app": NAME})]
+
+        deployment_watcher._watch()
+
+        assert deployment_watcher.get(NAME, NAMESPACE) is None
+        scheduler.run_now.assert_not_called()
+
+    def test_runs_registered_tasks_when_deployment_changes(self, deployment_watcher, watcher, scheduler):
+        task = mock.MagicMock()
+        other_task = mock.MagicMock()
+        deployment_watcher.register(NAME, NAMESPACE, task)
+        deployment_watcher.register("other", NAMESPACE, other_task)
+        watcher.watch.return_value = [_event(WatchEvent.MODIFIED)]
+
+        deployment_watcher._watch()
+
+        scheduler.run_now.assert_called_once_with(task)
+
+    def test_unregistered_tasks_are_not_run(self, deployment_watcher, watcher, scheduler):
+        task = mock.MagicMock()
+        deployment_watcher.register(NAME, NAMESPACE, task)
+        deployment_watcher.unregister(NAME, NAMESPACE, task)
+        watcher.watch.return_value = [_event(WatchEvent.MODIFIED)]
+
+        deployment_watcher._watch()
+
+        scheduler.run_now.assert_not_called()
+
+    def test_waits_before_watching_again_after_error(self, deployment_watcher):
+        with mock.patch("fiaas_deploy_daemon.deployer.kubernetes.deployment_watcher.watch_forever") as watch_forever:
+            deployment_watcher()
+
+        watch_forever.assert_called_once_with(deployment_watcher._watch, "Deployments")
+
+    @pytest.mark.parametrize("multi_namespace", (True, False))
+    def test_watch_namespace(self, scheduler, watcher, multi_namespace):
+        config = Configuration([])
+        config.enable_deprecated_multi_namespace_support = multi_namespace
+        deployment_watcher = DeploymentWatcher(config, scheduler)
+        deployment_watcher._watcher = watcher
+
+        deployment_watcher._watch()
+
+        watcher.watch.assert_called_once_with(namespace=None if multi_namespace else config.namespace)
+
+
+class TestCachedDeploymentWatcher(object):
+    @pytest.fixture
+    def scheduler(self):
+        return mock.create_autospec(Scheduler, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def resource_cache(self):
+        return mock.create_autospec(ResourceCache, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def deployment_watcher(self, scheduler, resource_cache):
+        return CachedDeploymentWatcher(scheduler, resource_cache)
+
+    @staticmethod
+    def _listener(resource_cache):
+        resource_cache.add_listener.assert_called_once_with(Deployment, mock.ANY)
+        return resource_cache.add_listener.call_args.args[1]
+
+    def test_reads_deployments_from_resource_cache(self, deployment_watcher, resource_cache):
+        resource_cache.get.return_value = _event(WatchEvent.ADDED).object
+
+        deployment = deployment_watcher.get(NAME, NAMESPACE)
+
+        resource_cache.get.assert_called_once_with(Deployment, NAME, NAMESPACE)
+        assert deployment.metadata.labels["fiaas/deployment_id"] == "deployment_id"
+
+    def test_ignores_cached_deployments_not_managed_by_fiaas(self, deployment_watcher, resource_cache):
+        resource_cache.get.return_value = _event(WatchEvent.ADDED, labels={"app": NAME}).object
+
+        assert deployment_watcher.get(NAME, NAMESPACE) is None
+
+    def test_runs_registered_tasks_when_cached_deployment_changes(self, deployment_watcher, resource_cache, scheduler):
+        task = mock.MagicMock()
+        deployment_watcher.register(NAME, NAMESPACE, task)
+        listener = self._listener(resource_cache)
+
+        listener(_event(WatchEvent.ADDED, labels={"app": NAME}))
+        scheduler.run_now.assert_not_called()
+
+        listener(_event(WatchEvent.MODIFIED))
+        scheduler.run_now.assert_called_once_with(task)
+
+        deployment_watcher.unregister(NAME, NAMESPACE, task)
+        listener(_event(WatchEvent.MODIFIED))
+        scheduler.run_now.assert_called_once_with(task)
@@ -763,8 +763,8 @@ class TestIngressDeployer(object):
         return config
 
     @pytest.fixture
-    def ingress_adapter(self, ingress_tls_deployer, owner_references, extension_hook):
-        return V1Beta1IngressAdapter(ingress_tls_deployer, owner_references, extension_hook)
+    def ingress_adapter(self, ingress_tls_deployer, owner_references, extension_hook, resource_client):
+        return V1Beta1IngressAdapter(ingress_tls_deployer, owner_references, extension_hook, resource_client)
 
     @pytest.fixture
     def deployer(self, config, default_app_spec, ingress_adapter):
@@ -38,8 +38,8 @@ class TestPodDisruptionBudgetDeployer(object):
         return create_autospec(ExtensionHookCaller, spec_set=True, instance=True)
 
     @pytest.fixture
-    def deployer(self, owner_references, extension_hook, config):
-        return PodDisruptionBudgetDeployer(owner_references, extension_hook, config)
+    def deployer(self, owner_references, extension_hook, config, resource_client):
+        return PodDisruptionBudgetDeployer(owner_references, extension_hook, config, resource_client)
 
     @pytest.fixture
     def config(self):
@@ -21,12 +21,14 @@ import pytest
 from time import monotonic as time_monotonic
 
 from fiaas_deploy_daemon.deployer.bookkeeper import Bookkeeper
+from fiaas_deploy_daemon.deployer.kubernetes.deployment_watcher import DeploymentWatcher, DisabledDeploymentWatcher
 from fiaas_deploy_daemon.deployer.kubernetes.ingress_v1beta1 import V1Beta1IngressAdapter
 from fiaas_deploy_daemon.config import Configuration
 from fiaas_deploy_daemon.deployer.kubernetes.ready_check import ReadyCheck
 from fiaas_deploy_daemon.lifecycle import Lifecycle, Subject
 from fiaas_deploy_daemon.specs.models import LabelAndAnnotationSpec, IngressTLSSpec
 from k8s.models.certificate import Certificate, CertificateCondition
+from k8s.models.deployment import Deployment
 from k8s.models.ingress import Ingress, IngressTLS
 from k8s.models.networking_v1_ingress import Ingress as V1Ingress, IngressTLS as V1IngressTLS
 
@@ -62,6 +64,10 @@ class TestReadyCheck(object):
     def ingress_adapter(self):
         return mock.create_autospec(V1Beta1IngressAdapter)
 
+    @pytest.fixture
+    def deployment_watcher(self):
+        return DisabledDeploymentWatcher()
+
     @pytest.fixture
     def get_cert(self):
         with mock.patch("k8s.models.certificate.Certificate.get") as get_cert:
@@ -79,9 +85,12 @@ class TestReadyCheck(object):
         lifecycle_subject,
         ingress_adapter,
         config,
+        deployment_watcher,
     ):
         self._create_response(get, generation=generation, observed_generation=observed_generation)
-        ready = ReadyCheck(app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config)
+        ready = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
+        )
 
         assert ready() is False
         bookkeeper.success.assert_called_with(app_spec)
@@ -115,9 +124,12 @@ class TestReadyCheck(object):
         lifecycle_subject,
         ingress_adapter,
         config,
+        deployment_watcher,
     ):
         self._create_response(get, requested, replicas, available, updated, generation, observed_generation)
-        ready = ReadyCheck(app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config)
+        ready = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
+        )
 
         assert ready() is True
         bookkeeper.success.assert_not_called()
@@ -150,13 +162,16 @@ class TestReadyCheck(object):
         repository,
         ingress_adapter,
         config,
+        deployment_watcher,
     ):
         if annotations:
             app_spec = app_spec._replace(annotations=LabelAndAnnotationSpec(*[annotations] * 9))
 
         self._create_response(get, requested, replicas, available, updated)
 
-        ready = ReadyCheck(app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config)
+        ready = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
+        )
         ready._fail_after = time_monotonic()
 
         assert ready() is False
@@ -166,11 +181,13 @@ class TestReadyCheck(object):
         lifecycle.failed.assert_called_with(lifecycle_subject)
 
     def test_deployment_complete_deactivated(
-        self, get, app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config
+        self, get, app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
     ):
 
         self._create_response_zero_replicas(get)
-        ready = ReadyCheck(app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config)
+        ready = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
+        )
 
         assert ready() is False
         bookkeeper.success.assert_called_with(app_spec)
@@ -209,6 +226,7 @@ class TestReadyCheck(object):
         result,
         success,
         config,
+        deployment_watcher,
     ):
         config.tls_certificate_ready = True
         app_spec = app_spec._replace(ingress_tls=IngressTLSSpec(enabled=True, certificate_issuer=None))
@@ -221,7 +239,9 @@ class TestReadyCheck(object):
         get_cert.return_value = self._mock_certificate(cert_valid, expiration_date)
         self._create_response(get, replicas, replicas, replicas, replicas)
 
-        ready = ReadyCheck(app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config)
+        ready = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
+        )
         if not success:
             ready._fail_after = time_monotonic()
 
@@ -243,11 +263,13 @@ class TestReadyCheck(object):
             lifecycle.failed.assert_called_with(lifecycle_subject)
 
     def test_deployment_tls_config_no_tls_extension(
-        self, get, app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config
+        self, get, app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
     ):
         config.tls_certificate_ready = True
         self._create_response(get)
-        ready = ReadyCheck(app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config)
+        ready = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
+        )
 
         assert ready() is False
         bookkeeper.success.assert_called_with(app_spec)
@@ -255,6 +277,57 @@ class TestReadyCheck(object):
         lifecycle.success.assert_called_with(lifecycle_subject)
         lifecycle.failed.assert_not_called()
 
+    @pytest.mark.parametrize(
+        "deployment_id,available,result",
+        (
+            ("test_app_deployment_id", REPLICAS, False),
+            ("test_app_deployment_id", REPLICAS - 1, True),
+            ("previous_deployment_id", REPLICAS, True),
+        ),
+    )
+    def test_deployment_from_watch(
+        self,
+        get,
+        app_spec,
+        bookkeeper,
+        lifecycle,
+        lifecycle_subject,
+        ingress_adapter,
+        config,
+        deployment_id,
+        available,
+        result,
+    ):
+        deployment_watcher = mock.create_autospec(DeploymentWatcher, spec_set=True, instance=True)
+        deployment_watcher.get.return_value = Deployment.from_dict(
+            {
+                "metadata": {
+                    "name": app_spec.name,
+                    "namespace": app_spec.namespace,
+                    "labels": {"fiaas/deployment_id": deployment_id},
+                    "generation": 1,
+                },
+                "spec": {"replicas": REPLICAS},
+                "status": {
+                    "replicas": REPLICAS,
+                    "availableReplicas": available,
+                    "updatedReplicas": REPLICAS,
+                    "observedGeneration": 1,
+                },
+            }
+        )
+        ready = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
+        )
+
+        assert ready() is result
+        get.assert_not_called()
+        deployment_watcher.get.assert_called_once_with(app_spec.name, app_spec.namespace)
+        if result:
+            deployment_watcher.unregister.assert_not_called()
+        else:
+            deployment_watcher.unregister.assert_called_once_with(app_spec.name, app_spec.namespace, ready)
+
     @staticmethod
     def _mock_certificate(desired_status=True, expiration=None):
         cert = mock.create_autospec(Certificate, spec_set=True)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+from k8s.base import APIServerError, ListMeta, ModelList, WatchEvent
+from k8s.models.ingress import Ingress as V1Beta1Ingress
+from k8s.models.networking_v1_ingress import Ingress as NetworkingV1Ingress
+from k8s.models.pod import Pod
+from k8s.models.service import Service
+from k8s.models.service_account import ServiceAccount
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.deployer.kubernetes.resource_cache import (
+    ResourceCache,
+    ResourceStore,
+    resource_cache_bytes,
+    resource_cache_objects,
+    resource_cache_sync_lag,
+)
+
+NAMESPACE = "default"
+
+
+def _service(name="testapp", namespace=NAMESPACE, labels=None, resource_version="1"):
+    if labels is None:
+        labels = {"app": name}
+    return Service.from_dict(
+        {
+            "metadata": {
+                "name": name,
+                "namespace": namespace,
+                "labels": labels,
+                "resourceVersion": resource_version,
+            },
+            "spec": {"ports": [{"name": "http", "port": 80, "targetPort": 8080}]},
+        }
+    )
+
+
+def _event(event_type, service):
+    return WatchEvent(_type=event_type, _object=service)
+
+
+def _model_list(*items):
+    return ModelList(metadata=ListMeta(resourceVersion="100"), items=list(items))
+
+
+class TestResourceStore(object):
+    @pytest.fixture
+    def clock(self):
+        return mock.MagicMock(return_value=0)
+
+    @pytest.fixture
+    def store(self, clock):
+        return ResourceStore(Service, NAMESPACE, time_func=clock)
+
+    @pytest.fixture(autouse=True)
+    def list_with_meta(self):
+        with mock.patch("k8s.models.service.Service.list_with_meta") as mockk:
+            mockk.return_value = _model_list(_service())
+            yield mockk
+
+    @pytest.fixture(autouse=True)
+    def watch_list(self):
+        with mock.patch("k8s.models.service.Service.watch_list") as mockk:
+            mockk.side_effect = APIServerError({"code": 410})
+            yield mockk
+
+    def test_lists_then_watches_from_list_version(self, store, list_with_meta, watch_list):
+        store._list_and_watch()
+
+        list_with_meta.assert_called_once_with(namespace=NAMESPACE)
+        watch_list.assert_called_once_with(namespace=NAMESPACE, resource_version="100", allow_bookmarks=True)
+        assert store.get("testapp", NAMESPACE).metadata.resourceVersion == "1"
+
+    def test_returns_copies(self, store):
+        store._list_and_watch()
+
+        store.get("testapp", NAMESPACE).spec.ports[0].port = 1234
+
+        assert store.get("testapp", NAMESPACE).spec.ports[0].port == 80
+
+    def test_resumes_watch_from_last_seen_version(self, store, watch_list):
+        watch_list.side_effect = [
+            [_event(WatchEvent.MODIFIED, _service(resource_version="101"))],
+            [],
+            APIServerError({"code": 410}),
+        ]
+
+        store._list_and_watch()
+
+        assert [c.kwargs["resource_version"] for c in watch_list.call_args_list] == ["100", "101", "101"]
+
+    def test_other_watch_errors_are_raised(self, store, watch_list):
+        watch_list.side_effect = APIServerError({"code": 500})
+
+        with pytest.raises(APIServerError):
+            store._list_and_watch()
+
+    def test_relist_drops_resources_deleted_while_not_watching(self, store, list_with_meta):
+        store._list_and_watch()
+        list_with_meta.return_value = _model_list()
+
+        store._list_and_watch()
+
+        assert store.get("testapp", NAMESPACE) is None
+
+    def test_applies_watch_events(self, store):
+        store._list_and_watch()
+
+        store._handle_watch_event(_event(WatchEvent.MODIFIED, _service(resource_version="2")))
+        assert store.get("testapp", NAMESPACE).metadata.resourceVersion == "2"
+
+        store._handle_watch_event(_event(WatchEvent.DELETED, _service(resource_version="3")))
+        assert store.get("testapp", NAMESPACE) is None
+
+    def test_find_is_unavailable_until_listed(self, store):
+        assert store.find("testapp", NAMESPACE) is None
+
+    def test_find_by_app_label(self, store, list_with_meta):
+        list_with_meta.return_value = _model_list(
+            _service("testapp"),
+            _service("testapp-extra", labels={"app": "testapp"}),
+            _service("other"),
+            _service("testapp", namespace="other-namespace"),
+        )
+        store._list_and_watch()
+
+        found = store.find("testapp", NAMESPACE)
+
+        assert sorted(s.metadata.name for s in found) == ["testapp", "testapp-extra"]
+        assert store.find("unknown", NAMESPACE) == []
+
+    def test_ignores_resources_without_app_label(self, store, list_with_meta):
+        list_with_meta.return_value = _model_list(_service(labels={}))
+        store._list_and_watch()
+
+        store._handle_watch_event(_event(WatchEvent.ADDED, _service("unlabeled", labels={})))
+
+        assert store.get("testapp", NAMESPACE) is None
+        assert store.get("unlabeled", NAMESPACE) is None
+
+    def test_keeps_default_service_account(self):
+        store = ResourceStore(ServiceAccount, NAMESPACE)
+        default = ServiceAccount.from_dict({"metadata": {"name": "default", "namespace": NAMESPACE}})
+        other = ServiceAccount.from_dict({"metadata": {"name": "other", "namespace": NAMESPACE}})
+
+        store._replace([default, other])
+
+        assert store.get("default", NAMESPACE) is not None
+        assert store.get("other", NAMESPACE) is None
+
+    def test_written_resource_is_not_overwritten_by_older_events(self, store, clock):
+        store._list_and_watch()
+        clock.return_value = 10
+        store.written(_service(resource_version="5"))
+
+        store._handle_watch_event(_event(WatchEvent.MODIFIED, _service(resource_version="4")))
+        assert store.get("testapp", NAMESPACE).metadata.resourceVersion == "5"
+
+        clock.return_value = 12
+        with mock.patch.object(resource_cache_sync_lag, "labels") as sync_lag:
+            store._handle_watch_event(_event(WatchEvent.MODIFIED, _service(resource_version="5")))
+        sync_lag.assert_called_once_with("Service")
+        sync_lag.return_value.observe.assert_called_once_with(2)
+
+        store._handle_watch_event(_event(WatchEvent.MODIFIED, _service(resource_version="6")))
+        assert store.get("testapp", NAMESPACE).metadata.resourceVersion == "6"
+
+    def test_events_after_unchanged_write_are_not_skipped(self, store):
+        store._list_and_watch()
+        # A write which changed nothing keeps the resourceVersion, and no event is sent for it
+        store.written(_service(resource_version="5"))
+
+        store._handle_watch_event(_event(WatchEvent.MODIFIED, _service(resource_version="9")))
+        assert store.get("testapp", NAMESPACE).metadata.resourceVersion == "9"
+
+        store._handle_watch_event(_event(WatchEvent.DELETED, _service(resource_version="10")))
+        assert store.get("testapp", NAMESPACE) is None
+
+    def test_waits_longer_after_each_consecutive_error(self, clock, list_with_meta, watch_list):
+        class Stop(BaseException):
+            pass
+
+        sleep = mock.MagicMock(side_effect=[None, None, None, Stop])
+        store = ResourceStore(Service, NAMESPACE, time_func=clock, sleep_func=sleep)
+        list_with_meta.side_effect = [ValueError, ValueError, _model_list(), ValueError, ValueError]
+
+        with pytest.raises(Stop):
+            store()
+
+        assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 1, 2]
+
+    def test_notifies_listeners_of_listed_and_changed_resources(self, store, watch_list):
+        listener = mock.MagicMock()
+        store.add_listener(listener)
+        watch_list.side_effect = [
+            [_event(WatchEvent.MODIFIED, _service(resource_version="101"))],
+            APIServerError({"code": 410}),
+        ]
+
+        store._list_and_watch()
+
+        events = [c.args[0] for c in listener.call_args_list]
+        assert [(e.type, e.object.metadata.resourceVersion) for e in events] == [
+            (WatchEvent.ADDED, "1"),
+            (WatchEvent.MODIFIED, "101"),
+        ]
+
+    def test_failing_listener_does_not_stop_the_watch(self, store, watch_list):
+        store.add_listener(mock.MagicMock(side_effect=ValueError))
+        watch_list.side_effect = [
+            [_event(WatchEvent.MODIFIED, _service(resource_version="101"))],
+            APIServerError({"code": 410}),
+        ]
+
+        store._list_and_watch()
+
+        assert store.get("testapp", NAMESPACE).metadata.resourceVersion == "101"
+
+    def test_invalidate(self, store):
+        store._list_and_watch()
+
+        store.invalidate(_service())
+
+        assert store.get("testapp", NAMESPACE) is None
+
+    def test_reports_size(self, store):
+        with (
+            mock.patch.object(resource_cache_objects, "labels") as objects,
+            mock.patch.object(resource_cache_bytes, "labels") as size,
+        ):
+            store._list_and_watch()
+            objects.return_value.set.assert_called_with(1)
+            first_size = size.return_value.set.call_args[0][0]
+            assert first_size > 0
+
+            store.written(_service("another"))
+            objects.return_value.set.assert_called_with(2)
+            assert size.return_value.set.call_args[0][0] > first_size
+
+            store.invalidate(_service("another"))
+            store.invalidate(_service("testapp"))
+            objects.return_value.set.assert_called_with(0)
+            size.return_value.set.assert_called_with(0)
+
+
+class TestResourceCache(object):
+    @pytest.mark.parametrize(
+        "args,ingress", (([], V1Beta1Ingress), (["--use-networkingv1-ingress"], NetworkingV1Ingress))
+    )
+    def test_watches_ingress_model_in_use(self, args, ingress):
+        cache = ResourceCache(Configuration(args))
+
+        assert ingress in cache._stores
+
+    def test_namespace_to_watch(self):
+        config = Configuration([])
+        assert ResourceCache(config)._stores[Service]._namespace == config.namespace
+        cache = ResourceCache(Configuration(["--enable-deprecated-multi-namespace-support"]))
+        assert cache._stores[Service]._namespace is None
+
+    def test_resources_of_other_kinds_are_not_cached(self):
+        cache = ResourceCache(Configuration([]))
+
+        assert cache.get(Pod, "testapp", NAMESPACE) is None
+        assert cache.find(Pod, "testapp", NAMESPACE) is None
@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+from unittest import mock
+
+import pytest
+from k8s.client import ClientError
+from k8s.models.autoscaler import HorizontalPodAutoscaler, HorizontalPodAutoscalerSpec
+from k8s.models.common import ObjectMeta
+from k8s.models.role_binding import RoleBinding
+from k8s.models.service import Service, ServicePort, ServiceSpec
+from k8s.models.service_account import ServiceAccount
+from requests import Response
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.deployer.kubernetes.resource_cache import DisabledResourceCache, ResourceCache
+from fiaas_deploy_daemon.deployer.kubernetes.resource_client import (
+    DESIRED_STATE_HASH,
+    FIELD_MANAGER,
+    SERVER_METADATA,
+    ResourceClient,
+    desired_state_hash,
+    resource_writes_performed,
+    resource_writes_skipped,
+)
+
+SERVICES_URI = "/api/v1/namespaces/default/services/"
+
+
+def _response(body):
+    response = mock.create_autospec(Response)
+    response.json.return_value = body
+    return response
+
+
+def _as_live(body):
+    live = copy.deepcopy(body)
+    live["metadata"]["resourceVersion"] = "1234"
+    live["metadata"]["uid"] = "abc-123"
+    live["spec"]["clusterIP"] = "10.0.0.1"
+    return live
+
+
+class TestResourceClient(object):
+    @pytest.fixture
+    def client(self):
+        return ResourceClient(Configuration(["--skip-unchanged-writes"]), DisabledResourceCache())
+
+    @pytest.fixture(autouse=True)
+    def metrics(self):
+        with (
+            mock.patch.object(resource_writes_performed, "labels") as performed,
+            mock.patch.object(resource_writes_skipped, "labels") as skipped,
+        ):
+            yield performed, skipped
+
+    @staticmethod
+    def _deploy(client, port=80):
+        metadata = ObjectMeta(name="testapp", namespace="default", labels={"app": "testapp"}, annotations={})
+        spec = ServiceSpec(selector={"app": "testapp"}, ports=[ServicePort(name="http", port=port, targetPort=8080)])
+        service = client.get_or_create(Service, metadata=metadata, spec=spec)
+        client.save(service)
+
+    @pytest.fixture
+    def created(self, client, get, post):
+        post.side_effect = lambda url, body: _response(_as_live(body))
+        self._deploy(client)
+        created = post.call_args[0][1]
+        get.side_effect = None
+        get.return_value = _response(_as_live(created))
+        return created
+
+    def test_create_stores_desired_state_hash(self, created, metrics):
+        performed, skipped = metrics
+
+        assert DESIRED_STATE_HASH in created["metadata"]["annotations"]
+        performed.assert_called_once_with("Service")
+        skipped.assert_not_called()
+
+    def test_skip_write_when_unchanged(self, client, created, put, metrics):
+        performed, skipped = metrics
+        performed.reset_mock()
+
+        self._deploy(client)
+
+        put.assert_not_called()
+        performed.assert_not_called()
+        skipped.assert_called_once_with("Service")
+
+    def test_write_when_changed(self, client, created, put):
+        put.side_effect = lambda url, body: _response(_as_live(body))
+
+        self._deploy(client, port=81)
+
+        put.assert_called_once()
+        url, body = put.call_args[0]
+        assert url == SERVICES_URI + "testapp"
+        assert body["spec"]["ports"][0]["port"] == 81
+        assert (
+            body["metadata"]["annotations"][DESIRED_STATE_HASH]
+            != created["metadata"]["annotations"][DESIRED_STATE_HASH]
+        )
+
+    def test_write_when_live_resource_has_no_hash(self, client, created, get, put):
+        live = _as_live(created)
+        del live["metadata"]["annotations"][DESIRED_STATE_HASH]
+        get.return_value = _response(live)
+        put.side_effect = lambda url, body: _response(_as_live(body))
+
+        self._deploy(client)
+
+        put.assert_called_once()
+        assert put.call_args[0][1]["metadata"]["annotations"][DESIRED_STATE_HASH] == (
+            created["metadata"]["annotations"][DESIRED_STATE_HASH]
+        )
+
+    def test_always_write_when_disabled(self, created, put):
+        client = ResourceClient(Configuration([]), DisabledResourceCache())
+        put.side_effect = lambda url, body: _response(_as_live(body))
+
+        self._deploy(client)
+
+        put.assert_called_once()
+        assert DESIRED_STATE_HASH not in (put.call_args[0][1]["metadata"].get("annotations") or {})
+
+    def test_hash_ignores_server_set_fields_and_hash_annotation(self):
+        metadata = ObjectMeta(name="testapp", namespace="default", annotations={})
+        desired = Service(metadata=metadata, spec=ServiceSpec(selector={"app": "testapp"}))
+        live = Service.from_dict(
+            {
+                "metadata": {
+                    "name": "testapp",
+                    "namespace": "default",
+                    "resourceVersion": "1234",
+                    "annotations": {DESIRED_STATE_HASH: "old"},
+                },
+                "spec": {"selector": {"app": "testapp"}, "clusterIP": "10.0.0.1"},
+            }
+        )
+
+        assert desired_state_hash(desired) == desired_state_hash(live)
+
+
+class TestServerSideApply(object):
+    @pytest.fixture
+    def client(self):
+        return ResourceClient(
+            Configuration(["--enable-server-side-apply", "--skip-unchanged-writes"]), DisabledResourceCache()
+        )
+
+    @pytest.fixture
+    def call(self):
+        with mock.patch("k8s.client.Client._call") as mockk:
+            mockk.side_effect = lambda method, url, body, **kwargs: _response(_as_live(body))
+            yield mockk
+
+    def test_applies_without_reading_first(self, client, call, get, post, put):
+        metadata = ObjectMeta(name="testapp", namespace="default", labels={"app": "testapp"})
+        spec = ServiceSpec(selector={"app": "testapp"}, ports=[ServicePort(name="http", port=80, targetPort=8080)])
+
+        service = client.get_or_create(Service, metadata=metadata, spec=spec)
+        client.save(service)
+
+        get.assert_not_called()
+        post.assert_not_called()
+        put.assert_not_called()
+        call.assert_called_once_with(
+            "PATCH",
+            SERVICES_URI + "testapp",
+            mock.ANY,
+            headers={"Content-Type": "application/apply-patch+yaml"},
+            params={"fieldManager": FIELD_MANAGER, "force": "true"},
+        )
+        body = call.call_args[0][2]
+        assert body["apiVersion"] == "v1"
+        assert body["kind"] == "Service"
+        assert body["spec"]["ports"] == [{"name": "http", "port": 80, "targetPort": 8080, "protocol": "TCP"}]
+        assert DESIRED_STATE_HASH not in (body["metadata"].get("annotations") or {})
+        assert service.spec.clusterIP == "10.0.0.1"
+
+    def test_leaves_out_metadata_set_by_api_server(self, client, call, get):
+        get.side_effect = None
+        get.return_value = _response(
+            {
+                "metadata": {
+                    "name": "testapp",
+                    "namespace": "default",
+                    "resourceVersion": "1",
+                    "uid": "abc-123",
+                    "creationTimestamp": "2020-01-01T00:00:00Z",
+                    "generation": 3,
+                    "selfLink": "/api/v1/namespaces/default/serviceaccounts/testapp",
+                },
+                "imagePullSecrets": [{"name": "pull"}],
+            }
+        )
+        service_account = client.get(ServiceAccount, "testapp", "default")
+        call.side_effect = lambda method, url, body, **kwargs: _response(body)
+
+        client.save(service_account)
+
+        body = call.call_args[0][2]
+        assert not SERVER_METADATA.intersection(body["metadata"])
+        assert body["metadata"]["name"] == "testapp"
+        assert body["imagePullSecrets"] == [{"name": "pull"}]
+
+    def test_api_version_of_named_group(self, client, call):
+        metadata = ObjectMeta(name="testapp", namespace="default")
+        autoscaler = client.get_or_create(
+            HorizontalPodAutoscaler, metadata=metadata, spec=HorizontalPodAutoscalerSpec(maxReplicas=3)
+        )
+        call.side_effect = lambda method, url, body, **kwargs: _response(body)
+
+        client.save(autoscaler)
+
+        assert call.call_args[0][2]["apiVersion"] == "autoscaling/v1"
+
+    def test_creates_generated_names_with_post(self, client, call, post):
+        post.return_value = _response({"metadata": {"name": "testapp-abcde", "namespace": "default"}})
+        role_binding = RoleBinding(metadata=ObjectMeta(generateName="testapp-", namespace="default"))
+
+        client.save(role_binding)
+
+        call.assert_not_called()
+        post.assert_called_once()
+
+
+class FakeLabelManagement(object):
+    """Keep the labels of a single resource, owned by field managers the way the API server does for applies"""
+
+    def __init__(self, labels, manager):
+        self.labels = dict(labels)
+        self.owners = {(manager, "Update"): set(labels)}
+        self.resource_version = 1
+
+    def __call__(self, method, url, body, headers, params=None):
+        if headers["Content-Type"] == "application/json-patch+json":
+            assert body[0] == {"op": "test", "path": "/metadata/resourceVersion", "value": str(self.resource_version)}
+            self.owners = {
+                (entry["manager"], entry["operation"]): {
+                    key[2:] for key in entry["fieldsV1"].get("f:metadata", {}).get("f:labels", {})
+                }
+                for entry in body[1]["value"]
+            }
+            return _response(None)
+        owner = (params["fieldManager"], "Apply")
+        applied = body["metadata"].get("labels") or {}
+        others = set().union(*(keys for key, keys in self.owners.items() if key != owner))
+        for key in self.owners.get(owner, set()) - set(applied) - others:
+            del self.labels[key]
+        self.labels.update(applied)
+        self.owners[owner] = set(applied)
+        self.resource_version += 1
+        return _response(dict(body, metadata=dict(body["metadata"], **self._live_metadata())))
+
+    def _live_metadata(self):
+        return {
+            "labels": dict(self.labels),
+            "resourceVersion": str(self.resource_version),
+            "managedFields": [
+                {
+                    "manager": manager,
+                    "operation": operation,
+                    "fieldsV1": {"f:metadata": {"f:labels": {"f:" + key: {} for key in keys}}},
+                }
+                for (manager, operation), keys in self.owners.items()
+            ],
+        }
+
+
+class TestServerSideApplyOfUpdatedResources(object):
+    @pytest.fixture
+    def client(self):
+        return ResourceClient(Configuration(["--enable-server-side-apply"]), DisabledResourceCache())
+
+    @staticmethod
+    def _apply(client, labels):
+        metadata = ObjectMeta(name="testapp", namespace="default", labels=labels)
+        service = client.get_or_create(Service, metadata=metadata, spec=ServiceSpec(selector={"app": "testapp"}))
+        client.save(service)
+        return service
+
+    def test_removes_field_left_out_of_resource_written_with_put(self, client):
+        api_server = FakeLabelManagement({"app": "testapp", "removed": "yes"}, "python-requests")
+
+        with mock.patch("k8s.client.Client._call", side_effect=api_server):
+            service = self._apply(client, {"app": "testapp"})
+
+        assert api_server.labels == {"app": "testapp"}
+        assert service.metadata.labels == {"app": "testapp"}
+        assert set(api_server.owners) == {(FIELD_MANAGER, "Apply")}
+
+    def test_keeps_fields_owned_by_other_managers(self, client):
+        api_server = FakeLabelManagement({"app": "testapp"}, "python-requests")
+        api_server.labels["other"] = "yes"
+        api_server.owners[("kube-controller-manager", "Update")] = {"other"}
+
+        with mock.patch("k8s.client.Client._call", side_effect=api_server):
+            self._apply(client, {"app": "testapp"})
+
+        assert api_server.labels == {"app": "testapp", "other": "yes"}
+
+    def test_applies_once_when_no_fields_are_owned_by_updates(self, client):
+        api_server = FakeLabelManagement({"app": "testapp"}, "python-requests")
+
+        with mock.patch("k8s.client.Client._call", side_effect=api_server) as call:
+            self._apply(client, {"app": "testapp"})
+            call.reset_mock()
+            self._apply(client, {"app": "testapp"})
+
+        call.assert_called_once()
+
+
+class TestRememberedHashes(object):
+    @pytest.fixture
+    def client(self):
+        return ResourceClient(Configuration(["--skip-unchanged-writes"]), DisabledResourceCache())
+
+    @staticmethod
+    def _service(name):
+        return Service.from_dict({"metadata": {"name": name, "namespace": "default"}})
+
+    def test_forget_drops_remembered_hash(self, client, get):
+        get.side_effect = None
+        get.return_value = _response(self._service("testapp").as_dict())
+
+        service = client.get(Service, "testapp", "default")
+        client.forget(service)
+
+        assert client._live_hashes == {}
+
+    def test_remembered_hashes_are_bounded(self, client, get):
+        get.side_effect = lambda url, **kwargs: _response(self._service(url.rsplit("/", 1)[1]).as_dict())
+
+        with mock.patch("fiaas_deploy_daemon.deployer.kubernetes.resource_client.MAX_REMEMBERED", 2):
+            for name in ("a", "b", "c"):
+                client.get(Service, name, "default")
+
+        assert [key[2] for key in client._live_hashes] == ["b", "c"]
+
+
+class TestResourceClientWithCache(object):
+    @pytest.fixture
+    def resource_cache(self):
+        return mock.create_autospec(ResourceCache, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def client(self, resource_cache):
+        return ResourceClient(Configuration([]), resource_cache)
+
+    @staticmethod
+    def _service(port=80):
+        return Service.from_dict(
+            {
+                "metadata": {"name": "testapp", "namespace": "default", "resourceVersion": "1"},
+                "spec": {"ports": [{"name": "http", "port": port, "targetPort": 8080}], "clusterIP": "10.0.0.1"},
+            }
+        )
+
+    def test_reads_from_cache(self, client, resource_cache, get, put):
+        resource_cache.get.return_value = self._service()
+        put.side_effect = lambda url, body: _response(body)
+        metadata = ObjectMeta(name="testapp", namespace="default")
+        spec = ServiceSpec(ports=[ServicePort(name="http", port=81, targetPort=8080)])
+
+        service = client.get_or_create(Service, metadata=metadata, spec=spec)
+        client.save(service)
+
+        get.assert_not_called()
+        body = put.call_args[0][1]
+        assert body["metadata"]["resourceVersion"] == "1"
+        assert body["spec"]["clusterIP"] == "10.0.0.1"
+        assert body["spec"]["ports"][0]["port"] == 81
+        resource_cache.written.assert_called_once_with(service)
+
+    def test_reads_from_api_on_cache_miss(self, client, resource_cache, get):
+        resource_cache.get.return_value = None
+        get.side_effect = None
+        get.return_value = _response(self._service().as_dict())
+
+        service = client.get(Service, "testapp", "default")
+
+        get.assert_called_once_with(SERVICES_URI + "testapp")
+        assert service.spec.clusterIP == "10.0.0.1"
+
+    def test_invalidates_cache_on_conflict(self, client, resource_cache, put):
+        response = mock.create_autospec(Response)
+        response.status_code = 409
+        put.side_effect = ClientError("Conflict", response=response)
+
+        with pytest.raises(ClientError):
+            client.save(self._service())
+
+        resource_cache.invalidate.assert_called_once()
+        resource_cache.written.assert_not_called()
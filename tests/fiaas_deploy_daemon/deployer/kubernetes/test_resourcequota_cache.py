@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.deployer.kubernetes.resourcequota_cache import ResourceQuotaCache
+
+
+class TestResourceQuotaCache(object):
+    @pytest.fixture(autouse=True)
+    def resource_quota_list(self):
+        with mock.patch("k8s.models.resourcequota.ResourceQuota.list") as mockk:
+            mockk.side_effect = lambda namespace: ["quota in {}".format(namespace)]
+            yield mockk
+
+    @pytest.fixture
+    def clock(self):
+        return mock.MagicMock(return_value=0)
+
+    def test_lists_resource_quotas_again_after_ttl(self, resource_quota_list, clock):
+        cache = ResourceQuotaCache(Configuration(["--resourcequota-cache-ttl", "60"]), time_func=clock)
+
+        assert cache.list("default") == ["quota in default"]
+        clock.return_value = 59
+        assert cache.list("default") == ["quota in default"]
+        assert resource_quota_list.call_count == 1
+
+        clock.return_value = 60
+        assert cache.list("default") == ["quota in default"]
+        assert resource_quota_list.call_count == 2
+
+    def test_namespaces_are_cached_separately(self, resource_quota_list, clock):
+        cache = ResourceQuotaCache(Configuration([]), time_func=clock)
+
+        assert cache.list("default") == ["quota in default"]
+        assert cache.list("other") == ["quota in other"]
+        assert resource_quota_list.call_count == 2
+
+    def test_ttl_zero_disables_caching(self, resource_quota_list, clock):
+        cache = ResourceQuotaCache(Configuration(["--resourcequota-cache-ttl", "0"]), time_func=clock)
+
+        cache.list("default")
+        cache.list("default")
+
+        assert resource_quota_list.call_count == 2
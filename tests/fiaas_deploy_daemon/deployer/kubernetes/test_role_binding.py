@@ -14,11 +14,11 @@ class TestRoleBindingDeployer:
         return create_autospec(OwnerReferences, spec_set=True, instance=True)
 
     @pytest.fixture
-    def deployer(self, owner_references):
+    def deployer(self, owner_references, resource_client):
         config = create_autospec(Configuration([]), spec_set=True)
         config.list_of_roles = ["test-role-1", "test-role-2"]
         config.list_of_cluster_roles = ["cluster-role-1", "cluster-role-2"]
-        return RoleBindingDeployer(config, owner_references)
+        return RoleBindingDeployer(config, owner_references, resource_client)
 
     @pytest.fixture
     def cr_a_role_binding(self):
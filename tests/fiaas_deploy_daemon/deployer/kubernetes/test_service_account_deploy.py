@@ -24,6 +24,8 @@ from k8s.models.common import ObjectMeta
 from k8s.client import NotFound
 
 from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.deployer.kubernetes.resource_cache import DisabledResourceCache
+from fiaas_deploy_daemon.deployer.kubernetes.resource_client import ResourceClient
 from fiaas_deploy_daemon.deployer.kubernetes.service_account import ServiceAccountDeployer
 from utils import TypeMatcher
 
@@ -35,9 +37,9 @@ LABELS = {"service": "pass through"}
 
 class TestServiceAccountDeployer(object):
     @pytest.fixture
-    def deployer(self, owner_references):
+    def deployer(self, owner_references, resource_client):
         config = create_autospec(Configuration([]), spec_set=True)
-        return ServiceAccountDeployer(config, owner_references)
+        return ServiceAccountDeployer(config, owner_references, resource_client)
 
     @pytest.mark.usefixtures("get")
     def test_deploy_new_service_account(self, deployer, post, app_spec, owner_references):
@@ -97,7 +99,7 @@ class TestServiceAccountDeployer(object):
         put.assert_not_called()
         post.assert_not_called()
 
-    def test_deploy_existing_fiaas_owned_service_account(self, get, post, put, app_spec):
+    def test_deploy_existing_fiaas_owned_service_account(self, get, post, put, app_spec, resource_client):
         existing_service_account = {
             "metadata": pytest.helpers.create_metadata(
                 app_spec.name,
@@ -132,7 +134,7 @@ class TestServiceAccountDeployer(object):
         put.return_value = mock_response
 
         config = create_autospec(Configuration([]), spec_set=True)
-        deployer = ServiceAccountDeployer(config, OwnerReferences())
+        deployer = ServiceAccountDeployer(config, OwnerReferences(), resource_client)
 
         deployer.deploy(app_spec, LABELS)
         post.assert_not_called()
@@ -182,3 +184,19 @@ class TestServiceAccountDeployer(object):
 
         pytest.helpers.assert_any_call(post, SERVICE_ACCOUNT_URI, expected_service_account)
         owner_references.apply.assert_called_once_with(TypeMatcher(ServiceAccount), app_spec)
+
+    def test_forget_service_accounts_which_are_not_saved(self, get, put, app_spec, owner_references):
+        resource_client = ResourceClient(Configuration(["--skip-unchanged-writes"]), DisabledResourceCache())
+        deployer = ServiceAccountDeployer(Configuration([]), owner_references, resource_client)
+        mock_response = create_autospec(Response)
+        mock_response.json.return_value = {
+            "metadata": pytest.helpers.create_metadata("testapp", labels=LABELS),
+            "imagePullSecrets": [],
+        }
+        get.side_effect = None
+        get.return_value = mock_response
+
+        deployer.deploy(app_spec, LABELS)
+
+        put.assert_not_called()
+        assert resource_client._live_hashes == {}
@@ -42,10 +42,10 @@ class TestServiceDeployer(object):
         return request.param
 
     @pytest.fixture
-    def deployer(self, service_type, owner_references, extension_hook):
+    def deployer(self, service_type, owner_references, extension_hook, resource_client):
         config = create_autospec(Configuration([]), spec_set=True)
         config.service_type = service_type
-        return ServiceDeployer(config, owner_references, extension_hook)
+        return ServiceDeployer(config, owner_references, extension_hook, resource_client)
 
     @pytest.mark.usefixtures("get")
     def test_deploy_new_service(self, deployer, service_type, post, app_spec, owner_references, extension_hook):
@@ -209,3 +209,18 @@ class TestServiceDeployer(object):
 
         pytest.helpers.assert_no_calls(post)
         pytest.helpers.assert_any_call(delete, SERVICES_URI + app_spec_no_ports.name)
+
+    @pytest.mark.usefixtures("get")
+    def test_render_service_without_calling_hook_or_saving(self, deployer, post, app_spec, extension_hook):
+        services = deployer.render(app_spec, SELECTOR, LABELS)
+
+        assert [svc.metadata.name for svc in services] == ["testapp"]
+        extension_hook.apply.assert_not_called()
+        pytest.helpers.assert_no_calls(post)
+
+    def test_save_deletes_service_when_nothing_was_rendered(self, deployer, post, delete, app_spec_no_ports):
+        services = deployer.render(app_spec_no_ports, SELECTOR, LABELS)
+        deployer.save(app_spec_no_ports, SELECTOR, LABELS, services)
+
+        pytest.helpers.assert_no_calls(post)
+        pytest.helpers.assert_any_call(delete, SERVICES_URI + app_spec_no_ports.name)
@@ -14,6 +14,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import threading
 from queue import Queue
 
 from unittest import mock
@@ -26,6 +27,7 @@ from fiaas_deploy_daemon.deployer import DeployerEvent
 from fiaas_deploy_daemon.deployer.bookkeeper import Bookkeeper
 from fiaas_deploy_daemon.deployer.deploy import Deployer
 from fiaas_deploy_daemon.deployer.kubernetes.adapter import K8s
+from fiaas_deploy_daemon.deployer.kubernetes.deployment_watcher import DeploymentWatcher
 from fiaas_deploy_daemon.deployer.kubernetes.ingress_v1beta1 import V1Beta1IngressAdapter
 from fiaas_deploy_daemon.deployer.kubernetes.ready_check import ReadyCheck
 from fiaas_deploy_daemon.deployer.scheduler import Scheduler
@@ -73,8 +75,25 @@ class TestDeploy(object):
         return Configuration([])
 
     @pytest.fixture
-    def deployer(self, app_spec, bookkeeper, adapter, scheduler, lifecycle, lifecycle_subject, ingress_adapter, config):
-        deployer = Deployer(Queue(), bookkeeper, adapter, scheduler, lifecycle, ingress_adapter, config)
+    def deployment_watcher(self):
+        return mock.create_autospec(DeploymentWatcher, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def deployer(
+        self,
+        app_spec,
+        bookkeeper,
+        adapter,
+        scheduler,
+        lifecycle,
+        lifecycle_subject,
+        ingress_adapter,
+        config,
+        deployment_watcher,
+    ):
+        deployer = Deployer(
+            Queue(), bookkeeper, adapter, scheduler, lifecycle, ingress_adapter, config, deployment_watcher
+        )
         deployer._queue = [DeployerEvent("UPDATE", app_spec, lifecycle_subject)]
         return deployer
 
@@ -118,14 +137,25 @@ class TestDeploy(object):
         lifecycle.state_change_signal.send.assert_called_with(status=STATUS_FAILED, subject=lifecycle_subject)
 
     def test_schedules_ready_check(
-        self, app_spec, scheduler, bookkeeper, deployer, lifecycle, lifecycle_subject, ingress_adapter, config
+        self,
+        app_spec,
+        scheduler,
+        bookkeeper,
+        deployer,
+        lifecycle,
+        lifecycle_subject,
+        ingress_adapter,
+        config,
+        deployment_watcher,
     ):
         deployer()
 
         lifecycle.state_change_signal.send.assert_called_once_with(status=STATUS_STARTED, subject=lifecycle_subject)
-        scheduler.add.assert_called_with(
-            ReadyCheck(app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config)
+        ready_check = ReadyCheck(
+            app_spec, bookkeeper, lifecycle, lifecycle_subject, ingress_adapter, config, deployment_watcher
         )
+        scheduler.add.assert_called_with(ready_check)
+        deployment_watcher.register.assert_called_with(app_spec.name, app_spec.namespace, ready_check)
 
     @pytest.mark.parametrize(
         "exception_class",
@@ -136,7 +166,16 @@ class TestDeploy(object):
         ),
     )
     def test_handle_exception_in_failure_exception_handler(
-        self, bookkeeper, adapter, scheduler, ingress_adapter, config, app_spec, lifecycle_subject, exception_class
+        self,
+        bookkeeper,
+        adapter,
+        scheduler,
+        ingress_adapter,
+        config,
+        deployment_watcher,
+        app_spec,
+        lifecycle_subject,
+        exception_class,
     ):
         adapter.deploy.side_effect = exception_class("a Kubernetes resource update failed")
 
@@ -146,7 +185,9 @@ class TestDeploy(object):
         )
 
         # lifecycle needs to be a mock; duplicate the deployer fixture here
-        deployer = Deployer(Queue(), bookkeeper, adapter, scheduler, lifecycle, ingress_adapter, config)
+        deployer = Deployer(
+            Queue(), bookkeeper, adapter, scheduler, lifecycle, ingress_adapter, config, deployment_watcher
+        )
         deployer._queue = [DeployerEvent("UPDATE", app_spec, lifecycle_subject)]
 
         # verify that the exceptions set up above do not flow out of deployer; the test will fail if either does
@@ -154,3 +195,43 @@ class TestDeploy(object):
 
         adapter.deploy.assert_called_once()
         lifecycle.failed.assert_called_once()
+
+    def test_deploy_workers_deploy_apps_in_parallel_and_each_app_in_order(
+        self, app_spec, bookkeeper, adapter, scheduler, lifecycle, ingress_adapter, config, deployment_watcher
+    ):
+        config.deploy_workers = 4
+        deployer = Deployer(
+            Queue(), bookkeeper, adapter, scheduler, lifecycle, ingress_adapter, config, deployment_watcher
+        )
+        started = threading.Event()
+        release = threading.Event()
+        deployed = []
+        done = threading.Semaphore(0)
+
+        def deploy(spec):
+            if spec.name == "blocking" and spec.deployment_id == "0":
+                started.set()
+                assert release.wait(5)
+            deployed.append((spec.name, spec.deployment_id))
+            done.release()
+
+        def events():
+            yield DeployerEvent("UPDATE", app_spec._replace(name="blocking", deployment_id="0"), None)
+            yield DeployerEvent("UPDATE", app_spec._replace(name="other"), None)
+            assert started.wait(5)
+            yield DeployerEvent("UPDATE", app_spec._replace(name="blocking", deployment_id="1"), None)
+            yield DeployerEvent("UPDATE", app_spec._replace(name="blocking", deployment_id="2"), None)
+
+        adapter.deploy.side_effect = deploy
+        deployer._queue = events()
+
+        deployer()
+
+        # the other app is deployed while the first deploy of the blocking app is still in progress
+        assert done.acquire(timeout=5)
+        assert deployed == [("other", app_spec.deployment_id)]
+        release.set()
+        # the second event for the blocking app was superseded by the third while waiting for the first to complete
+        for _ in range(2):
+            assert done.acquire(timeout=5)
+        assert deployed[1:] == [("blocking", "0"), ("blocking", "2")]
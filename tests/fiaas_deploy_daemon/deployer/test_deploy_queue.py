@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+import pytest
+from k8s.client import ClientError
+
+from fiaas_deploy_daemon.deployer import DeployerEvent
+from fiaas_deploy_daemon.deployer.deploy_queue import DeployQueue, deploy_queue_wait
+from fiaas_deploy_daemon.lifecycle import Lifecycle, Subject
+
+
+def _event(app_spec, name, deployment_id):
+    app_spec = app_spec._replace(name=name, deployment_id=deployment_id)
+    subject = Subject(app_spec.uid, name, app_spec.namespace, deployment_id, None, None, None)
+    return DeployerEvent("UPDATE", app_spec, subject)
+
+
+class TestDeployQueue(object):
+    @pytest.fixture
+    def lifecycle(self):
+        return mock.create_autospec(Lifecycle, spec_set=True, instance=True)
+
+    @pytest.fixture
+    def queue(self, lifecycle):
+        return DeployQueue(lifecycle)
+
+    def test_events_are_returned_in_order(self, queue, app_spec):
+        first = _event(app_spec, "first", "1")
+        second = _event(app_spec, "second", "1")
+        queue.put(first)
+        queue.put(second)
+
+        assert queue.qsize() == 2
+        assert queue.get() == first
+        assert queue.get() == second
+        assert queue.empty()
+
+    def test_newer_event_replaces_waiting_event_for_same_app(self, queue, lifecycle, app_spec):
+        superseded = _event(app_spec, "app", "1")
+        other = _event(app_spec, "other", "1")
+        latest = _event(app_spec, "app", "2")
+        queue.put(superseded)
+        queue.put(other)
+        queue.put(latest)
+
+        assert queue.qsize() == 2
+        assert queue.get() == latest
+        assert queue.get() == other
+        lifecycle.superseded.assert_called_once_with(superseded.lifecycle_subject)
+
+    def test_event_for_same_deployment_id_is_not_marked_superseded(self, queue, lifecycle, app_spec):
+        queue.put(_event(app_spec, "app", "1"))
+        queue.put(_event(app_spec, "app", "1"))
+
+        assert queue.qsize() == 1
+        lifecycle.superseded.assert_not_called()
+
+    def test_failure_to_mark_event_superseded_does_not_fail_put(self, queue, lifecycle, app_spec):
+        lifecycle.superseded.side_effect = ClientError("updating ApplicationStatus resource failed")
+        latest = _event(app_spec, "app", "2")
+        queue.put(_event(app_spec, "app", "1"))
+        queue.put(latest)
+
+        assert queue.get() == latest
+
+    def test_superseded_event_is_marked_superseded_by_the_event_replacing_it(self, queue, lifecycle, app_spec):
+        first = _event(app_spec, "app", "1")
+        queue.put(first)
+        replacing = _event(app_spec, "app", "2")
+        # Another put for a different app while this put has released the queue lock must not take its replaced event
+        with mock.patch.object(queue, "_supersede", wraps=queue._supersede) as supersede:
+            queue.put(replacing)
+            queue.put(_event(app_spec, "other", "1"))
+
+        supersede.assert_called_once_with(first, replacing)
+        lifecycle.superseded.assert_called_once_with(first.lifecycle_subject)
+
+    def test_replaced_events_are_not_counted_as_unfinished_tasks(self, queue, app_spec):
+        queue.put(_event(app_spec, "app", "1"))
+        queue.put(_event(app_spec, "app", "2"))
+        queue.put(_event(app_spec, "app", "3"))
+
+        queue.get()
+        queue.task_done()
+
+        assert queue.unfinished_tasks == 0
+        queue.join()
+
+    def test_measures_time_waiting_in_queue(self, lifecycle, app_spec):
+        clock = mock.MagicMock(return_value=10)
+        with mock.patch.object(deploy_queue_wait, "labels") as labels:
+            queue = DeployQueue(lifecycle, "test", time_func=clock)
+        queue.put(_event(app_spec, "app", "1"))
+        clock.return_value = 25
+
+        queue.get()
+
+        labels.assert_called_once_with("test")
+        labels.return_value.observe.assert_called_once_with(15)
@@ -1,18 +1,17 @@
+import threading
 from unittest import mock
 
 import pytest
 from k8s.client import ClientError, ServerError
 from requests.exceptions import RetryError
 
-from fiaas_deploy_daemon.deployer.scheduler import Scheduler
+from fiaas_deploy_daemon.config import Configuration
+from fiaas_deploy_daemon.deployer.scheduler import Scheduler, SchedulerWorker
 
 
 class TestScheduler:
     @pytest.fixture
     def scheduler(self) -> Scheduler:
-        def no_delay(*args, **kwargs):
-            pass
-
         def time_func_factory(*args, **kwargs):
             t = 0
             # scheduler re-adds tasks with a 10s delay if they fail. increasing "time" by 15s every tick should ensure
@@ -26,7 +25,13 @@ class TestScheduler:
 
             return _tick
 
-        yield Scheduler(time_func=time_func_factory(), delay_func=no_delay)
+        yield Scheduler(Configuration([]), time_func=time_func_factory())
+
+    @pytest.fixture
+    def clock(self):
+        clock = mock.MagicMock()
+        clock.return_value = 0
+        return clock
 
     def test_scheduler_runs_task(self, scheduler):
         task = mock.MagicMock()
@@ -56,3 +61,151 @@ class TestScheduler:
         scheduler(run_forever=False)
 
         raise_error.assert_called_once()
+
+    def test_scheduler_runs_all_due_tasks_in_one_pass(self, clock):
+        scheduler = Scheduler(Configuration([]), time_func=clock)
+        tasks = [mock.MagicMock(return_value=False) for _ in range(5)]
+        for task in tasks:
+            scheduler.add(task, delay=0)
+
+        scheduler(run_forever=False)
+
+        for task in tasks:
+            task.assert_called_once()
+
+    def test_scheduler_does_not_run_tasks_before_they_are_due(self, clock):
+        scheduler = Scheduler(Configuration([]), time_func=clock)
+        due = mock.MagicMock(return_value=False)
+        later = mock.MagicMock(return_value=False)
+        scheduler.add(due, delay=0)
+        scheduler.add(later, delay=30)
+
+        scheduler(run_forever=False)
+
+        due.assert_called_once()
+        later.assert_not_called()
+
+    def test_scheduler_reschedules_task_returning_true(self, clock):
+        scheduler = Scheduler(Configuration([]), time_func=clock)
+        task = mock.MagicMock(return_value=True)
+        scheduler.add(task, delay=0)
+
+        scheduler(run_forever=False)
+        assert scheduler._tasks[0][0] == 10
+
+        clock.return_value = 10
+        scheduler(run_forever=False)
+
+        assert task.call_count == 2
+
+    def test_run_now_makes_waiting_task_due(self, clock):
+        scheduler = Scheduler(Configuration([]), time_func=clock)
+        task = mock.MagicMock(return_value=False)
+        scheduler.add(task, delay=30)
+
+        scheduler.run_now(task)
+        scheduler(run_forever=False)
+
+        task.assert_called_once()
+
+    def test_adding_earlier_task_wakes_up_scheduler(self):
+        scheduler = Scheduler(Configuration([]))
+        executed = threading.Event()
+        scheduler.add(mock.MagicMock(return_value=False), delay=3600)
+        scheduler.start()
+
+        scheduler.add(lambda: executed.set(), delay=0)
+
+        assert executed.wait(5)
+
+    def test_scheduler_runs_tasks_concurrently_on_workers(self):
+        scheduler = Scheduler(Configuration(["--scheduler-workers", "2"]))
+        barrier = threading.Barrier(2, timeout=5)
+        completed = threading.Semaphore(0)
+
+        def task():
+            # the barrier is only passed if both tasks are executing at the same time
+            barrier.wait()
+            completed.release()
+            return False
+
+        scheduler.add(task, delay=0)
+        scheduler.add(task, delay=0)
+        scheduler.start()
+
+        assert completed.acquire(timeout=5)
+        assert completed.acquire(timeout=5)
+
+    def test_hanging_task_does_not_block_other_tasks(self):
+        scheduler = Scheduler(Configuration(["--scheduler-workers", "1", "--scheduler-task-timeout", "1"]))
+        release = threading.Event()
+        executed = threading.Event()
+
+        def hanging_task():
+            release.wait(10)
+            return False
+
+        scheduler.add(hanging_task, delay=0)
+        scheduler.add(lambda: executed.set(), delay=0)
+        scheduler.start()
+
+        try:
+            assert executed.wait(5)
+            assert [w.name for w in scheduler._workers] == ["SchedulerWorker-1"]
+        finally:
+            release.set()
+
+    def test_worker_keeps_running_after_unexpected_exception(self):
+        scheduler = Scheduler(Configuration(["--scheduler-workers", "1"]))
+        executed = threading.Event()
+        scheduler.add(mock.MagicMock(side_effect=ValueError("unexpected")), delay=0)
+        scheduler.add(lambda: executed.set(), delay=0)
+        scheduler.start()
+
+        assert executed.wait(5)
+        assert [w.name for w in scheduler._workers] == ["SchedulerWorker-0"]
+
+    @staticmethod
+    def fake_workers(scheduler):
+        def new_worker():
+            worker = mock.create_autospec(SchedulerWorker, instance=True)
+            worker.is_alive.return_value = True
+            worker.started_at = None
+            worker.abandoned = False
+            return worker
+
+        scheduler._new_worker = new_worker
+        scheduler._start_workers()
+
+    def test_replaces_stopped_worker(self, clock):
+        scheduler = Scheduler(Configuration(["--scheduler-workers", "1"]), time_func=clock)
+        self.fake_workers(scheduler)
+        stopped = scheduler._workers[0]
+        stopped.is_alive.return_value = False
+
+        scheduler._replace_hung_workers()
+
+        assert scheduler._workers[0] is not stopped
+        assert scheduler._workers[0].is_alive()
+
+    def test_abandons_limited_number_of_hung_workers(self, clock, monkeypatch):
+        monkeypatch.setattr("fiaas_deploy_daemon.deployer.scheduler.MAX_ABANDONED_WORKERS", 1)
+        scheduler = Scheduler(
+            Configuration(["--scheduler-workers", "2", "--scheduler-task-timeout", "10"]), time_func=clock
+        )
+        self.fake_workers(scheduler)
+        first, second = scheduler._workers
+        first.started_at = second.started_at = 0
+        clock.return_value = 20
+
+        scheduler._replace_hung_workers()
+
+        assert first.abandoned
+        assert not second.abandoned
+        assert second in scheduler._workers
+
+        first.started_at = None
+        scheduler._replace_hung_workers()
+
+        assert second.abandoned
+        assert scheduler._abandoned_workers == [second]
@@ -43,6 +43,10 @@ class TestConfig(object):
         with pytest.raises(SystemExit):
             Configuration(["--log-format", "fail"])
 
+    def test_sharding_and_leader_election_are_not_allowed_together(self):
+        with pytest.raises(SystemExit):
+            Configuration(["--enable-sharding", "--enable-leader-election"])
+
     def test_default_parameter_values(self):
         config = Configuration([])
 
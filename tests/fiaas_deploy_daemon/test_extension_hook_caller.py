@@ -15,15 +15,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import copy
+import json
 
 from unittest import mock
 import pytest
 from k8s.models.deployment import Deployment, DeploymentSpec
+from k8s.models.service import Service
 from k8s.models.pod import Container, PodSpec, PodTemplateSpec, EnvVar
 from requests import Response, Session, HTTPError
 
 from fiaas_deploy_daemon import Configuration
-from fiaas_deploy_daemon.extension_hook_caller import ExtensionHookCaller
+from fiaas_deploy_daemon.extension_hook_caller import ExtensionHookCache, ExtensionHookCaller
 
 URL_PARAM = "URL"
 
@@ -122,3 +124,155 @@ class TestExtensionHookCaller(object):
         extension_hook_caller.apply(obj, app_spec)
         assert obj == deployment
         session.post.assert_not_called()
+
+    def test_send_all_objects_in_one_request(self, session, app_spec, deployment):
+        conf = Configuration(["--extension-hook-url", URL_PARAM])
+        extension_hook_caller = ExtensionHookCaller(conf, session)
+        service = Service()
+        modified = self.deployment_v2()
+        session.post.return_value = self.response_200({"objects": [modified, None]})
+
+        extension_hook_caller.apply_all([deployment, service], app_spec)
+
+        session.post.assert_called_once()
+        assert session.post.call_args.args[0] == "fiaas/deploy/batch"
+        assert [o["kind"] for o in json.loads(session.post.call_args.kwargs["data"])["objects"]] == [
+            "Deployment",
+            "Service",
+        ]
+        assert deployment.as_dict() == modified
+        assert service == Service()
+
+    def test_send_nothing_when_all_objects_are_cached(self, session, app_spec, deployment):
+        session.post.return_value = self.response_200({"objects": [self.deployment_v2()]})
+        conf = Configuration(["--extension-hook-url", URL_PARAM])
+        extension_hook_caller = ExtensionHookCaller(conf, session)
+        extension_hook_caller.apply_all([copy.deepcopy(deployment)], app_spec)
+        session.post.reset_mock()
+
+        extension_hook_caller.apply_all([deployment], app_spec)
+
+        session.post.assert_not_called()
+        assert deployment.as_dict() == self.deployment_v2()
+
+    def test_fall_back_to_one_request_per_object_when_batch_returns_404(self, session, app_spec, deployment):
+        session.post.side_effect = [self.response_other(404), self.response_200(self.deployment_v2())]
+        conf = Configuration(["--extension-hook-url", URL_PARAM, "--disable-extension-hook-cache"])
+        extension_hook_caller = ExtensionHookCaller(conf, session)
+
+        extension_hook_caller.apply_all([deployment], app_spec)
+
+        assert [c.args[0] for c in session.post.call_args_list] == ["fiaas/deploy/batch", "fiaas/deploy/Deployment"]
+        assert deployment.as_dict() == self.deployment_v2()
+
+        session.post.side_effect = [self.response_other(404)]
+        extension_hook_caller.apply_all([Service()], app_spec)
+        assert session.post.call_args.args[0] == "fiaas/deploy/Service"
+
+    @pytest.mark.parametrize("status", (400, 503))
+    def test_raise_exception_and_keep_sending_batches_when_batch_fails(self, session, app_spec, deployment, status):
+        session.post.side_effect = [self.response_other(status), self.response_200({"objects": [None]})]
+        conf = Configuration(["--extension-hook-url", URL_PARAM])
+        extension_hook_caller = ExtensionHookCaller(conf, session)
+
+        with pytest.raises(HTTPError):
+            extension_hook_caller.apply_all([deployment], app_spec)
+
+        extension_hook_caller.apply_all([Service()], app_spec)
+        assert [c.args[0] for c in session.post.call_args_list] == ["fiaas/deploy/batch", "fiaas/deploy/batch"]
+
+    def test_send_nothing_when_no_url_in_config(self, session, app_spec, deployment):
+        extension_hook_caller = ExtensionHookCaller(Configuration([]), session)
+
+        extension_hook_caller.apply_all([deployment], app_spec)
+
+        session.post.assert_not_called()
+
+    @staticmethod
+    def saved(deployment, resource_version):
+        data = deployment.as_dict()
+        data["metadata"] = {"name": "testapp", "resourceVersion": resource_version}
+        return Deployment.from_dict(data)
+
+    def test_use_cached_result_for_unchanged_object_and_config(self, session_respond_200, app_spec, deployment):
+        conf = Configuration(["--extension-hook-url", URL_PARAM])
+        extension_hook_caller = ExtensionHookCaller(conf, session_respond_200)
+        first = self.saved(deployment, "1")
+        second = self.saved(deployment, "2")
+
+        extension_hook_caller.apply(first, app_spec)
+        extension_hook_caller.apply(second, app_spec)
+
+        session_respond_200.post.assert_called_once()
+        assert second.spec == first.spec
+        assert second.metadata.resourceVersion == "2"
+
+    def test_call_hook_when_application_config_changes(self, session_respond_200, app_spec, deployment):
+        conf = Configuration(["--extension-hook-url", URL_PARAM])
+        extension_hook_caller = ExtensionHookCaller(conf, session_respond_200)
+
+        extension_hook_caller.apply(copy.deepcopy(deployment), app_spec)
+        extension_hook_caller.apply(copy.deepcopy(deployment), app_spec._replace(app_config={"version": 3}))
+
+        assert session_respond_200.post.call_count == 2
+
+    def test_do_not_cache_failed_calls(self, session, app_spec, deployment):
+        session.post.side_effect = [self.response_other(500), self.response_200(self.deployment_v2())]
+        conf = Configuration(["--extension-hook-url", URL_PARAM])
+        extension_hook_caller = ExtensionHookCaller(conf, session)
+
+        with pytest.raises(HTTPError):
+            extension_hook_caller.apply(copy.deepcopy(deployment), app_spec)
+        extension_hook_caller.apply(copy.deepcopy(deployment), app_spec)
+
+        assert session.post.call_count == 2
+
+    def test_call_hook_every_time_when_cache_is_disabled(self, session_respond_200, app_spec, deployment):
+        conf = Configuration(["--extension-hook-url", URL_PARAM, "--disable-extension-hook-cache"])
+        extension_hook_caller = ExtensionHookCaller(conf, session_respond_200)
+
+        extension_hook_caller.apply(copy.deepcopy(deployment), app_spec)
+        extension_hook_caller.apply(copy.deepcopy(deployment), app_spec)
+
+        assert session_respond_200.post.call_count == 2
+
+
+class TestExtensionHookCache(object):
+    @pytest.fixture
+    def clock(self):
+        return mock.Mock(return_value=0)
+
+    @staticmethod
+    def deployment(name):
+        return Deployment.from_dict({"metadata": {"name": name}})
+
+    def test_expire_results_after_ttl(self, clock, app_spec):
+        cache = ExtensionHookCache(10, 60, time_func=clock)
+        key = cache.key(self.deployment("a"), app_spec)
+        cache.put(key, self.deployment("a"))
+
+        clock.return_value = 59
+        assert cache.apply(key, self.deployment("a"))
+        clock.return_value = 60
+        assert not cache.apply(key, self.deployment("a"))
+
+    def test_evict_least_recently_used_results(self, clock, app_spec):
+        cache = ExtensionHookCache(2, 60, time_func=clock)
+        keys = {}
+        for name in ("a", "b", "c"):
+            keys[name] = cache.key(self.deployment(name), app_spec)
+            cache.put(keys[name], self.deployment(name))
+            if name == "b":
+                assert cache.apply(keys["a"], self.deployment("a"))
+
+        assert cache.apply(keys["a"], self.deployment("a"))
+        assert not cache.apply(keys["b"], self.deployment("b"))
+        assert cache.apply(keys["c"], self.deployment("c"))
+
+    def test_key_ignores_metadata_set_by_api_server(self, app_spec):
+        first = Deployment.from_dict({"metadata": {"name": "a", "resourceVersion": "1", "uid": "x"}})
+        second = Deployment.from_dict({"metadata": {"name": "a", "resourceVersion": "2", "uid": "x"}})
+        other = Deployment.from_dict({"metadata": {"name": "a", "labels": {"fiaas/deployment_id": "2"}}})
+
+        assert ExtensionHookCache.key(first, app_spec) == ExtensionHookCache.key(second, app_spec)
+        assert ExtensionHookCache.key(first, app_spec) != ExtensionHookCache.key(other, app_spec)
@@ -17,7 +17,18 @@ import pytest
 from fiaas_deploy_daemon import HealthCheck
 from fiaas_deploy_daemon.base_thread import DaemonThread
 
-THREADS = ["deployer", "scheduler", "crd_watcher", "usage_reporter"]
+THREADS = [
+    "deployer",
+    "scheduler",
+    "crd_watcher",
+    "usage_reporter",
+    "deployment_watcher",
+    "resource_cache",
+    "status_index",
+    "status_writer",
+    "status_sweeper",
+    "sharding",
+]
 
 
 def _create_mock(failing):
@@ -48,3 +59,11 @@ class TestHealthCheck(object):
         threads = (_create_mock(False) for _ in THREADS)
         health_check = HealthCheck(*threads)
         assert health_check.is_healthy()
+
+    def test_reports_shard_ownership(self):
+        threads = [_create_mock(False) for _ in THREADS]
+        sharding = threads[THREADS.index("sharding")]
+        sharding.ownership = mock.MagicMock(return_value={"identity": "replica-1"})
+        health_check = HealthCheck(*threads)
+
+        assert health_check.shard_ownership() == {"identity": "replica-1"}
@@ -15,11 +15,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import threading
+from io import StringIO
+from unittest import mock
 
 import pytest
 
+from fiaas_deploy_daemon import log_extras
 from fiaas_deploy_daemon.log_extras import StatusHandler, set_extras, get_final_logs, StatusErrorHandler, \
-    get_final_error_logs
+    get_final_error_logs, LogStore, StatusFormatter
 
 TEST_MESSAGE = "This is a test log message"
 TEST_MESSAGE_ERROR = "This is a test log error message"
@@ -55,6 +59,41 @@ class TestLogExtras(object):
         assert app_spec.name in log_message
         assert app_spec.namespace in log_message
 
+    def test_status_logs_are_not_captured_without_deployment_context(self, monkeypatch):
+        monkeypatch.setattr(log_extras, "_LOG_EXTRAS", threading.local())
+        handler = StatusHandler()
+
+        with mock.patch.object(handler, "format") as format:
+            handler.handle(logging.makeLogRecord({"msg": TEST_MESSAGE, "levelno": logging.INFO}))
+
+        format.assert_not_called()
+        assert log_extras._LOGS.get(("", "", "")) == []
+
+    def test_status_handlers_format_record_once(self, app_spec):
+        set_extras(app_spec)
+        get_final_logs(app_spec.name, app_spec.namespace, app_spec.deployment_id)
+        get_final_error_logs(app_spec.name, app_spec.namespace, app_spec.deployment_id)
+        logger = logging.getLogger("test.format.once")
+        logger.propagate = False
+        stdout_handler = logging.StreamHandler(StringIO())
+        logger.addHandler(stdout_handler)
+        logger.addHandler(StatusHandler())
+        logger.addHandler(StatusErrorHandler())
+
+        with mock.patch.object(StatusFormatter, "formatMessage", autospec=True, side_effect=logging.Formatter.formatMessage) as m:
+            try:
+                raise ValueError("Something went wrong")
+            except ValueError:
+                logger.exception(TEST_MESSAGE_ERROR)
+
+        m.assert_called_once()
+        key = {"app_name": app_spec.name, "namespace": app_spec.namespace, "deployment_id": app_spec.deployment_id}
+        logs = get_final_logs(**key)
+        assert logs == get_final_error_logs(**key)
+        assert logs[0].endswith("ValueError: Something went wrong")
+        assert "Traceback" not in logs[0]
+        assert "Traceback" in stdout_handler.stream.getvalue()
+
     @pytest.fixture
     def spec(self, request, app_spec):
         if request.param:
@@ -77,3 +116,66 @@ class TestLogExtras(object):
     def test_require_all_three_fields(self, spec, name, namespace, deployment_id):
         with pytest.raises(TypeError):
             set_extras(app_spec=spec, app_name=name, namespace=namespace, deployment_id=deployment_id)
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLogStore(object):
+    KEY = ("app", "namespace", "deployment_id")
+
+    @pytest.fixture
+    def clock(self):
+        return Clock()
+
+    def test_pop_removes_lines(self):
+        store = LogStore("test")
+        store.append(self.KEY, "first")
+        store.append(self.KEY, "second")
+
+        assert store.get(self.KEY) == ["first", "second"]
+        assert store.pop(self.KEY) == ["first", "second"]
+        assert store.get(self.KEY) == []
+        assert store._size == 0
+
+    def test_drops_oldest_lines_above_line_limit(self):
+        store = LogStore("test", max_lines=2)
+
+        for i in range(5):
+            store.append(self.KEY, "line {}".format(i))
+
+        assert store.pop(self.KEY) == ["[3 earlier lines were dropped]", "line 3", "line 4"]
+
+    def test_evicts_least_recently_touched_deployments_above_size_limit(self):
+        store = LogStore("test", max_bytes=10)
+        store.append("first", "12345")
+        store.append("second", "12345")
+        store.get("first")
+
+        with mock.patch.object(log_extras.log_capture_evicted, "labels") as labels:
+            store.append("third", "12345")
+
+        labels.assert_called_once_with("test", "memory")
+        assert store.get("first") == ["12345"]
+        assert store.get("second") == []
+        assert store.get("third") == ["12345"]
+
+    def test_evicts_deployments_not_touched_within_ttl(self, clock):
+        store = LogStore("test", ttl=60, time_func=clock)
+        store.append("orphan", "superseded")
+        clock.now += 30
+        store.append("active", "running")
+        clock.now += 31
+
+        with mock.patch.object(log_extras.log_capture_evicted, "labels") as labels:
+            store.append("active", "still running")
+
+        labels.assert_called_once_with("test", "ttl")
+        assert store.get("orphan") == []
+        assert store.get("active") == ["running", "still running"]
+        assert store._size == len("running") + len("still running")
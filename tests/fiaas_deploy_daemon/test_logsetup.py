@@ -16,6 +16,7 @@
 # limitations under the License.
 import json
 import logging
+import queue
 import sys
 from io import StringIO
 
@@ -23,8 +24,9 @@ from unittest import mock
 import pytest
 from callee import InstanceOf, Attrs, List
 
-from fiaas_deploy_daemon.log_extras import StatusHandler, ExtraFilter, set_extras
-from fiaas_deploy_daemon.logsetup import init_logging, FiaasFormatter, _create_default_handler
+from fiaas_deploy_daemon import logsetup
+from fiaas_deploy_daemon.log_extras import StatusHandler, ExtraFilter, set_extras, DeploymentContextFilter
+from fiaas_deploy_daemon.logsetup import init_logging, FiaasFormatter, _create_default_handler, AsyncLogHandler
 
 TEST_MESSAGE = "This is a test log message"
 
@@ -52,7 +54,9 @@ class TestLogSetup(object):
 
     @staticmethod
     def _describe_status_handler():
-        return InstanceOf(StatusHandler) & Attrs(filters=List(of=InstanceOf(ExtraFilter)))
+        return InstanceOf(StatusHandler) & Attrs(
+            filters=List(of=InstanceOf(ExtraFilter) | InstanceOf(DeploymentContextFilter))
+        )
 
     def test_default_behaviour(self, root_logger):
         init_logging(_FakeConfig())
@@ -74,6 +78,46 @@ class TestLogSetup(object):
         init_logging(_FakeConfig(debug=True))
         root_logger.setLevel.assert_called_with(logging.DEBUG)
 
+    def test_async_logging(self, root_logger):
+        with mock.patch("fiaas_deploy_daemon.logsetup.QueueListener") as listener:
+            init_logging(_FakeConfig(enable_async_logging=True))
+
+        root_logger.addHandler.assert_has_calls(
+            (
+                mock.call(InstanceOf(AsyncLogHandler) & Attrs(filters=List(of=InstanceOf(ExtraFilter)))),
+                mock.call(self._describe_status_handler()),
+            ),
+            any_order=True,
+        )
+        listener.assert_called_once_with(
+            mock.ANY, self._describe_stream_handler(logging.Formatter), respect_handler_level=True
+        )
+        listener.return_value.start.assert_called_once_with()
+
+    def test_async_handler_keeps_message_and_extras_of_logging_thread(self, app_spec):
+        log_queue = queue.Queue()
+        handler = AsyncLogHandler(log_queue)
+        handler.addFilter(ExtraFilter())
+        set_extras(app_spec)
+        args = ["value"]
+
+        handler.handle(logging.makeLogRecord({"msg": "message with %s", "args": (args,)}))
+        args.append("changed")
+
+        record = log_queue.get_nowait()
+        assert record.getMessage() == "message with ['value']"
+        assert record.extras["app_name"] == app_spec.name
+
+    def test_async_handler_drops_records_when_queue_is_full(self):
+        handler = AsyncLogHandler(queue.Queue(1))
+
+        with mock.patch.object(logsetup.log_records_dropped, "inc") as dropped:
+            handler.handle(logging.makeLogRecord({"msg": "first"}))
+            handler.handle(logging.makeLogRecord({"msg": "second"}))
+
+        assert handler.queue.get_nowait().getMessage() == "first"
+        dropped.assert_called_once_with()
+
     def test_json_log_has_extra(self, app_spec):
         log = logging.getLogger("test-logger")
         log.setLevel(logging.INFO)
@@ -89,8 +133,29 @@ class TestLogSetup(object):
         assert log_entry["extras"]["app_name"] == app_spec.name
         assert log_entry["extras"]["deployment_id"] == app_spec.deployment_id
 
+    def test_json_log_has_traceback(self):
+        log = logging.getLogger("test-logger")
+        handler = _create_default_handler(_FakeConfig("json"))
+        log_buffer = StringIO()
+        handler.stream = log_buffer
+        log.addHandler(handler)
+        try:
+            raise ValueError("Something went wrong")
+        except ValueError:
+            log.exception(TEST_MESSAGE)
+        log_entry = json.loads(log_buffer.getvalue())
+        assert "Traceback" in log_entry["throwable"]
+        assert "ValueError: Something went wrong" in log_entry["throwable"]
+        assert "status_message" not in log_entry
+
 
 class _FakeConfig(object):
-    def __init__(self, log_format="plain", debug=False):
+    def __init__(self, log_format="plain", debug=False, enable_async_logging=False):
         self.log_format = log_format
         self.debug = debug
+        self.enable_async_logging = enable_async_logging
+        self.async_logging_queue_size = 10
+        self.async_logging_overflow = "drop"
+        self.log_capture_max_lines = 1000
+        self.log_capture_max_megabytes = 64
+        self.log_capture_ttl = 3600
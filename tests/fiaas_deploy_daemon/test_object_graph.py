@@ -0,0 +1,86 @@
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pinject
+import pytest
+from prometheus_client import REGISTRY
+
+from fiaas_deploy_daemon import Configuration, Main, MainBindings
+from fiaas_deploy_daemon.coordination import CoordinationBindings
+from fiaas_deploy_daemon.coordination.leader_election import LeaderElection
+from fiaas_deploy_daemon.coordination.sharding import Sharding
+from fiaas_deploy_daemon.crd import CustomResourceDefinitionBindings, status
+from fiaas_deploy_daemon.crd.status_sweeper import StatusSweeper
+from fiaas_deploy_daemon.deployer import DeployerBindings
+from fiaas_deploy_daemon.deployer.kubernetes import K8sAdapterBindings
+from fiaas_deploy_daemon.deployer.kubernetes.deployment_watcher import CachedDeploymentWatcher
+from fiaas_deploy_daemon.specs import SpecBindings
+from fiaas_deploy_daemon.usage_reporting import UsageReportingBindings
+from fiaas_deploy_daemon.web import WebBindings
+
+
+class TestObjectGraph(object):
+    @pytest.fixture(autouse=True)
+    def namespace(self, monkeypatch):
+        monkeypatch.setenv("NAMESPACE", "fiaas-deploy-daemon")
+
+    @pytest.fixture(autouse=True)
+    def registry(self):
+        # some metrics are created when the objects are, so each graph needs a clean registry
+        before = set(REGISTRY._collector_to_names)
+        yield
+        for collector in set(REGISTRY._collector_to_names) - before:
+            REGISTRY.unregister(collector)
+
+    @pytest.mark.parametrize(
+        "args, sharding_class",
+        (
+            (["--enable-sharding", "--parse-workers", "2"], Sharding),
+            (["--enable-leader-election"], LeaderElection),
+        ),
+    )
+    def test_builds_main_with_crd_support_and_coordination(self, args, sharding_class, monkeypatch):
+        monkeypatch.setattr(status, "_status_index", None)
+        monkeypatch.setattr(status, "_status_writer", None)
+        config = Configuration(
+            [
+                "--enable-crd-support",
+                "--enable-resource-cache",
+                "--enable-deployment-watch",
+                "--status-write-queue-size",
+                "10",
+            ]
+            + args
+        )
+        binding_specs = [
+            MainBindings(config),
+            DeployerBindings(config.enable_deployment_watch, config.enable_resource_cache),
+            K8sAdapterBindings(True, config.enable_resource_cache),
+            WebBindings(),
+            SpecBindings(),
+            CustomResourceDefinitionBindings(True, True, config.status_write_queue_size > 0),
+            CoordinationBindings(config.enable_sharding, config.enable_leader_election),
+            UsageReportingBindings(),
+        ]
+        obj_graph = pinject.new_object_graph(modules=None, binding_specs=binding_specs)
+
+        main = obj_graph.provide(Main)
+
+        assert isinstance(main._sharding, sharding_class)
+        assert main._crd_watcher._sharding is main._sharding
+        assert isinstance(main._deployment_watcher, CachedDeploymentWatcher)
+        assert isinstance(main._status_sweeper, StatusSweeper)
+        assert main._status_sweeper._sharding is main._sharding
+        # the status signals are connected when Main runs, not while the graph is built
+        assert status._status_index is None
+        assert status._status_writer is None
@@ -16,7 +16,7 @@ import pytest
 from k8s.client import ClientError
 from requests import Response, Request
 
-from fiaas_deploy_daemon.retry import retry_on_upsert_conflict, UpsertConflict, canonical_name
+from fiaas_deploy_daemon.retry import retry_on_upsert_conflict, UpsertConflict, canonical_name, watch_forever
 
 
 def test_upsertconflict_str():
@@ -137,3 +137,38 @@ def name_test_function():
 )
 def test_canonical_name(func, expected):
     assert canonical_name(func) == expected
+
+
+class Stop(BaseException):
+    pass
+
+
+def test_watch_forever_waits_longer_after_each_consecutive_error():
+    sleep = mock.MagicMock(side_effect=[None, None, None, Stop])
+    watch = mock.MagicMock(side_effect=[ValueError, ValueError, None, ValueError, ValueError])
+
+    with pytest.raises(Stop):
+        watch_forever(watch, "Deployments", sleep_func=sleep, time_func=lambda: 0)
+
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 1, 2]
+
+
+def test_watch_forever_waits_at_most_the_longest_delay():
+    sleep = mock.MagicMock(side_effect=[None] * 9 + [Stop])
+    watch = mock.MagicMock(side_effect=ValueError)
+
+    with pytest.raises(Stop):
+        watch_forever(watch, "Deployments", sleep_func=sleep, time_func=lambda: 0)
+
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 4, 8, 16, 32, 60, 60, 60, 60]
+
+
+def test_watch_forever_starts_over_after_watching_for_a_while():
+    clock = mock.MagicMock(side_effect=[0, 0, 0, 0, 100, 1000])
+    sleep = mock.MagicMock(side_effect=[None, None, Stop])
+    watch = mock.MagicMock(side_effect=ValueError)
+
+    with pytest.raises(Stop):
+        watch_forever(watch, "Deployments", sleep_func=sleep, time_func=clock)
+
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 1]
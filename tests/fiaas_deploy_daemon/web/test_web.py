@@ -81,6 +81,22 @@ class TestEndpoints:
         resp = client.get("/healthz")
         assert resp.status_code == status_code
 
+    def test_shard_ownership(self, client, health_check):
+        ownership = {"identity": "replica-1", "members": ["replica-1", "replica-2"], "owned_share": 0.5}
+        health_check.shard_ownership.return_value = ownership
+
+        resp = client.get("/healthz/shards")
+
+        assert resp.status_code == 200
+        assert resp.get_json() == ownership
+
+    def test_shard_ownership_when_sharding_disabled(self, client, health_check):
+        health_check.shard_ownership.return_value = None
+
+        resp = client.get("/healthz/shards")
+
+        assert resp.status_code == 404
+
     def test_transform_get(self, client):
         resp = client.get("/transform")
 